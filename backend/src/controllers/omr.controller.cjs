@@ -1,6 +1,7 @@
 const multer = require('multer');
 const path = require('path');
 const fs = require('fs').promises;
+const crypto = require('crypto');
 const omrProcessingService = require('../services/omrProcessing.service.cjs');
 
 // MOCK STORAGE - NO DATABASE REQUIRED!
@@ -40,6 +41,25 @@ const storage = multer.diskStorage({
     }
 });
 
+/**
+ * Sheet template options from a request body
+ * `templateId` picks the sheet layout in omr-algorithm's template registry and
+ * `numQuestions` limits reading to the exam's questions; both are optional.
+ * @param {Object} body - Request body
+ * @returns {{ templateId: (string|undefined), numQuestions: (number|undefined) }}
+ */
+function templateOptions(body = {}) {
+    const templateId = typeof body.templateId === 'string' && body.templateId
+        ? body.templateId.slice(0, 64)
+        : undefined;
+    const numQuestions = Number.parseInt(body.numQuestions, 10);
+
+    return {
+        templateId,
+        numQuestions: Number.isInteger(numQuestions) && numQuestions > 0 ? numQuestions : undefined
+    };
+}
+
 const upload = multer({
     storage: storage,
     limits: { fileSize: 10 * 1024 * 1024 }, // 10MB limit
@@ -144,8 +164,12 @@ exports.processOMRSheet = async (req, res) => {
 
         console.log(' - Resolved path:', absoluteImagePath);
 
-        // Process image with OCR
-        const processingResult = await omrProcessingService.processOMRImage(absoluteImagePath);
+        // Process image with OCR (request id is echoed back with per-stage timings)
+        const requestId = req.get('x-request-id') || crypto.randomUUID();
+        const processingResult = await omrProcessingService.processOMRImage(absoluteImagePath, {
+            requestId,
+            ...templateOptions(req.body)
+        });
 
         console.log('✅ OCR Processing complete:', {
             answersCount: Object.keys(processingResult.answers).length,
@@ -174,8 +198,11 @@ exports.processOMRSheet = async (req, res) => {
             requiresValidation: hasLowConfidence,
             ocrStats: {
                 totalAnswers: Object.keys(processingResult.answers).length,
-                avgConfidence: Object.values(processingResult.confidence || {}).reduce((a, b) => a + b, 0) / 50
-            }
+                avgConfidence: Object.values(processingResult.confidence || {}).reduce((a, b) => a + b, 0)
+                    / Math.max(Object.keys(processingResult.confidence || {}).length, 1)
+            },
+            requestId,
+            timings: processingResult.timings
         });
     } catch (error) {
         console.error('Process OMR sheet error:', error);
@@ -451,6 +478,15 @@ exports.processFrameLive = async (req, res) => {
             console.log('✅ Stripped data URI prefix');
         }
 
+        // Correlates this frame with the worker's per-stage timings
+        const requestId = req.get('x-request-id') || crypto.randomUUID();
+
+        // Optional live-scan session: frames of the same session track the
+        // paper corners from the previous frame instead of re-detecting them
+        const sessionId = typeof req.body.sessionId === 'string' && req.body.sessionId
+            ? req.body.sessionId.slice(0, 64)
+            : undefined;
+
         // Convert base64 to buffer
         const imageBuffer = Buffer.from(base64Data, 'base64');
         console.log('✅ Image buffer created, size:', imageBuffer.length);
@@ -459,27 +495,31 @@ exports.processFrameLive = async (req, res) => {
         const isValidJpeg = imageBuffer[0] === 0xFF && imageBuffer[1] === 0xD8;
         console.log('✅ JPEG header valid:', isValidJpeg, '- First bytes:', imageBuffer[0], imageBuffer[1]);
 
-        // Save to omr-algorithm folder where Python can access it
-        const fsSync = require('fs');
-        const isDocker = process.env.NODE_ENV === 'production' || fsSync.existsSync('/app/omr-algorithm');
-        const omrDir = isDocker ? '/app/omr-algorithm' : path.join('C:', 'SE_FINAL', 'SE_FINAL_ODEV_SON', 'omr-algorithm');
-
-        const tempFilePath = path.join(omrDir, `temp_omr_${Date.now()}.jpg`);
-        fsSync.writeFileSync(tempFilePath, imageBuffer);
-        console.log('✅ Temp file saved to omr-algorithm:', tempFilePath);
-
-        // Verify file
-        const fileStats = fsSync.statSync(tempFilePath);
-        console.log('✅ File verified, size:', fileStats.size);
-
         try {
-            // Use the OMR processing service with visualization
+            // The frame stays in memory: the buffer goes to the OMR worker as
+            // base64 and is decoded there, no temp file is written
             console.log('📖 Processing with OMR service + visualization...');
 
-            const processingResult = await omrProcessingService.processWithVisualization(tempFilePath);
+            const processingResult = await omrProcessingService.processWithVisualization(imageBuffer, {
+                requestId,
+                sessionId,
+                qualityCheck: true,
+                ...templateOptions(req.body)
+            });
 
-            // Cleanup temp file
-            await fs.unlink(tempFilePath).catch(() => { });
+            // Unusable frame (blurry, dark, glare, no sheet): rejected before the
+            // pipeline ran; the reason code lets the app tell the user what to fix
+            if (processingResult.rejected) {
+                return res.json({
+                    success: false,
+                    paper_detected: false,
+                    error: processingResult.quality.message,
+                    reason: processingResult.quality.reason,
+                    quality: processingResult.quality,
+                    requestId,
+                    timings: processingResult.timings
+                });
+            }
 
             // Calculate stats
             const totalQuestions = Object.keys(processingResult.answers).length;
@@ -500,6 +540,9 @@ exports.processFrameLive = async (req, res) => {
                 answers: processingResult.answers,
                 confidence: processingResult.confidence,
                 pipelineImages: processingResult.pipelineImages || {},
+                requestId,
+                timings: processingResult.timings,
+                tracking: processingResult.tracking,
                 summary: {
                     total: totalQuestions,
                     answered: answeredCount,
@@ -520,9 +563,6 @@ exports.processFrameLive = async (req, res) => {
         } catch (error) {
             console.error('❌ Processing error:', error);
 
-            // Cleanup temp file
-            await fs.unlink(tempFilePath).catch(() => { });
-
             res.status(500).json({
                 success: false,
                 error: 'Processing failed',
@@ -1,215 +1,280 @@
 const { spawn } = require('child_process');
+const fs = require('fs');
 const path = require('path');
+const { OMRWorkerPool } = require('./omrWorkerPool.cjs');
 
 /**
- * Process OMR image using calibrated answer reader
- * Uses omr_answer_reader.py with calibration.json for precise bubble detection
- * @param {string} imagePath - Path to the OMR image file
- * @returns {Promise<Object>} Processing result with answers and confidence scores
+ * Resolve the omr-algorithm folder (Docker vs local)
+ * @returns {string} Absolute path of the omr-algorithm folder
  */
-async function processOMRImage(imagePath) {
-    return new Promise((resolve, reject) => {
-        const pythonPath = 'python';
+function getOmrAlgorithmPath() {
+    const isDocker = process.env.NODE_ENV === 'production' || fs.existsSync('/app/omr-algorithm');
 
-        // Determine environment (Docker vs local)
-        const isDocker = process.env.NODE_ENV === 'production' || require('fs').existsSync('/app/omr-algorithm');
+    return isDocker
+        ? '/app/omr-algorithm'
+        : path.join('C:', 'SE_FINAL', 'SE_FINAL_ODEV_SON', 'omr-algorithm');
+}
 
-        const omrAlgorithmPath = isDocker
-            ? '/app/omr-algorithm'
-            : path.join('C:', 'SE_FINAL', 'SE_FINAL_ODEV_SON', 'omr-algorithm');
+let workerPool = null;
 
-        const omrAnswerReaderScript = path.join(omrAlgorithmPath, 'omr_answer_reader.py');
-        const calibrationPath = path.join(omrAlgorithmPath, 'calibration.json');
+/**
+ * Lazily create the shared pool of long-lived omr_worker.py processes
+ * @returns {OMRWorkerPool}
+ */
+function getWorkerPool() {
+    if (!workerPool) {
+        workerPool = new OMRWorkerPool({ cwd: getOmrAlgorithmPath() });
+    }
+    return workerPool;
+}
 
-        console.log('🔍 Processing OMR image with calibrated reader...');
-        console.log(' - Environment:', isDocker ? 'Docker' : 'Local');
-        console.log(' - Image:', imagePath);
-        console.log(' - Algorithm:', omrAnswerReaderScript);
-        console.log(' - Calibration:', calibrationPath);
+/**
+ * Run an omr-algorithm script once in machine mode and parse its stdout
+ * Used when the worker pool is disabled (OMR_WORKER_POOL_SIZE=0). The result
+ * comes back in-band, so concurrent scans never share a result file.
+ * @param {string} scriptName - Script inside omr-algorithm
+ * @param {string[]} args - Script arguments (including --json)
+ * @param {Buffer} [input] - Image bytes piped to stdin (script argument '-')
+ * @returns {Promise<Object>} The script's JSON result
+ */
+function runScriptOnce(scriptName, args, input) {
+    return new Promise((resolve, reject) => {
+        const omrAlgorithmPath = getOmrAlgorithmPath();
+        const script = path.join(omrAlgorithmPath, scriptName);
 
-        // Verify calibration file exists
-        const fs = require('fs');
-        if (!fs.existsSync(calibrationPath)) {
-            console.error('❌ Calibration file not found at:', calibrationPath);
-            return reject(new Error('calibration.json not found! Please run calibration first.'));
-        }
+        const omrProcess = spawn('python', [script, ...args], {
+            cwd: omrAlgorithmPath,
+            env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
+        });
 
         // Set timeout for entire operation (30 seconds)
         const timeoutId = setTimeout(() => {
-            console.error('❌ OMR processing timeout');
+            omrProcess.kill();
             reject(new Error('OMR processing timeout after 30 seconds'));
         }, 30000);
 
-        // Run omr_answer_reader.py
-        const omrProcess = spawn(pythonPath, [omrAnswerReaderScript, imagePath], {
-            cwd: omrAlgorithmPath
-        });
-
         let stdoutData = '';
         let stderrData = '';
 
-        // Capture stdout
         omrProcess.stdout.on('data', (data) => {
             stdoutData += data.toString();
-            console.log('  📝 Python stdout:', data.toString().trim());
         });
 
-        // Capture stderr
+        // Human-readable progress logs arrive on stderr in machine mode
         omrProcess.stderr.on('data', (data) => {
             stderrData += data.toString();
-            console.error('  ⚠️ Python stderr:', data.toString().trim());
         });
 
         omrProcess.on('close', (code) => {
             clearTimeout(timeoutId);
 
-            if (code !== 0) {
-                console.error('❌ OMR answer reader failed:', stderrData);
-                return reject(new Error(`OMR answer reader failed with code ${code}: ${stderrData}`));
-            }
-
-            // omr_answer_reader.py creates omr_answers.json in the omr-algorithm folder
-            const isDocker = process.env.NODE_ENV === 'production' || fs.existsSync('/app/omr-algorithm');
-            const omrAlgorithmPath = isDocker
-                ? '/app/omr-algorithm'
-                : path.join('C:', 'SE_FINAL', 'SE_FINAL_ODEV_SON', 'omr-algorithm');
-
-            const resultPath = path.join(omrAlgorithmPath, 'omr_answers.json');
-
             try {
-                const resultData = fs.readFileSync(resultPath, 'utf8');
-                const result = JSON.parse(resultData);
-
-                if (!result.success) {
-                    return reject(new Error('OMR processing failed: ' + (result.error || 'Unknown error')));
-                }
-
-                console.log('✅ OMR processing complete');
-                console.log(' - Answers detected:', Object.keys(result.answers).length);
-                console.log(' - Average confidence:', result.summary.average_confidence);
-                console.log(' - Answered:', result.summary.answered);
-                console.log(' - Blank:', result.summary.blank);
-
-                // Format for our system
-                const formattedAnswers = {};
-                const formattedConfidence = {};
-
-                for (let i = 1; i <= 10; i++) {
-                    const questionKey = i.toString();
-                    formattedAnswers[questionKey] = result.answers[i] || null;
-                    formattedConfidence[questionKey] = result.confidence[i] || 0.0;
-                }
-
-                resolve({
-                    answers: formattedAnswers,
-                    confidence: formattedConfidence,
-                    testId: null,
-                    rollNo: null
-                });
-
+                resolve(JSON.parse(stdoutData));
             } catch (parseError) {
-                console.error('❌ Failed to read result file:', parseError);
-                reject(new Error(`Failed to read result: ${parseError.message}`));
+                console.error(`❌ ${scriptName} failed:`, stderrData);
+                reject(new Error(`${scriptName} failed with code ${code}: ${stderrData}`));
             }
         });
 
         omrProcess.on('error', (error) => {
             clearTimeout(timeoutId);
-            console.error('❌ Failed to start OMR answer reader:', error);
-            reject(new Error(`Failed to start OMR answer reader: ${error.message}`));
+            reject(new Error(`Failed to start ${scriptName}: ${error.message}`));
         });
+
+        if (input) {
+            omrProcess.stdin.on('error', () => { });
+            omrProcess.stdin.end(input);
+        }
     });
 }
 
 /**
- * Process OMR image with full pipeline visualization
- * Runs both pipeline visualizer and answer reader, returns images as base64
- * @param {string} imagePath - Path to the OMR image file
- * @returns {Promise<Object>} Processing result with answers, confidence, and pipeline images
+ * Check the calibration file and fail early when it is missing
  */
-async function processWithVisualization(imagePath) {
-    const fs = require('fs');
+function ensureCalibration() {
+    const calibrationPath = path.join(getOmrAlgorithmPath(), 'calibration.json');
 
-    // Determine environment
-    const isDocker = process.env.NODE_ENV === 'production' || fs.existsSync('/app/omr-algorithm');
-    const omrAlgorithmPath = isDocker
-        ? '/app/omr-algorithm'
-        : path.join('C:', 'SE_FINAL', 'SE_FINAL_ODEV_SON', 'omr-algorithm');
+    if (!fs.existsSync(calibrationPath)) {
+        console.error('❌ Calibration file not found at:', calibrationPath);
+        throw new Error('calibration.json not found! Please run calibration first.');
+    }
+}
 
-    const outputDir = path.join(omrAlgorithmPath, 'mobile_pipeline_output');
+/**
+ * Convert a reader result into the format used by the OMR controller
+ * @param {Object} result - omr_answer_reader JSON result
+ * @returns {Object} answers/confidence keyed by question number
+ */
+function formatReaderResult(result) {
+    if (!result.success) {
+        throw new Error('OMR processing failed: ' + (result.error || 'Unknown error'));
+    }
 
-    console.log('🎨 Processing OMR with visualization...');
-    console.log(' - Image:', imagePath);
-    console.log(' - Output dir:', outputDir);
+    console.log('✅ OMR processing complete');
+    console.log(' - Answers detected:', Object.keys(result.answers).length);
+    console.log(' - Average confidence:', result.summary.average_confidence);
+    console.log(' - Answered:', result.summary.answered);
+    console.log(' - Blank:', result.summary.blank);
 
-    // Step 1: Run pipeline visualizer
-    await new Promise((resolve, reject) => {
-        const pythonPath = 'python';
-        const visualizerScript = path.join(omrAlgorithmPath, 'omr_pipeline_visualizer.py');
+    if (result.sheet_id) {
+        console.log(' - Sheet id (QR):', result.sheet_id.raw);
+    }
 
-        const visualizerProcess = spawn(pythonPath, [visualizerScript, imagePath, outputDir], {
-            cwd: omrAlgorithmPath,
-            env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
-        });
+    // Format for our system (the reader returns exactly the template's questions)
+    const formattedAnswers = {};
+    const formattedConfidence = {};
 
-        let stderr = '';
-        visualizerProcess.stderr.on('data', (data) => {
-            stderr += data.toString();
-        });
+    for (const questionKey of Object.keys(result.answers)) {
+        formattedAnswers[questionKey] = result.answers[questionKey] || null;
+        formattedConfidence[questionKey] = result.confidence[questionKey] || 0.0;
+    }
 
-        visualizerProcess.on('close', (code) => {
-            if (code !== 0) {
-                console.error('❌ Pipeline visualizer failed:', stderr);
-                reject(new Error(`Pipeline visualizer failed: ${stderr}`));
-            } else {
-                console.log('✅ Pipeline visualization complete');
-                resolve();
-            }
-        });
+    return {
+        answers: formattedAnswers,
+        confidence: formattedConfidence,
+        templateId: result.template || null,
+        // Exam comes from the sheet's QR code; the student number from the QR code
+        // or, failing that, from the bubbled student-number field
+        testId: result.sheet_id?.test_id || null,
+        rollNo: result.roll_no || null,
+        timings: result.timings || null,
+        requestId: result.request_id || null
+    };
+}
 
-        visualizerProcess.on('error', (err) => {
-            reject(new Error(`Failed to start visualizer: ${err.message}`));
-        });
-    });
+const isPoolDisabled = () => process.env.OMR_WORKER_POOL_SIZE === '0';
 
-    // Step 2: Read pipeline images and convert to base64
-    const pipelineImages = {};
-    const imageFiles = [
-        { key: 'a4_detection', file: '1_a4_detection.jpg', label: 'A4 Köşe Algılama' },
-        { key: 'a4_corrected', file: '1_a4_corrected.jpg', label: 'Perspektif Düzeltme' },
-        { key: 'answer_region_marked', file: '2_answer_region_marked.jpg', label: 'Cevap Bölgesi' },
-        { key: 'answer_region_zoomed', file: '2_answer_region_zoomed.jpg', label: 'Cevap Yakınlaştırma' },
-        { key: 'bubble_detection', file: '3_bubble_detection.jpg', label: 'Bubble Algılama' }
-    ];
-
-    for (const img of imageFiles) {
-        const imgPath = path.join(outputDir, img.file);
-        try {
-            if (fs.existsSync(imgPath)) {
-                const imageBuffer = fs.readFileSync(imgPath);
-                pipelineImages[img.key] = {
-                    base64: imageBuffer.toString('base64'),
-                    label: img.label
-                };
-                console.log(`  ✅ Loaded ${img.key}: ${imageBuffer.length} bytes`);
-            } else {
-                console.log(`  ⚠️ Missing ${img.file}`);
-            }
-        } catch (err) {
-            console.error(`  ❌ Error loading ${img.file}:`, err.message);
+/**
+ * Run a reader op on an image given either as a file path or as in-memory bytes
+ * Buffers are sent to the worker as base64 (or piped to the script's stdin), so
+ * live frames never touch the disk.
+ * @param {string} op - Worker op ('read' or 'visualize')
+ * @param {string} scriptName - Script used when the pool is disabled
+ * @param {string|Buffer} image - Image path or encoded JPEG/PNG bytes
+ * @param {Object} [options]
+ * @param {string} [options.requestId] - Echoed back in the result to correlate slow requests
+ * @param {string} [options.sessionId] - Live-scan session; the worker tracks the paper
+ *   corners from the session's previous frame (ignored when the pool is disabled,
+ *   since one-shot scripts keep no state between frames)
+ * @param {boolean} [options.qualityCheck] - Reject blurry/dark/glare/sheet-less frames
+ *   with a cheap thumbnail check before running the pipeline (visualize op only)
+ * @param {string} [options.templateId] - Sheet layout from omr-algorithm's template
+ *   registry (config.TEMPLATES); the default template when omitted
+ * @param {number} [options.numQuestions] - Questions on the exam; only these are read
+ * @returns {Promise<Object>} The reader's JSON result (with per-stage `timings`)
+ */
+async function runReader(op, scriptName, image, { requestId, sessionId, qualityCheck, templateId, numQuestions } = {}) {
+    const inMemory = Buffer.isBuffer(image);
+    let result;
+
+    if (isPoolDisabled()) {
+        const flags = qualityCheck ? ['--json', '--quality-check'] : ['--json'];
+        if (templateId) {
+            flags.push('--template', templateId);
+        }
+        if (numQuestions) {
+            flags.push('--questions', String(numQuestions));
         }
+        result = inMemory
+            ? await runScriptOnce(scriptName, [...flags, '-'], image)
+            : await runScriptOnce(scriptName, [...flags, image]);
+    } else {
+        result = await getWorkerPool().request({
+            op,
+            ...(inMemory ? { image_base64: image.toString('base64') } : { image_path: image }),
+            ...(requestId ? { request_id: requestId } : {}),
+            ...(sessionId ? { session_id: sessionId } : {}),
+            ...(qualityCheck ? { quality_check: true } : {}),
+            ...(templateId ? { template_id: templateId } : {}),
+            ...(numQuestions ? { num_questions: numQuestions } : {})
+        }, { affinity: sessionId });
+    }
+
+    if (requestId && !result.request_id) {
+        result.request_id = requestId;
+    }
+    if (result.timings) {
+        console.log(`⏱️ OMR ${op} [${requestId || '-'}] timings (ms):`, result.timings);
+    }
+    if (result.tracking) {
+        console.log(`🎯 OMR ${op} [${requestId || '-'}] corners ${result.tracking.mode}`);
+    }
+
+    return result;
+}
+
+const describeImage = (image) => Buffer.isBuffer(image) ? `<in-memory, ${image.length} bytes>` : image;
+
+/**
+ * Process OMR image using calibrated answer reader
+ * Sends the image to a warm omr_worker.py process (omr_answer_reader + calibration.json)
+ * @param {string|Buffer} image - Path to the OMR image file or its encoded bytes
+ * @param {Object} [options]
+ * @param {string} [options.requestId] - Request id echoed back with the stage timings
+ * @param {string} [options.templateId] - Sheet template id (the sheet's QR code when QR reading is enabled, then the default template, when omitted)
+ * @param {number} [options.numQuestions] - Questions on the exam; only these are read
+ * @returns {Promise<Object>} Processing result with answers and confidence scores
+ */
+async function processOMRImage(image, { requestId, templateId, numQuestions } = {}) {
+    console.log('🔍 Processing OMR image with calibrated reader...');
+    console.log(' - Image:', describeImage(image));
+
+    ensureCalibration();
+
+    const result = await runReader('read', 'omr_answer_reader.py', image, { requestId, templateId, numQuestions });
+
+    return formatReaderResult(result);
+}
+
+/**
+ * Process OMR image with full pipeline visualization
+ * Reads the answers and renders the pipeline images in a single Python pass
+ * (the image is decoded, detected and warped once), images come back as base64
+ * @param {string|Buffer} image - Path to the OMR image file or its encoded bytes
+ * @param {Object} [options]
+ * @param {string} [options.requestId] - Request id echoed back with the stage timings
+ * @param {string} [options.sessionId] - Live-scan session id; consecutive frames of the
+ *   same session track the paper corners instead of re-detecting them
+ * @param {boolean} [options.qualityCheck] - Run the fast frame-quality gate first
+ * @param {string} [options.templateId] - Sheet template id (the sheet's QR code when QR reading is enabled, then the default template, when omitted)
+ * @param {number} [options.numQuestions] - Questions on the exam; only these are read
+ * @returns {Promise<Object>} Processing result with answers, confidence, and pipeline images;
+ *   a frame rejected by the quality gate returns `{ rejected: true, quality }` instead
+ */
+async function processWithVisualization(image, { requestId, sessionId, qualityCheck, templateId, numQuestions } = {}) {
+    console.log('🎨 Processing OMR with visualization...');
+    console.log(' - Image:', describeImage(image));
+
+    ensureCalibration();
+
+    const result = await runReader('visualize', 'omr_pipeline_visualizer.py', image, {
+        requestId, sessionId, qualityCheck, templateId, numQuestions
+    });
+
+    if (result.quality && !result.quality.ok) {
+        console.log(`⛔ Frame rejected (${result.quality.reason}):`, result.quality.metrics);
+        return {
+            rejected: true,
+            quality: result.quality,
+            timings: result.timings || null,
+            requestId: result.request_id || null
+        };
     }
 
-    // Step 3: Get answers using existing function
-    const answerResult = await processOMRImage(imagePath);
+    const pipelineImages = result.pipeline_images || {};
+    for (const [key, image] of Object.entries(pipelineImages)) {
+        console.log(`  ✅ Rendered ${key}: ${image.base64.length} base64 chars`);
+    }
 
     return {
-        ...answerResult,
-        pipelineImages
+        ...formatReaderResult(result),
+        pipelineImages,
+        tracking: result.tracking || null
     };
 }
 
 module.exports = {
+    getWorkerPool,
     processOMRImage,
     processWithVisualization
 };
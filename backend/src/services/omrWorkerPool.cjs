@@ -0,0 +1,258 @@
+/**
+ * OMR Worker Pool
+ * Keeps a small number of long-lived `omr_worker.py` processes alive and
+ * dispatches line-delimited JSON requests to them, so each scan no longer pays
+ * for interpreter start, OpenCV import and calibration parsing.
+ */
+
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+
+const DEFAULT_POOL_SIZE = parseInt(process.env.OMR_WORKER_POOL_SIZE || '2', 10);
+const DEFAULT_TIMEOUT_MS = 30000;
+
+class OMRWorker {
+    constructor(pool, index) {
+        this.pool = pool;
+        this.index = index;
+        this.pending = new Map();
+        this.ready = false;
+        this.process = null;
+        this.start();
+    }
+
+    start() {
+        const { pythonPath, cwd } = this.pool.options;
+        const script = path.join(cwd, 'omr_worker.py');
+
+        this.ready = false;
+        const child = spawn(pythonPath, [script], {
+            cwd,
+            env: { ...process.env, PYTHONIOENCODING: 'utf-8', PYTHONUNBUFFERED: '1' }
+        });
+        this.process = child;
+
+        const lines = readline.createInterface({ input: child.stdout });
+        lines.on('line', (line) => this.handleLine(line));
+
+        child.stderr.on('data', (data) => {
+            if (this.pool.options.verbose) {
+                console.log(`  📝 OMR worker #${this.index}:`, data.toString().trim());
+            }
+        });
+
+        child.on('exit', (code, signal) => {
+            this.restart(child, new Error(`OMR worker exited with code ${code}`),
+                `exited (code ${code}, signal ${signal})`);
+        });
+
+        child.on('error', (error) => {
+            console.error(`❌ Failed to start OMR worker #${this.index}:`, error.message);
+            this.restart(child, error, 'failed');
+        });
+    }
+
+    /**
+     * Fail the process's pending jobs and start a new one. A failed spawn may
+     * emit 'error' with or without a following 'exit', so only the first
+     * event of a given child process restarts the worker.
+     */
+    restart(child, error, reason) {
+        if (this.process !== child) {
+            return;
+        }
+        this.process = null;
+        this.ready = false;
+        this.failPending(error);
+        // Jobs pinned to this worker must not wait for the restart
+        this.pool.drain();
+        if (!this.pool.closed) {
+            console.error(`⚠️ OMR worker #${this.index} ${reason}, restarting`);
+            setTimeout(() => {
+                if (!this.pool.closed) {
+                    this.start();
+                }
+            }, 1000);
+        }
+    }
+
+    handleLine(line) {
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (error) {
+            console.error(`⚠️ OMR worker #${this.index} sent invalid JSON:`, line);
+            return;
+        }
+
+        if (message.event === 'ready') {
+            this.ready = true;
+            this.pool.drain();
+            return;
+        }
+
+        const entry = this.pending.get(message.id);
+        if (!entry) {
+            return;
+        }
+
+        clearTimeout(entry.timeoutId);
+        this.pending.delete(message.id);
+
+        if (message.ok) {
+            entry.resolve(message.result);
+        } else {
+            entry.reject(new Error(message.error || 'OMR worker error'));
+        }
+
+        this.pool.drain();
+    }
+
+    send(job) {
+        job.sentTo = this;
+        this.pending.set(job.payload.id, job);
+        this.process.stdin.write(JSON.stringify(job.payload) + '\n');
+    }
+
+    /**
+     * Drop a job whose deadline passed while this worker was processing it.
+     * A stuck worker would block the next request, so it is restarted.
+     */
+    abandon(job) {
+        this.pending.delete(job.payload.id);
+        if (this.process) {
+            this.process.kill();
+        }
+    }
+
+    failPending(error) {
+        for (const entry of this.pending.values()) {
+            clearTimeout(entry.timeoutId);
+            entry.reject(error);
+        }
+        this.pending.clear();
+    }
+
+    isAlive() {
+        return this.process !== null;
+    }
+
+    isIdle() {
+        return this.ready && this.process && this.pending.size === 0;
+    }
+
+    stop() {
+        if (this.process) {
+            this.process.stdin.write(JSON.stringify({ id: 'shutdown', op: 'shutdown' }) + '\n');
+            this.process.stdin.end();
+        }
+    }
+}
+
+class OMRWorkerPool {
+    constructor(options) {
+        this.options = {
+            size: DEFAULT_POOL_SIZE,
+            pythonPath: 'python',
+            verbose: false,
+            ...options
+        };
+        this.workers = [];
+        this.queue = [];
+        this.nextId = 1;
+        this.closed = false;
+    }
+
+    ensureStarted() {
+        if (this.workers.length === 0) {
+            for (let i = 0; i < this.options.size; i++) {
+                this.workers.push(new OMRWorker(this, i));
+            }
+        }
+    }
+
+    /**
+     * Send a request to the first idle worker (queued if all are busy)
+     * @param {Object} payload - Request body, e.g. { op: 'read', image_path }
+     * @param {Object} [options]
+     * @param {number} [options.timeout] - Per-request timeout in milliseconds
+     * @param {string} [options.affinity] - Requests with the same key always go to
+     *   the same worker (e.g. a live-scan session whose corner tracking state
+     *   lives in that worker process)
+     * @returns {Promise<Object>} The worker's `result` object
+     *
+     * The timeout runs from the moment the request is queued, so a request
+     * waiting for a busy or restarting worker still fails after `timeout`.
+     */
+    request(payload, { timeout = DEFAULT_TIMEOUT_MS, affinity } = {}) {
+        this.ensureStarted();
+
+        return new Promise((resolve, reject) => {
+            const id = String(this.nextId++);
+            const worker = affinity ? this.workers[this.workerIndexFor(affinity)] : null;
+            const job = { payload: { ...payload, id }, resolve, reject, timeout, worker, sentTo: null };
+
+            job.timeoutId = setTimeout(() => {
+                if (job.sentTo) {
+                    job.sentTo.abandon(job);
+                } else {
+                    this.queue = this.queue.filter(queued => queued !== job);
+                }
+                reject(new Error(`OMR processing timeout after ${timeout / 1000} seconds`));
+            }, timeout);
+
+            this.queue.push(job);
+            this.drain();
+        });
+    }
+
+    workerIndexFor(key) {
+        let hash = 0;
+        for (const char of String(key)) {
+            hash = (hash * 31 + char.charCodeAt(0)) >>> 0;
+        }
+        return hash % this.workers.length;
+    }
+
+    drain() {
+        let i = 0;
+        while (i < this.queue.length) {
+            const job = this.queue[i];
+            if (job.worker && !job.worker.isAlive()) {
+                // Pinned worker died and is restarting: its session state is
+                // gone anyway, so let any idle worker take the job
+                job.worker = null;
+            }
+            const worker = job.worker
+                ? (job.worker.isIdle() ? job.worker : null)
+                : this.workers.find(w => w.isIdle());
+
+            if (!worker) {
+                if (!job.worker) {
+                    return;
+                }
+                // Pinned worker is busy; unpinned jobs behind it may still run
+                i++;
+                continue;
+            }
+            this.queue.splice(i, 1);
+            worker.send(job);
+        }
+    }
+
+    close() {
+        this.closed = true;
+        for (const job of this.queue) {
+            clearTimeout(job.timeoutId);
+            job.reject(new Error('OMR worker pool closed'));
+        }
+        this.queue = [];
+        this.workers.forEach(w => w.stop());
+        this.workers = [];
+    }
+}
+
+module.exports = {
+    OMRWorkerPool
+};
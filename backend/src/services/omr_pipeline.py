@@ -2,7 +2,7 @@
 Two-Stage OMR Pipeline
 1. Perspective correction 
 2. Bubble detection using proven omr_reader.py logic
-Returns only first 10 questions
+Reads only the sheet's NUM_QUESTIONS questions
 """
 
 import cv2
@@ -11,6 +11,8 @@ import json
 import sys
 from pathlib import Path
 
+from stage_timer import StageTimer
+
 # Configuration - matching working omr_reader.py
 NUM_QUESTIONS = 10  # We want 10 questions
 GRID_COLS = 5  # 5 columns (matches omr_reader)
@@ -31,6 +33,13 @@ ROI_Y_END = 0.92
 ROI_X_START = 0.04
 ROI_X_END = 0.96
 
+# Adaptive threshold block size; the threshold (block // 2) and the two 3x3
+# morphology passes (close + open, 1 px per dilate/erode step, so 4 px) read
+# this far outside a pixel, so the region is warped with that margin and each
+# question's bubble window is thresholded with that padding (see threshold_window)
+THRESH_BLOCK_SIZE = 15
+ROI_MARGIN = THRESH_BLOCK_SIZE // 2 + 4
+
 
 def order_points(pts):
     """Order 4 corner points: top-left, top-right, bottom-right, bottom-left"""
@@ -48,8 +57,8 @@ def order_points(pts):
 
 
 def find_paper_contour(image):
-    """Find paper boundaries in image"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    """Find paper boundaries in image (BGR or already grayscale)"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
     blurred = cv2.GaussianBlur(gray, (5, 5), 0)
     edges = cv2.Canny(blurred, 50, 150)
     
@@ -86,8 +95,11 @@ def find_paper_contour(image):
 def correct_perspective(image):
     """Apply perspective correction to image"""
     # Find paper contour
-    corners = find_paper_contour(image)
-    
+    return warp_to_target(image, find_paper_contour(image))
+
+
+def perspective_matrix(image, corners):
+    """Homography from the sheet `corners` to the TARGET_WIDTH x TARGET_HEIGHT page"""
     if corners is None:
         # If no contour found, use entire image
         h, w = image.shape[:2]
@@ -105,7 +117,12 @@ def correct_perspective(image):
     ], dtype="float32")
     
     # Get perspective transform matrix
-    M = cv2.getPerspectiveTransform(rect, dst)
+    return cv2.getPerspectiveTransform(rect, dst)
+
+
+def warp_to_target(image, corners):
+    """Warp the sheet given by `corners` to TARGET_WIDTH x TARGET_HEIGHT"""
+    M = perspective_matrix(image, corners)
     
     # Apply perspective transformation
     warped = cv2.warpPerspective(image, M, (TARGET_WIDTH, TARGET_HEIGHT))
@@ -113,17 +130,44 @@ def correct_perspective(image):
     return warped
 
 
-def detect_bubbles(warped_image):
-    """Detect filled bubbles in warped OMR sheet - using working omr_reader logic"""
-    # Convert to grayscale
-    gray = cv2.cvtColor(warped_image, cv2.COLOR_BGR2GRAY)
+def warp_answer_region(gray, corners, margin=0):
+    """Warp only the answer region (plus `margin` pixels around it) of a grayscale sheet
+
+    The ROI crop is folded into the homography as a translation, so
+    warpPerspective produces just the answer-region pixels in one channel
+    instead of the full colour page.
+    """
+    x1 = int(TARGET_WIDTH * ROI_X_START) - margin
+    y1 = int(TARGET_HEIGHT * ROI_Y_START) - margin
+    x2 = int(TARGET_WIDTH * ROI_X_END) + margin
+    y2 = int(TARGET_HEIGHT * ROI_Y_END) + margin
+    
+    crop = np.array([
+        [1, 0, -x1],
+        [0, 1, -y1],
+        [0, 0, 1]
+    ], dtype=np.float64)
+    
+    M = crop @ perspective_matrix(gray, corners)
+    return cv2.warpPerspective(gray, M, (x2 - x1, y2 - y1))
+
+
+def threshold_window(region, x1, y1, x2, y2, margin=ROI_MARGIN):
+    """Threshold and clean up only the answer-region box (x1, y1)-(x2, y2)
+
+    `region` carries `margin` pixels around the answer region, so the box is
+    processed together with its full threshold/morphology neighbourhood and
+    the returned (y2 - y1) x (x2 - x1) binary patch equals the same pixels of
+    a whole-region threshold.
+    """
+    patch = region[y1:y2 + 2 * margin, x1:x2 + 2 * margin]
     
     # Apply adaptive thresholding (same as omr_reader)
     thresh = cv2.adaptiveThreshold(
-        gray, 255,
+        patch, 255,
         cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
         cv2.THRESH_BINARY_INV,
-        15, 3
+        THRESH_BLOCK_SIZE, 3
     )
     
     # Morphological operations
@@ -131,28 +175,26 @@ def detect_bubbles(warped_image):
     thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=1)
     thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
     
-    # Extract ROI
-    h, w = thresh.shape
-    roi_y1 = int(h * ROI_Y_START)
-    roi_y2 = int(h * ROI_Y_END)
-    roi_x1 = int(w * ROI_X_START)
-    roi_x2 = int(w * ROI_X_END)
-    
-    roi = thresh[roi_y1:roi_y2, roi_x1:roi_x2]
-    roi_h, roi_w = roi.shape
-    
+    # Drop the padding
+    return thresh[margin:margin + y2 - y1, margin:margin + x2 - x1]
+
+
+def bubble_boxes(roi_w, roi_h):
+    """Per-question bubble boxes (x1, y1, x2, y2) in answer-region coordinates
+
+    Returns:
+        {q_num: [(option, box), ...]} for the sheet's NUM_QUESTIONS questions
+    """
     # Calculate grid parameters (5 columns x 10 rows like omr_reader)
     col_width = roi_w / GRID_COLS
     row_height = roi_h / GRID_ROWS
     option_width = col_width / len(OPTIONS)
+    bubble_radius = min(int(option_width * 0.3), int(row_height * 0.25))
     
-    all_answers = {}
-    all_confidence = {}
-    
-    # Process all 50 questions but return only first 10
-    total_questions = GRID_COLS * GRID_ROWS  # 50
-    
-    for q_num in range(1, total_questions + 1):
+    boxes = {}
+    # Only the sheet's questions are sampled (the grid has room for
+    # GRID_COLS * GRID_ROWS, the sheet carries NUM_QUESTIONS)
+    for q_num in range(1, NUM_QUESTIONS + 1):
         # Calculate grid position (5 columns)
         col = (q_num - 1) // GRID_ROWS
         row = (q_num - 1) % GRID_ROWS
@@ -161,26 +203,60 @@ def detect_bubbles(warped_image):
         x_start = int(col * col_width)
         y_center = int((row + 0.5) * row_height)
         
-        # Measure fill ratio for each option
-        fill_ratios = {}
+        boxes[q_num] = []
         for opt_idx, option in enumerate(OPTIONS):
             opt_x = int(x_start + (opt_idx + 0.5) * option_width)
-            
-            # Define bubble region
-            bubble_radius = min(int(option_width * 0.3), int(row_height * 0.25))
-            
-            y1 = max(0, y_center - bubble_radius)
-            y2 = min(roi_h, y_center + bubble_radius)
-            x1 = max(0, opt_x - bubble_radius)
-            x2 = min(roi_w, opt_x + bubble_radius)
-            
-            bubble = roi[y1:y2, x1:x2]
+            boxes[q_num].append((option, (
+                max(0, opt_x - bubble_radius),
+                max(0, y_center - bubble_radius),
+                min(roi_w, opt_x + bubble_radius),
+                min(roi_h, y_center + bubble_radius),
+            )))
+    return boxes
+
+
+def detect_bubbles(region, lap=None, margin=ROI_MARGIN):
+    """Detect filled bubbles in the warped answer region - using working omr_reader logic
+
+    `region` is the grayscale answer region from warp_answer_region, including
+    `margin` pixels on each side. Only a padded window around each question's
+    bubbles is thresholded; pixels elsewhere in the region are never read.
+    `lap(stage_name)` is called after each stage when given (see process_omr_image)
+    """
+    lap = lap or (lambda name: None)
+    
+    h, w = region.shape
+    boxes = bubble_boxes(w - 2 * margin, h - 2 * margin)
+    
+    # Threshold each question's bubble window (answer-region coordinates)
+    windows = {}
+    for q_num, options in boxes.items():
+        wx1 = min(box[0] for _, box in options)
+        wy1 = min(box[1] for _, box in options)
+        wx2 = max(box[2] for _, box in options)
+        wy2 = max(box[3] for _, box in options)
+        windows[q_num] = (wx1, wy1, threshold_window(region, wx1, wy1, wx2, wy2, margin))
+    lap("threshold")
+    
+    # Measure fill ratio for each option
+    fills = {}
+    for q_num, options in boxes.items():
+        wx1, wy1, window = windows[q_num]
+        
+        fill_ratios = fills[q_num] = {}
+        for option, (x1, y1, x2, y2) in options:
+            bubble = window[y1 - wy1:y2 - wy1, x1 - wx1:x2 - wx1]
             
             if bubble.size > 0:
                 fill_ratios[option] = np.sum(bubble == 255) / bubble.size
             else:
                 fill_ratios[option] = 0
-        
+    lap("sampling")
+    
+    answers = {}
+    confidence = {}
+    
+    for q_num, fill_ratios in fills.items():
         # Find marked answer
         max_fill = max(fill_ratios.values())
         sorted_fills = sorted(fill_ratios.values(), reverse=True)
@@ -190,42 +266,51 @@ def detect_bubbles(warped_image):
                 separation = max_fill - sorted_fills[1]
                 if separation >= MIN_SEPARATION:
                     marked_option = max(fill_ratios, key=fill_ratios.get)
-                    all_answers[q_num] = marked_option
-                    all_confidence[q_num] = float(max_fill)
+                    answers[q_num] = marked_option
+                    confidence[q_num] = float(max_fill)
                 else:
-                    all_answers[q_num] = None
-                    all_confidence[q_num] = 0.5
+                    answers[q_num] = None
+                    confidence[q_num] = 0.5
             else:
                 marked_option = max(fill_ratios, key=fill_ratios.get)
-                all_answers[q_num] = marked_option
-                all_confidence[q_num] = float(max_fill)
+                answers[q_num] = marked_option
+                confidence[q_num] = float(max_fill)
         else:
-            all_answers[q_num] = None
-            all_confidence[q_num] = 0.0
+            answers[q_num] = None
+            confidence[q_num] = 0.0
     
-    # Return only first 10 questions
-    answers = {i: all_answers.get(i) for i in range(1, NUM_QUESTIONS + 1)}
-    confidence = {i: all_confidence.get(i, 0.0) for i in range(1, NUM_QUESTIONS + 1)}
+    lap("decision")
     
     return answers, confidence
 
 
-def process_omr_image(image_path):
-    """Main pipeline: perspective correction + bubble detection"""
+def process_omr_image(image_path, request_id=None):
+    """Main pipeline: perspective correction + bubble detection
+
+    The result carries a per-stage `timings` breakdown in milliseconds and
+    echoes `request_id` (e.g. passed from Node) when one is given.
+    """
+    timer = StageTimer(request_id)
+    
     try:
         # Load image
         image = cv2.imread(image_path)
         if image is None:
-            return {
+            return timer.attach({
                 "success": False,
                 "error": "Failed to load image"
-            }
+            })
+        timer.lap("decode")
         
-        # Stage 1: Perspective correction
-        warped = correct_perspective(image)
+        # Stage 1: Perspective correction (grayscale, answer region only)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        corners = find_paper_contour(gray)
+        timer.lap("detect")
+        region = warp_answer_region(gray, corners, ROI_MARGIN)
+        timer.lap("warp")
         
         # Stage 2: Bubble detection
-        answers, confidence = detect_bubbles(warped)
+        answers, confidence = detect_bubbles(region, timer.lap)
         
         # Calculate average confidence
         valid_confidences = [c for c in confidence.values() if c > 0]
@@ -234,21 +319,21 @@ def process_omr_image(image_path):
         # Check if validation needed
         requires_validation = avg_confidence < 0.6 or any(c < 0.5 for c in confidence.values() if c > 0)
         
-        return {
+        return timer.attach({
             "success": True,
             "answers": answers,
             "confidence": confidence,
             "requires_validation": requires_validation,
             "question_count": NUM_QUESTIONS
-        }
+        })
         
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return {
+        return timer.attach({
             "success": False,
             "error": str(e)
-        }
+        })
 
 
 if __name__ == "__main__":
@@ -257,5 +342,6 @@ if __name__ == "__main__":
         sys.exit(1)
     
     image_path = sys.argv[1]
-    result = process_omr_image(image_path)
+    request_id = sys.argv[sys.argv.index("--request-id") + 1] if "--request-id" in sys.argv else None
+    result = process_omr_image(image_path, request_id=request_id)
     print(json.dumps(result))
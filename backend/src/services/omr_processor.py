@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
-OMR Processor - Grid-based approach for 50 questions
-Focuses ONLY on the question grid area (1-50, A-D options)
+OMR Processor - Grid-based approach
+Focuses ONLY on the question grid area; the question count, grid and options
+come from omr_template_config.json
 """
 
 import cv2
@@ -10,13 +11,34 @@ import json
 import sys
 from pathlib import Path
 
+from stage_timer import StageTimer
+
+# Sheet layout shared with the rest of the backend; its keys override the
+# processor defaults below
+TEMPLATE_CONFIG_PATH = Path(__file__).parent / "omr_template_config.json"
+
+# Adaptive threshold block size; the threshold (block // 2) and the 2x2
+# close + open passes (1 px per dilate/erode step, so 4 px) read this far
+# around a pixel, so only the question grid padded by THRESH_PAD is thresholded
+THRESH_BLOCK_SIZE = 15
+THRESH_PAD = THRESH_BLOCK_SIZE // 2 + 4
+
+
+def load_template_config(path=TEMPLATE_CONFIG_PATH):
+    """Read the sheet layout JSON, or an empty dict when it does not exist"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
 
 class OMRProcessor:
-    """Processes OMR answer sheets - 50 questions, 4 options each"""
+    """Processes OMR answer sheets laid out by omr_template_config.json"""
     
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, template_path=TEMPLATE_CONFIG_PATH):
         self.debug = debug
-        # Configuration for 10-question sheet (2 columns x 5 rows)
+        # Defaults for the 10-question sheet (2 columns x 5 rows)
         self.config = {
             "num_questions": 10,
             "options": ["A", "B", "C", "D"],
@@ -27,78 +49,103 @@ class OMRProcessor:
             "target_height": 1000,
             "grid_cols": 2,  # 2 columns
             "grid_rows": 5,  # 5 rows
+            # Question grid: questions start around 35% from top, go to 90%
+            "roi": {"x_start": 0.05, "x_end": 0.95, "y_start": 0.35, "y_end": 0.90},
         }
+        self.config.update(load_template_config(template_path))
+        
+    def process_image(self, image_path, request_id=None):
+        """Main processing function
+
+        The result carries a per-stage `timings` breakdown in milliseconds and
+        echoes `request_id` (e.g. passed from Node) when one is given.
+        """
+        timer = StageTimer(request_id)
         
-    def process_image(self, image_path):
-        """Main processing function"""
         try:
             # Load image
             image = cv2.imread(str(image_path))
             if image is None:
                 raise ValueError(f"Failed to load image: {image_path}")
+            timer.lap("decode")
             
             if self.debug:
                 cv2.imwrite("debug_01_original.jpg", image)
             
             # Preprocess
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            warped = self._warp_perspective(gray)
+            rect = self._find_sheet_corners(gray)
+            timer.lap("detect")
+            warped = self._warp_perspective(gray, rect)
+            timer.lap("warp")
             
-            # Improved adaptive thresholding
-            thresh = cv2.adaptiveThreshold(
-                warped, 255, 
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY_INV, 
-                15, 3  # Better contrast
-            )
+            # Define question grid ROI (Region of Interest) from the template
+            roi_box = self.config["roi"]
+            roi_y_start = int(warped.shape[0] * roi_box["y_start"])
+            roi_y_end = int(warped.shape[0] * roi_box["y_end"])
+            roi_x_start = int(warped.shape[1] * roi_box["x_start"])
+            roi_x_end = int(warped.shape[1] * roi_box["x_end"])
             
-            # Morphological operations - reduce noise and strengthen marks
-            kernel = np.ones((2, 2), np.uint8)
-            thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-            thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+            # Threshold only the ROI plus THRESH_PAD around it (clipped to the
+            # page); the ROI pixels come out the same as thresholding the page
+            pad_y1 = max(0, roi_y_start - THRESH_PAD)
+            pad_y2 = min(warped.shape[0], roi_y_end + THRESH_PAD)
+            pad_x1 = max(0, roi_x_start - THRESH_PAD)
+            pad_x2 = min(warped.shape[1], roi_x_end + THRESH_PAD)
+            thresh = self._threshold(warped[pad_y1:pad_y2, pad_x1:pad_x2])
+            timer.lap("threshold")
             
             if self.debug:
                 cv2.imwrite("debug_02_warped.jpg", warped)
                 cv2.imwrite("debug_03_threshold.jpg", thresh)
             
-            # Define question grid ROI (Region of Interest)
-            # Based on template: questions start around 35% from top, go to 90%
-            roi_y_start = int(warped.shape[0] * 0.35)
-            roi_y_end = int(warped.shape[0] * 0.90)
-            roi_x_start = int(warped.shape[1] * 0.05)
-            roi_x_end = int(warped.shape[1] * 0.95)
-            
             # Extract ROI
-            roi = thresh[roi_y_start:roi_y_end, roi_x_start:roi_x_end]
+            roi = thresh[roi_y_start - pad_y1:roi_y_end - pad_y1, roi_x_start - pad_x1:roi_x_end - pad_x1]
             roi_gray = warped[roi_y_start:roi_y_end, roi_x_start:roi_x_end]
+            timer.lap("roi")
             
             if self.debug:
                 cv2.imwrite("debug_04_roi.jpg", roi)
             
             # Detect bubbles in ROI using grid approach
-            answers, confidence = self._extract_answers_grid(roi, roi_gray)
+            answers, confidence = self._extract_answers_grid(roi, roi_gray, timer.lap)
             
-            return {
+            return timer.attach({
                 "success": True,
                 "answers": answers,
                 "confidence": confidence,
                 "requires_validation": any(c < self.config["confidence_threshold"] 
                                          for c in confidence.values() if c > 0),
                 "question_count": self.config["num_questions"]
-            }
+            })
             
         except Exception as e:
             import traceback
             traceback.print_exc()
-            return {
+            return timer.attach({
                 "success": False,
                 "error": str(e),
                 "answers": {},
                 "confidence": {}
-            }
+            })
     
-    def _warp_perspective(self, gray_image):
-        """Warp perspective to fix skew"""
+    def _threshold(self, gray_image):
+        """Adaptive threshold plus noise clean-up (marks become 255)"""
+        # Improved adaptive thresholding
+        thresh = cv2.adaptiveThreshold(
+            np.ascontiguousarray(gray_image), 255, 
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+            cv2.THRESH_BINARY_INV, 
+            THRESH_BLOCK_SIZE, 3  # Better contrast
+        )
+        
+        # Morphological operations - reduce noise and strengthen marks
+        kernel = np.ones((2, 2), np.uint8)
+        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+        return cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+    
+    def _find_sheet_corners(self, gray_image):
+        """Find the sheet's four corners (ordered), or None"""
         blurred = cv2.GaussianBlur(gray_image, (5, 5), 0)
         edged = cv2.Canny(blurred, 50, 150)
         
@@ -111,20 +158,25 @@ class OMRProcessor:
             
             if len(approx) == 4:
                 pts = approx.reshape(4, 2)
-                rect = self._order_points(pts)
-                
-                dst = np.array([
-                    [0, 0],
-                    [self.config["target_width"] - 1, 0],
-                    [self.config["target_width"] - 1, self.config["target_height"] - 1],
-                    [0, self.config["target_height"] - 1]
-                ], dtype="float32")
-                
-                M = cv2.getPerspectiveTransform(rect, dst)
-                warped = cv2.warpPerspective(gray_image, M, 
-                                            (self.config["target_width"], 
-                                             self.config["target_height"]))
-                return warped
+                return self._order_points(pts)
+        
+        return None
+    
+    def _warp_perspective(self, gray_image, rect):
+        """Warp perspective to fix skew (plain resize when no corners were found)"""
+        if rect is not None:
+            dst = np.array([
+                [0, 0],
+                [self.config["target_width"] - 1, 0],
+                [self.config["target_width"] - 1, self.config["target_height"] - 1],
+                [0, self.config["target_height"] - 1]
+            ], dtype="float32")
+            
+            M = cv2.getPerspectiveTransform(rect, dst)
+            warped = cv2.warpPerspective(gray_image, M, 
+                                        (self.config["target_width"], 
+                                         self.config["target_height"]))
+            return warped
         
         return cv2.resize(gray_image, (self.config["target_width"], 
                                        self.config["target_height"]))
@@ -140,20 +192,20 @@ class OMRProcessor:
         rect[3] = pts[np.argmax(diff)]
         return rect
     
-    def _extract_answers_grid(self, thresh_roi, gray_roi):
+    def _extract_answers_grid(self, thresh_roi, gray_roi, lap=None):
         """
         Extract answers using grid-based approach
-        Questions are arranged in 5 columns × 10 rows
+        Questions are arranged in grid_cols columns × grid_rows rows
+        `lap(stage_name)` is called after sampling and after the decision when given
         """
-        answers = {}
-        confidence = {}
+        lap = lap or (lambda name: None)
         
         height, width = thresh_roi.shape
         
-        # Grid structure: 2 columns x 5 rows (Questions 1-10)
+        # Grid structure from the template (default 2 columns x 5 rows)
         num_cols = self.config["grid_cols"]
         num_rows = self.config["grid_rows"]
-        num_options = 4  # A, B, C, D
+        num_options = len(self.config["options"])
         
         # Calculate grid dimensions
         col_width = width / num_cols
@@ -167,6 +219,7 @@ class OMRProcessor:
             debug_img = cv2.cvtColor(gray_roi, cv2.COLOR_GRAY2BGR)
         
         question_num = 1
+        fills = {}
         
         # Iterate through grid
         for col in range(num_cols):
@@ -174,7 +227,7 @@ class OMRProcessor:
                 if question_num > self.config["num_questions"]:
                     break
                 
-                option_fills = {}
+                option_fills = fills[question_num] = {}
                 
                 # Base position for this question
                 base_x = int(col * col_width)
@@ -215,36 +268,6 @@ class OMRProcessor:
                         cv2.putText(debug_img, f"{option}", (x1, y1-2), 
                                   cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
                 
-                # Determine answer with improved confidence
-                if option_fills:
-                    max_fill = max(option_fills.values())
-                    
-                    # Calculate separation between top two marks
-                    fills_sorted = sorted(option_fills.values(), reverse=True)
-                    separation = fills_sorted[0] - fills_sorted[1] if len(fills_sorted) > 1 else fills_sorted[0]
-                    
-                    # Strict detection criteria
-                    if max_fill > self.config["bubble_threshold"] and separation > self.config["min_separation"]:
-                        marked_option = max(option_fills, key=option_fills.get)
-                        answers[question_num] = marked_option
-                        
-                        # Enhanced confidence calculation
-                        base_confidence = min(1.0, max_fill / self.config["bubble_threshold"])
-                        separation_boost = 1.0 + (separation * 2)
-                        conf = min(1.0, base_confidence * separation_boost * 0.6)
-                        confidence[question_num] = conf
-                    elif max_fill > self.config["bubble_threshold"]:
-                        # Threshold passed but low separation
-                        marked_option = max(option_fills, key=option_fills.get)
-                        answers[question_num] = marked_option
-                        confidence[question_num] = 0.5
-                    else:
-                        answers[question_num] = None
-                        confidence[question_num] = 1.0 - max_fill
-                else:
-                    answers[question_num] = None
-                    confidence[question_num] = 0.0
-                
                 # Add question number to debug image
                 if self.debug:
                     cv2.putText(debug_img, f"Q{question_num}", 
@@ -253,6 +276,44 @@ class OMRProcessor:
                 
                 question_num += 1
         
+        lap("sampling")
+        
+        answers = {}
+        confidence = {}
+        
+        for question_num, option_fills in fills.items():
+            # Determine answer with improved confidence
+            if option_fills:
+                max_fill = max(option_fills.values())
+                
+                # Calculate separation between top two marks
+                fills_sorted = sorted(option_fills.values(), reverse=True)
+                separation = fills_sorted[0] - fills_sorted[1] if len(fills_sorted) > 1 else fills_sorted[0]
+                
+                # Strict detection criteria
+                if max_fill > self.config["bubble_threshold"] and separation > self.config["min_separation"]:
+                    marked_option = max(option_fills, key=option_fills.get)
+                    answers[question_num] = marked_option
+                    
+                    # Enhanced confidence calculation
+                    base_confidence = min(1.0, max_fill / self.config["bubble_threshold"])
+                    separation_boost = 1.0 + (separation * 2)
+                    conf = min(1.0, base_confidence * separation_boost * 0.6)
+                    confidence[question_num] = conf
+                elif max_fill > self.config["bubble_threshold"]:
+                    # Threshold passed but low separation
+                    marked_option = max(option_fills, key=option_fills.get)
+                    answers[question_num] = marked_option
+                    confidence[question_num] = 0.5
+                else:
+                    answers[question_num] = None
+                    confidence[question_num] = 1.0 - max_fill
+            else:
+                answers[question_num] = None
+                confidence[question_num] = 0.0
+        
+        lap("decision")
+        
         if self.debug:
             cv2.imwrite("debug_05_grid_annotated.jpg", debug_img)
         
@@ -261,14 +322,15 @@ class OMRProcessor:
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python omr_processor.py <image_path> [--debug]")
+        print("Usage: python omr_processor.py <image_path> [--debug] [--request-id ID]")
         sys.exit(1)
     
     image_path = sys.argv[1]
     debug = "--debug" in sys.argv
+    request_id = sys.argv[sys.argv.index("--request-id") + 1] if "--request-id" in sys.argv else None
     
     processor = OMRProcessor(debug=debug)
-    result = processor.process_image(image_path)
+    result = processor.process_image(image_path, request_id=request_id)
     
     print(json.dumps(result, indent=2))
 
@@ -0,0 +1,50 @@
+"""
+Stage Timer
+Per-stage duration breakdown ("timings") for the backend OMR scripts.
+
+The backend image ships without omr-algorithm, so this mirrors its
+timing.StageTimer: lap() is called at the end of each stage and records the
+time since the previous lap (or the start) in milliseconds; repeated names
+add up. Each lap is a single time.perf_counter() call.
+
+Usage:
+    timer = StageTimer(request_id)
+    image = cv2.imread(path)
+    timer.lap("decode")
+    ...
+    timer.attach(result)   # result["timings"] = {"decode_ms": 3.1, ..., "total_ms": 41.7}
+"""
+
+import time
+
+
+class StageTimer:
+    """Collects stage durations and attaches them to a result as timings / request_id"""
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.stages = {}
+
+    def lap(self, name):
+        """Add the time since the last lap to stage `name`"""
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+    def skip(self):
+        """Drop the time since the last lap (e.g. debug image writes)"""
+        self.last = time.perf_counter()
+
+    def as_dict(self):
+        timings = {f"{name}_ms": round(ms, 2) for name, ms in self.stages.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return timings
+
+    def attach(self, result):
+        """Add timings (and request_id when given) to the result and return it"""
+        result["timings"] = self.as_dict()
+        if self.request_id is not None:
+            result["request_id"] = self.request_id
+        return result
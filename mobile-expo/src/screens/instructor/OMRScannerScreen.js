@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
     View,
     Text,
@@ -20,6 +20,14 @@ import api from '../../utils/api';
 import { Picker } from '@react-native-picker/picker';
 import SimpleOMRScanner from '../../components/SimpleOMRScanner';
 
+// Backend frame-quality gate reasons -> what the user should fix
+const FRAME_QUALITY_HINTS = {
+    too_dark: 'The photo is too dark. Move to a brighter place and try again.',
+    no_sheet: 'No answer sheet found. Fit the whole form inside the frame.',
+    glare: 'There is glare on the sheet. Change the angle of the light.',
+    blurry: 'The photo is blurry. Hold the phone steady and retake it.'
+};
+
 const OMRScannerScreen = ({ navigation, route }) => {
     const [permission, requestPermission] = useCameraPermissions();
     const [cameraRef, setCameraRef] = useState(null);
@@ -27,6 +35,8 @@ const OMRScannerScreen = ({ navigation, route }) => {
     const [uploading, setUploading] = useState(false);
     const [processing, setProcessing] = useState(false);
     const [liveDetectionMode, setLiveDetectionMode] = useState(false); // Yeni state
+    // Live-scan session: backend tracks the paper corners between our frames
+    const scanSessionId = useRef(`scan-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`);
 
     // Get quiz from route params
     const { quizId, quizTitle } = route.params || {};
@@ -188,12 +198,23 @@ const OMRScannerScreen = ({ navigation, route }) => {
 
             // Send as simple JSON
             const response = await api.post('/api/omr/process-frame-live', {
-                imageBase64: manipResult.base64
+                imageBase64: manipResult.base64,
+                sessionId: scanSessionId.current
             });
 
             console.log('✅ Response received:', response.data);
 
             if (!response.data.success) {
+                // Rejected by the quality check before processing: ask for a retake
+                if (response.data.reason) {
+                    setUploading(false);
+                    setProcessing(false);
+                    Alert.alert(
+                        'Retake Photo',
+                        FRAME_QUALITY_HINTS[response.data.reason] || response.data.error
+                    );
+                    return;
+                }
                 throw new Error(response.data.error || 'Processing failed');
             }
 
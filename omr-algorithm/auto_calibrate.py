@@ -0,0 +1,252 @@
+"""
+Otomatik Kalibrasyon
+Boş bir form fotoğrafından kalibrasyon dosyasını tıklamasız üretir:
+
+    1. Kağıt bulunur, perspektif düzeltilir, cevap bölgesi (ROI) çıkarılır
+       (okuyucuyla aynı prepare_sheet; ROI koordinatları birebir aynı)
+    2. Otsu eşiği + bağlı bileşenlerle tüm bubble halkaları bulunur
+    3. Satırlara gruplanıp afin kafes uydurulur (bkz. lattice); eksik /
+       gürültülü bubble'lar kafesten analitik olarak tamamlanır
+    4. Sürümlü calibration.json yazılır, okuyucuların hızlı yolu için
+       derlenmiş calibration.npz üretilir ve boş formda hiçbir şıkkın
+       işaretli okunmadığı doğrulanır (örnekleme yarıçapı şablon eşiğidir,
+       thresholds["bubble_radius"]; kalibrasyona yazılmaz)
+
+Kullanım:
+    python auto_calibrate.py <boş_form> [--template ID] [--questions N] [--order column|row] [--output yol]
+
+    --template:  Form şablonu (config.TEMPLATES); sayfa / cevap bölgesi, varsayılan
+                 soru sayısı, sıralama ve çıktı dosyası şablondan gelir
+    --questions: Kalibre edilecek soru sayısı (varsayılan: şablonun soru sayısı)
+    --order:     column = sorular blok blok yukarıdan aşağı (1-5 ilk blok),
+                 row = satır satır soldan sağa
+    --output:    Kalibrasyon dosyası (varsayılan: şablonun kalibrasyonu)
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+from calibration_store import CALIBRATION_VERSION, OPTIONS, get_calibration
+from candidates import bubble_candidates
+from lattice import fit_rows, group_rows, lattice_indices, predict
+from omr_answer_reader import load_image, prepare_sheet, read_answers_from_roi, set_log_mode
+from templates import get_template
+
+# Bubble yarıçap aralığı (ROI genişliğine oranla)
+MIN_RADIUS_RATIO = 1 / 150.0
+MAX_RADIUS_RATIO = 1 / 25.0
+MIN_CIRCULARITY = 0.6
+
+# Satır gruplama toleransı (ROI yüksekliğine oranla)
+ROW_TOLERANCE_RATIO = 0.015
+
+
+def detect_blank_bubbles(roi):
+    """
+    Boş formun ROI'sindeki bubble halkalarını bul
+
+    Returns:
+        [(cx, cy, radius), ...]
+    """
+    width = roi.shape[1]
+    blurred = cv2.GaussianBlur(roi, (5, 5), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    return bubble_candidates(
+        binary,
+        max(3, int(width * MIN_RADIUS_RATIO)),
+        int(width * MAX_RADIUS_RATIO),
+        MIN_CIRCULARITY,
+    )
+
+
+def build_calibration(fit, num_questions=None, order="column"):
+    """
+    Kafes modelinden {soru_no: {şık: {"x", "y"}}} sözlüğü
+
+    Args:
+        fit: lattice.fit_rows sonucu
+        num_questions: İlk kaç soru (None = tümü)
+        order: "column" (blok blok) veya "row" (satır satır) numaralama
+    """
+    rows, blocks = fit["rows"], fit["blocks"]
+    indices = lattice_indices(rows, blocks, len(OPTIONS))
+    centres = predict(fit["model"], indices)
+
+    questions = {}
+    for (option, row, block), (x, y) in zip(indices, centres):
+        if order == "row":
+            q_num = int(row) * blocks + int(block) + 1
+        else:
+            q_num = int(block) * rows + int(row) + 1
+        if num_questions is not None and q_num > num_questions:
+            continue
+        questions.setdefault(str(q_num), {})[OPTIONS[option]] = {"x": int(round(x)), "y": int(round(y))}
+
+    return dict(sorted(questions.items(), key=lambda item: int(item[0])))
+
+
+def lattice_summary(fit):
+    """Kafes parametreleri (JSON'a yazılır; sonraki formlarla karşılaştırmak için)"""
+    origin, option_step, row_step, block_step = [
+        [round(float(v), 2) for v in vector] for vector in fit["model"]
+    ]
+    return {
+        "origin": origin,
+        "option_pitch": option_step,
+        "row_pitch": row_step,
+        "block_pitch": block_step,
+        "rows": fit["rows"],
+        "blocks": fit["blocks"],
+        "detected": fit["detected"],
+        "inliers": fit["inliers"],
+        "error_px": fit["error_px"],
+    }
+
+
+def auto_calibrate(image_path, output_path=None, num_questions=None, order="column", template=None):
+    """
+    Boş formdan kalibrasyon üret ve kaydet
+    (template verilmezse varsayılan şablon; output_path verilmezse şablonun
+    kalibrasyon dosyası)
+
+    Returns:
+        dict: success, output, questions, lattice, self_check
+        (veya success False ve error)
+    """
+    template = template or get_template()
+    output_path = output_path or template.calibration_path
+    if output_path is None:
+        return {"success": False, "error": f"'{template.id}' şablonunun kalibrasyon dosyası yok (--output verin)"}
+
+    image = load_image(image_path)
+    if image is None:
+        return {"success": False, "error": f"Görüntü yüklenemedi: {image_path}"}
+
+    sheet = prepare_sheet(image, template=template)
+    if sheet["corners"] is None:
+        print("⚠️ Kağıt köşeleri bulunamadı, tüm görüntü sayfa kabul edildi")
+    roi = sheet["roi"]
+
+    bubbles = detect_blank_bubbles(roi)
+    print(f"🔵 {len(bubbles)} bubble adayı bulundu")
+
+    rows = group_rows(bubbles, roi.shape[0] * ROW_TOLERANCE_RATIO)
+    # Satır başlangıcı şablonun grid'inden: ilk satır ROI'nin ilk satır
+    # hücresinin ortasında (grid_position ile aynı düzen); ilk satırın
+    # tamamı kaçırılsa da sorular kaymaz
+    expected_rows = template.grid["rows"]
+    fit = fit_rows(rows, len(OPTIONS), expected_rows, first_row=0.5 * roi.shape[0] / expected_rows)
+    if fit is None:
+        return {"success": False, "error": "Bubble kafesi uydurulamadı (yeterli bubble yok)"}
+
+    print(f"📐 Kafes: {fit['rows']} satır x {fit['blocks']} blok, "
+          f"{fit['inliers']}/{fit['detected']} inlier, ortalama hata {fit['error_px']} px")
+
+    questions = build_calibration(fit, num_questions, order)
+    if num_questions is not None and len(questions) < num_questions:
+        print(f"⚠️ Kafeste yalnızca {len(questions)} soru var (istenen: {num_questions})")
+
+    data = {
+        "version": CALIBRATION_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": Path(image_path).name,
+        "template": template.id,
+        "roi_size": [roi.shape[1], roi.shape[0]],
+        "order": order,
+        "lattice": lattice_summary(fit),
+        "questions": questions,
+    }
+
+    output_path = Path(output_path)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"💾 Kalibrasyon kaydedildi: {output_path}")
+
+    # Okuyucuların yükleyeceği derlenmiş biçim (.npz)
+    compiled = get_calibration(output_path)
+
+    # Boş formda hiçbir şık işaretli okunmamalı
+    set_log_mode(None)
+    check = read_answers_from_roi(roi, compiled, template=template)
+    set_log_mode("stdout")
+    marked = [q for q, answer in check["answers"].items() if answer is not None]
+    if marked:
+        print(f"⚠️ Boş formda işaretli okunan sorular: {marked}")
+    else:
+        print(f"✅ Doğrulama: {len(compiled)} sorunun tümü boş okundu")
+
+    return {
+        "success": True,
+        "output": str(output_path),
+        "questions": len(questions),
+        "lattice": data["lattice"],
+        "self_check": {"marked": marked},
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("Kullanım: python auto_calibrate.py <boş_form> [--template ID] [--questions N] "
+              "[--order column|row] [--output yol]")
+        print("\nÖrnek:")
+        print("  python auto_calibrate.py bos_form.jpg")
+        print("  python auto_calibrate.py bos_form.jpg --questions 40 --output calibration.json")
+        sys.exit(1)
+
+    image_path = args[0]
+    template_id = None
+    num_questions = None
+    order = None
+    output_path = None
+
+    i = 1
+    while i < len(args):
+        if args[i] == "--template" and i + 1 < len(args):
+            template_id = args[i + 1]
+            i += 2
+        elif args[i] == "--questions" and i + 1 < len(args):
+            num_questions = int(args[i + 1])
+            i += 2
+        elif args[i] == "--order" and i + 1 < len(args):
+            order = args[i + 1]
+            i += 2
+        elif args[i] == "--output" and i + 1 < len(args):
+            output_path = args[i + 1]
+            i += 2
+        else:
+            print(f"❌ Bilinmeyen argüman: {args[i]}")
+            sys.exit(1)
+
+    try:
+        template = get_template(template_id)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if num_questions is None:
+        num_questions = template.num_questions
+    order = order or template.grid.get("order", "column")
+
+    if order not in ("column", "row"):
+        print(f"❌ Geçersiz sıralama: {order} (column veya row)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("OTOMATİK KALİBRASYON")
+    print("=" * 60)
+
+    result = auto_calibrate(image_path, output_path, num_questions, order, template)
+    if not result["success"]:
+        print(f"\n❌ {result['error']}")
+        sys.exit(1)
+
+    print("\n✅ Kalibrasyon tamamlandı!")
+
+
+if __name__ == "__main__":
+    main()
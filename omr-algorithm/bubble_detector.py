@@ -7,6 +7,12 @@ import cv2
 import numpy as np
 from pathlib import Path
 import config
+from candidates import bubble_candidates
+from decision import decide_marks
+from fill_analysis import fill_ratio_grid
+from grid_profile import locate_grid, nearest_index
+from lattice import fit_lattice, lattice_indices, predict
+from timing import StageTimer
 
 
 # Grid yapılandırması
@@ -16,13 +22,21 @@ NUM_OPTIONS = 4     # A, B, C, D
 OPTIONS = ["A", "B", "C", "D"]
 
 # Bubble tespit parametreleri
-FILL_THRESHOLD = 0.45       # %45 doluluk = işaretli
+# İşaret eşiği her formda doluluk oranlarının iki küme ayrımıyla bulunur
+# (bkz. decision); dolu ve boş küme ortalamaları en az bu kadar ayrık olmalı
+MIN_FILL_GAP = 0.10
+
+# Doluluk eşiği (adaptive threshold) blok boyutu; her piksel yalnızca
+# THRESH_BLOCK_SIZE // 2 uzaklığa kadar komşularına bakar, bu yüzden eşikleme
+# yalnızca bu kadar genişletilmiş soru pencerelerinde yapılır (sonuç aynı)
+THRESH_BLOCK_SIZE = 15
+THRESH_C = 3
 
 
 def detect_circles(image, debug_dir=None):
     """
-    Contour tespiti ile tüm bubble dairelerini bul
-    HoughCircles yerine contour analizi kullanıyoruz (daha güvenilir)
+    Bağlı bileşen analizi ile tüm bubble dairelerini bul
+    HoughCircles yerine bileşen/kontur analizi kullanıyoruz (daha güvenilir)
     
     Args:
         image: Cevap alanı görüntüsü (BGR)
@@ -53,48 +67,17 @@ def detect_circles(image, debug_dir=None):
     kernel = np.ones((2, 2), np.uint8)
     thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
     
-    # Contour bul
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
     # Tahmini bubble boyutu
     # 5 sütun x ~5 eleman per sütun = ~25 eleman genişlikte
     estimated_diameter = width / 30
     min_radius = max(5, int(estimated_diameter * 0.3))
     max_radius = min(25, int(estimated_diameter * 1.5))
-    min_area = 3.14 * min_radius * min_radius
-    max_area = 3.14 * max_radius * max_radius
     
-    print(f"Bubble boyut aralığı: yarıçap {min_radius}-{max_radius}, alan {min_area:.0f}-{max_area:.0f}")
+    print(f"Bubble boyut aralığı: yarıçap {min_radius}-{max_radius}")
     
-    circles = []
-    
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        
-        # Alan filtresi
-        if area < min_area or area > max_area:
-            continue
-        
-        # Dairesellik kontrolü (circularity = 4π × area / perimeter²)
-        perimeter = cv2.arcLength(contour, True)
-        if perimeter == 0:
-            continue
-        
-        circularity = 4 * 3.14159 * area / (perimeter * perimeter)
-        
-        # Daire için circularity 0.7-1.0 arasında olmalı
-        if circularity < 0.6:
-            continue
-        
-        # Minimum enclosing circle
-        (cx, cy), radius = cv2.minEnclosingCircle(contour)
-        cx, cy, radius = int(cx), int(cy), int(radius)
-        
-        # Yarıçap kontrolü
-        if radius < min_radius or radius > max_radius:
-            continue
-        
-        circles.append((cx, cy, radius))
+    # Bağlı bileşenler tek geçişte filtrelenir, dairesellik yalnızca adaylarda
+    # ölçülür (bkz. candidates); daire için circularity 0.7-1.0 arasında olmalı
+    circles = bubble_candidates(thresh, min_radius, max_radius, min_circularity=0.6)
     
     print(f"Tespit edilen daire sayısı: {len(circles)}")
     
@@ -108,14 +91,38 @@ def detect_circles(image, debug_dir=None):
     return circles
 
 
-def organize_circles_to_grid(circles, image_shape):
+def locate_answer_grid(image):
+    """
+    Satır / sütun mürekkep profillerinden bubble satırı ve şık sütunu
+    merkezlerini bul (bkz. grid_profile)
+    
+    Returns:
+        (satır merkezleri (GRID_ROWS,), şık sütunu merkezleri
+        (GRID_COLS x NUM_OPTIONS,)) veya None
+    """
+    if len(image.shape) == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+    
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return locate_grid(thresh, GRID_ROWS, GRID_COLS * NUM_OPTIONS)
+
+
+def organize_circles_to_grid(circles, image_shape, grid_lines=None):
     """
     Tespit edilen daireleri 5x10 grid'e yerleştir
     Her sütunda 10 soru, her soruda 4 şık
     
+    grid_lines (locate_answer_grid sonucu) verilirse her daire en yakın
+    bubble satırına ve şık sütununa atanır; baskı kaymış olsa da soru/şık
+    eşlemesi profil tepelerinden gelir. Verilmezse görüntü sabit hücrelere
+    bölünür.
+    
     Args:
         circles: [(x, y, r), ...] listesi
         image_shape: (height, width) tuple
+        grid_lines: (satır merkezleri, şık sütunu merkezleri) veya None
     
     Returns:
         grid: {soru_no: {"A": (x,y,r), "B": (x,y,r), ...}, ...}
@@ -123,6 +130,9 @@ def organize_circles_to_grid(circles, image_shape):
     if not circles:
         return {}
     
+    if grid_lines is not None:
+        return _organize_by_profile(circles, grid_lines)
+    
     height, width = image_shape[:2]
     
     # Sütun genişliği ve satır yüksekliği
@@ -176,7 +186,124 @@ def organize_circles_to_grid(circles, image_shape):
     return organized
 
 
-def analyze_bubble_fill(image, circles_grid, debug_dir=None):
+def _assign_to_profile(circles, grid_lines):
+    """
+    Daireleri profil tepelerine göre hücrelere ata
+    
+    Returns:
+        {(satır, şık sütunu): (x, y, r)} (hücre başına merkeze en yakın daire)
+    """
+    row_centres, column_centres = grid_lines
+    row_tolerance = np.diff(row_centres).min() / 2 if len(row_centres) > 1 else np.inf
+    column_tolerance = np.diff(column_centres).min() / 2 if len(column_centres) > 1 else np.inf
+    
+    arr = np.asarray(circles, dtype=np.float32)
+    rows = nearest_index(row_centres, arr[:, 1], row_tolerance)
+    columns = nearest_index(column_centres, arr[:, 0], column_tolerance)
+    
+    # Hücre başına merkeze en yakın daire
+    cells = {}
+    for circle, row, column in zip(circles, rows, columns):
+        if row < 0 or column < 0:
+            continue
+        distance = abs(circle[0] - column_centres[column]) + abs(circle[1] - row_centres[row])
+        if (row, column) not in cells or distance < cells[(row, column)][0]:
+            cells[(row, column)] = (distance, circle)
+    
+    return {cell: circle for cell, (_, circle) in cells.items()}
+
+
+def _organize_by_profile(circles, grid_lines):
+    """Daireleri profil tepelerine göre (satır, şık sütunu) hücrelerine ata"""
+    grid = {}
+    for (row, column), circle in _assign_to_profile(circles, grid_lines).items():
+        block, option = divmod(int(column), NUM_OPTIONS)
+        q_num = block * GRID_ROWS + int(row) + 1
+        grid.setdefault(q_num, {})[OPTIONS[option]] = circle
+    
+    # Dört şıkkı da bulunamayan soru atlanır (sabit hücrelerdeki gibi)
+    return {q_num: options for q_num, options in grid.items() if len(options) == NUM_OPTIONS}
+
+
+def lattice_grid(circles, grid_lines):
+    """
+    Tüm 50 x 4 bubble konumunu afin kafesten hesapla (bkz. lattice)
+    Profil tepelerine atanan dairelerden (şık, satır, blok) indeksleri
+    çıkarılır ve kafes RANSAC ile uydurulur; eksik daireler soruyu
+    düşürmez, tüm konumlar modelden gelir. Yarıçap tespit edilen
+    dairelerin medyanıdır.
+    
+    Returns:
+        (grid {soru_no: {şık: (x, y, r)}}, kafes bilgisi) veya (None, None)
+    """
+    cells = _assign_to_profile(circles, grid_lines)
+    if len(cells) < 4:
+        return None, None
+    
+    points = np.array([circle[:2] for circle in cells.values()], dtype=np.float64)
+    indices = np.array([
+        (column % NUM_OPTIONS, row, column // NUM_OPTIONS) for row, column in cells
+    ])
+    radius = int(np.median([circle[2] for circle in cells.values()]))
+    
+    fit = fit_lattice(points, indices, tolerance=max(3.0, radius / 2.0))
+    if fit is None:
+        return None, None
+    model, inliers, error = fit
+    
+    all_indices = lattice_indices(GRID_ROWS, GRID_COLS, NUM_OPTIONS)
+    centres = np.rint(predict(model, all_indices)).astype(int)
+    
+    grid = {}
+    for (option, row, block), (x, y) in zip(all_indices, centres):
+        q_num = int(block) * GRID_ROWS + int(row) + 1
+        grid.setdefault(q_num, {})[OPTIONS[option]] = (int(x), int(y), radius)
+    
+    info = {"inliers": int(inliers.sum()), "detected": len(cells), "error_px": round(error, 2)}
+    return dict(sorted(grid.items())), info
+
+
+def threshold_windows(gray, circles_grid, pad=THRESH_BLOCK_SIZE // 2):
+    """
+    Adaptive threshold'u yalnızca soruların bubble pencerelerinde uygula
+    
+    Her sorunun dairelerini kapsayan kutu, blok boyutunun yarısı kadar
+    genişletilip ayrı ayrı eşiklenir; genişletilmiş kısım atılır. Kutunun
+    içindeki her pikselin eşik komşuluğu pencerede kaldığından (görüntü
+    kenarında ise kenar kopyalaması aynı olduğundan) sonuç tüm görüntüyü
+    eşiklemekle birebir aynıdır.
+    
+    Returns:
+        Görüntü boyutunda ikili görüntü (pencereler dışı 0)
+    """
+    height, width = gray.shape[:2]
+    thresh = np.zeros((height, width), dtype=np.uint8)
+    
+    for options in circles_grid.values():
+        if not options:
+            continue
+        circles = np.array(list(options.values()), dtype=np.int64)
+        x1 = max(0, int((circles[:, 0] - circles[:, 2]).min()))
+        y1 = max(0, int((circles[:, 1] - circles[:, 2]).min()))
+        x2 = min(width, int((circles[:, 0] + circles[:, 2]).max()) + 1)
+        y2 = min(height, int((circles[:, 1] + circles[:, 2]).max()) + 1)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        
+        px1, py1 = max(0, x1 - pad), max(0, y1 - pad)
+        px2, py2 = min(width, x2 + pad), min(height, y2 + pad)
+        window = cv2.adaptiveThreshold(
+            np.ascontiguousarray(gray[py1:py2, px1:px2]), 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            THRESH_BLOCK_SIZE, THRESH_C
+        )
+        thresh[y1:y2, x1:x2] = window[y1 - py1:y2 - py1, x1 - px1:x2 - px1]
+    
+    return thresh
+
+
+def analyze_bubble_fill(image, circles_grid, debug_dir=None, timer=None):
     """
     Her bubble'ın doluluk oranını hesapla
     
@@ -184,54 +311,42 @@ def analyze_bubble_fill(image, circles_grid, debug_dir=None):
         image: Orijinal görüntü
         circles_grid: Organize edilmiş grid
         debug_dir: Debug klasörü
+        timer: Aşama süreleri için StageTimer (threshold, sampling)
     
     Returns:
         fill_ratios: {soru_no: {şık: doluluk, ...}, ...}
     """
+    timer = timer or StageTimer()
+    
     # Gri tonlama ve threshold
     if len(image.shape) == 3:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
-        gray = image.copy()
+        gray = image
     
     # Adaptive threshold - dolu alanlar beyaz olsun
-    thresh = cv2.adaptiveThreshold(
-        gray, 255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY_INV,
-        15, 3
-    )
+    # Tüm görüntü yerine yalnızca soru pencereleri eşiklenir (bkz. threshold_windows)
+    thresh = threshold_windows(gray, circles_grid)
+    
+    timer.lap("threshold")
     
     if debug_dir:
         cv2.imwrite(str(debug_dir / "33_thresh.jpg"), thresh)
+        timer.skip()
+    
+    # Tüm dairelerin iç kısmındaki (r - 2) beyaz piksel oranı tek geçişte
+    sorted_grid = {q_num: circles_grid[q_num] for q_num in sorted(circles_grid.keys())}
+    fill_ratios = fill_ratio_grid(thresh, sorted_grid, inset=2)
+    timer.lap("sampling")
     
-    fill_ratios = {}
     debug_img = image.copy() if debug_dir else None
+    marked = decide_fills(fill_ratios)["marked"] if debug_img is not None else None
     
-    for q_num in sorted(circles_grid.keys()):
-        fill_ratios[q_num] = {}
-        
-        for option, (cx, cy, r) in circles_grid[q_num].items():
-            # Daire içindeki pikselleri analiz et
-            # Mask oluştur
-            mask = np.zeros(thresh.shape, dtype=np.uint8)
-            cv2.circle(mask, (cx, cy), r - 2, 255, -1)  # İç kısım
-            
-            # Mask içindeki beyaz piksel oranı
-            circle_pixels = cv2.bitwise_and(thresh, mask)
-            total_pixels = np.sum(mask == 255)
-            white_pixels = np.sum(circle_pixels == 255)
-            
-            if total_pixels > 0:
-                fill_ratio = white_pixels / total_pixels
-            else:
-                fill_ratio = 0.0
-            
-            fill_ratios[q_num][option] = fill_ratio
-            
+    for q_num, options in sorted_grid.items():
+        for option, (cx, cy, r) in options.items():
             # Debug çizimi
             if debug_img is not None:
-                is_filled = fill_ratio > FILL_THRESHOLD
+                is_filled = 1 <= q_num <= marked.shape[0] and marked[q_num - 1, OPTIONS.index(option)]
                 color = (0, 255, 0) if is_filled else (128, 128, 128)
                 thickness = 3 if is_filled else 1
                 cv2.circle(debug_img, (cx, cy), r, color, thickness)
@@ -247,14 +362,31 @@ def analyze_bubble_fill(image, circles_grid, debug_dir=None):
     return fill_ratios
 
 
+def decide_fills(fill_ratios):
+    """
+    Doluluk oranlarını (soru x şık) matrise çevirip formun kendi eşiğiyle
+    işaretli şıkları bul (bkz. decision.decide_marks; bulunamayanlar NaN)
+    """
+    values = np.full((GRID_COLS * GRID_ROWS, NUM_OPTIONS), np.nan)
+    for q_num, ratios in fill_ratios.items():
+        if 1 <= q_num <= len(values):
+            for oi, option in enumerate(OPTIONS):
+                if option in ratios:
+                    values[q_num - 1, oi] = ratios[option]
+    return decide_marks(values, min_gap=MIN_FILL_GAP, marked_low=False)
+
+
 def extract_answers(fill_ratios):
     """
     Doluluk oranlarından cevapları çıkar
+    Eşik sabit değil: formun tüm doluluk oranları iki kümeye ayrılır
     """
     answers = {}
     confidence = {}
     issues = []
     
+    decision = decide_fills(fill_ratios)
+    
     for q_num in range(1, 51):
         if q_num not in fill_ratios:
             answers[q_num] = None
@@ -269,71 +401,69 @@ def extract_answers(fill_ratios):
             confidence[q_num] = 0.0
             continue
         
-        # En yüksek doluluk
-        max_option = max(ratios, key=ratios.get)
-        max_fill = ratios[max_option]
-        
-        # Sıralı değerler
-        sorted_fills = sorted(ratios.values(), reverse=True)
-        
-        # Eşik kontrolü
-        if max_fill < FILL_THRESHOLD:
+        # Eşiği geçen şık yok
+        choice = decision["choice"][q_num - 1]
+        if choice < 0:
             answers[q_num] = None
-            confidence[q_num] = 1.0 - max_fill
+            confidence[q_num] = 1.0 - max(ratios.values())
             continue
         
-        # İkinci en yüksek ile karşılaştır
-        if len(sorted_fills) > 1:
-            second_fill = sorted_fills[1]
-            separation = max_fill - second_fill
-            
-            # Çoklu işaretleme
-            if second_fill > FILL_THRESHOLD:
-                marked = [opt for opt, val in ratios.items() if val > FILL_THRESHOLD]
-                issues.append({
-                    "question": q_num,
-                    "type": "multiple",
-                    "message": f"Çoklu: {', '.join(marked)}"
-                })
-                answers[q_num] = max_option
-                confidence[q_num] = 0.3
-                continue
-            
-            conf = min(1.0, max_fill * (1 + separation))
-        else:
-            conf = max_fill
+        # Çoklu işaretleme: en dolu şık seçilir, güven düşük kalır
+        marked = [OPTIONS[oi] for oi in np.nonzero(decision["marked"][q_num - 1])[0]]
+        if len(marked) > 1:
+            issues.append({
+                "question": q_num,
+                "type": "multiple",
+                "message": f"Çoklu: {', '.join(marked)}"
+            })
         
-        answers[q_num] = max_option
-        confidence[q_num] = conf
+        answers[q_num] = OPTIONS[choice]
+        confidence[q_num] = float(decision["confidence"][q_num - 1])
     
     return answers, confidence, issues
 
 
-def detect_and_extract(answer_region_image, debug=False):
+def detect_and_extract(answer_region_image, debug=False, request_id=None):
     """
     Ana fonksiyon: Daireleri tespit et ve cevapları çıkar
+    Aşama süreleri (ms) sonuçta "timings" altında döner; request_id verilirse
+    sonuçta aynen geri döner.
     """
+    timer = StageTimer(request_id)
+    
     debug_dir = None
     if debug:
         debug_dir = Path(config.DEBUG_OUTPUT_DIR)
         debug_dir.mkdir(exist_ok=True)
     
-    # 1. Daireleri tespit et
+    # 1. Daireleri tespit et (Otsu threshold + bağlı bileşenler)
     circles = detect_circles(answer_region_image, debug_dir)
+    timer.lap("circles")
     
     if len(circles) < 50:  # En az 50 daire olmalı (50 soru x 4 şık eksik olabilir)
         print(f"UYARI: Beklenen 200 daire, bulunan {len(circles)}")
     
-    # 2. Daireleri grid'e organize et
-    circles_grid = organize_circles_to_grid(circles, answer_region_image.shape)
+    # 2. Daireleri grid'e organize et (satır / sütun profil tepeleriyle)
+    grid_lines = locate_answer_grid(answer_region_image)
+    if grid_lines is None:
+        print("UYARI: Profilde yeterli satır/sütun tepesi yok, sabit hücreler kullanılıyor")
+    
+    # Kafes uydurulabilirse tüm konumlar modelden gelir (eksik daire soruyu düşürmez)
+    circles_grid = lattice_info = None
+    if grid_lines is not None:
+        circles_grid, lattice_info = lattice_grid(circles, grid_lines)
+    if circles_grid is None:
+        circles_grid = organize_circles_to_grid(circles, answer_region_image.shape, grid_lines)
+    timer.lap("grid")
     
     print(f"Organize edilen soru sayısı: {len(circles_grid)}")
     
     # 3. Doluluk analizi
-    fill_ratios = analyze_bubble_fill(answer_region_image, circles_grid, debug_dir)
+    fill_ratios = analyze_bubble_fill(answer_region_image, circles_grid, debug_dir, timer)
     
     # 4. Cevap çıkarma
     answers, confidence, issues = extract_answers(fill_ratios)
+    timer.lap("decision")
     
     # Özet
     answered = sum(1 for a in answers.values() if a is not None)
@@ -347,7 +477,7 @@ def detect_and_extract(answer_region_image, debug=False):
         ans = answers.get(i)
         answer_string += ans if ans else "-"
     
-    return {
+    result = {
         "success": True,
         "circles_found": len(circles),
         "questions_detected": len(circles_grid),
@@ -362,6 +492,9 @@ def detect_and_extract(answer_region_image, debug=False):
             "average_confidence": round(avg_conf, 2)
         }
     }
+    if lattice_info is not None:
+        result["lattice"] = lattice_info
+    return timer.attach(result)
 
 
 # Test
@@ -0,0 +1,189 @@
+"""
+Kalibrasyon Deposu
+calibration.json'u bir kez derleyip NumPy dizileri olarak tutar.
+
+    questions: (Q,)       soru numaraları (artan sırada)
+    points:    (Q, O, 2)  her şıkkın ROI içindeki (x, y) merkezi
+    valid:     (Q, O)     şık kalibre edilmiş mi
+
+Derlenen veri JSON'un yanına ikili biçimde (calibration.npz) yazılır ve
+süreç içinde önbellekte tutulur. JSON dosyası değiştiğinde (mtime/boyut)
+hem önbellek hem .npz yeniden üretilir; JSON kaynak olarak kalır.
+
+JSON iki biçimde olabilir: eski düz {soru_no: {şık: {"x", "y"}}} sözlüğü
+(calibrate.py) veya auto_calibrate.py'nin yazdığı sürümlü biçim
+{"version": CALIBRATION_VERSION, ..., "questions": {soru_no: ...}}.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+CALIBRATION_PATH = Path(__file__).parent / "calibration.json"
+
+# Sürümlü kalibrasyon biçiminin sürümü (bkz. auto_calibrate)
+CALIBRATION_VERSION = 2
+
+# Şıklar (dizilerin ikinci ekseni bu sırada)
+OPTIONS = ["A", "B", "C", "D"]
+
+# Süreç içi önbellek: json yolu -> (kaynak imzası, derlenmiş kalibrasyon)
+_cache = {}
+
+
+class CompiledCalibration:
+    """Derlenmiş kalibrasyon: soru x şık x (x, y) koordinat dizileri"""
+
+    def __init__(self, questions, points, valid, options=OPTIONS):
+        self.questions = np.asarray(questions, dtype=np.int32)
+        self.points = np.asarray(points, dtype=np.float32)
+        self.valid = np.asarray(valid, dtype=bool)
+        self.options = list(options)
+        # limit() sonuçları: aynı nesne döner, örnekleme planı önbelleği korunur
+        self._limited = {}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def keys(self):
+        """Soru numaraları (eski sözlük biçimiyle uyumluluk için)"""
+        return [int(q) for q in self.questions]
+
+    def limit(self, num_questions):
+        """
+        Yalnızca numarası num_questions'ı aşmayan sorular (None = tümü)
+        Sonuç önbelleklenir; aynı sınır için hep aynı nesne döner.
+        """
+        if num_questions is None or not len(self.questions) or num_questions >= self.questions.max():
+            return self
+        limited = self._limited.get(num_questions)
+        if limited is None:
+            keep = self.questions <= num_questions
+            limited = CompiledCalibration(self.questions[keep], self.points[keep], self.valid[keep], self.options)
+            self._limited[num_questions] = limited
+        return limited
+
+    def to_dict(self):
+        """Eski {soru_no: {şık: {"x", "y"}}} biçimine geri çevir"""
+        calibration = {}
+        for qi, q_num in enumerate(self.questions):
+            calibration[int(q_num)] = {
+                option: {"x": int(round(self.points[qi, oi, 0])), "y": int(round(self.points[qi, oi, 1]))}
+                for oi, option in enumerate(self.options)
+                if self.valid[qi, oi]
+            }
+        return calibration
+
+
+def compile_calibration(data, options=OPTIONS):
+    """
+    {soru_no: {şık: {"x", "y"}}} sözlüğünü dizilere derle
+    (soru numaraları str veya int olabilir; eksik şıklar valid=False olur)
+    Sürümlü biçimde yalnızca "questions" alanı derlenir.
+    """
+    if "version" in data:
+        data = data["questions"]
+    questions = sorted(int(q) for q in data.keys())
+    by_number = {int(q): opts for q, opts in data.items()}
+
+    points = np.zeros((len(questions), len(options), 2), dtype=np.float32)
+    valid = np.zeros((len(questions), len(options)), dtype=bool)
+
+    for qi, q_num in enumerate(questions):
+        for oi, option in enumerate(options):
+            point = by_number[q_num].get(option)
+            if point is not None:
+                points[qi, oi] = (point["x"], point["y"])
+                valid[qi, oi] = True
+
+    return CompiledCalibration(questions, points, valid, options)
+
+
+def as_compiled(calibration):
+    """Sözlük verilirse derle, derlenmiş kalibrasyonu olduğu gibi döndür"""
+    if calibration is None or isinstance(calibration, CompiledCalibration):
+        return calibration
+    return compile_calibration(calibration)
+
+
+def _signature(path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def save_compiled(compiled, npz_path, signature=(0, 0)):
+    """Derlenmiş kalibrasyonu .npz olarak yaz (kaynak JSON imzasıyla)"""
+    # Önce geçici dosyaya yaz, sonra taşı: paralel süreçler yarım dosya okumasın
+    tmp_path = f"{npz_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            questions=compiled.questions,
+            points=compiled.points,
+            valid=compiled.valid,
+            options=np.array(compiled.options),
+            source_signature=np.array(signature, dtype=np.int64),
+        )
+    os.replace(tmp_path, npz_path)
+
+
+def load_compiled(npz_path):
+    """
+    .npz dosyasını oku
+
+    Returns:
+        (CompiledCalibration, kaynak imzası)
+    """
+    with np.load(npz_path) as data:
+        compiled = CompiledCalibration(
+            data["questions"], data["points"], data["valid"], [str(o) for o in data["options"]]
+        )
+        signature = tuple(int(v) for v in data["source_signature"])
+    return compiled, signature
+
+
+def get_calibration(path=CALIBRATION_PATH):
+    """
+    Derlenmiş kalibrasyonu döndür (önce bellek, sonra .npz, en son JSON)
+
+    Raises:
+        FileNotFoundError: Ne JSON ne .npz bulunamazsa
+    """
+    path = Path(path)
+    npz_path = path.with_suffix(".npz")
+
+    try:
+        signature = _signature(path)
+    except FileNotFoundError:
+        # Yalnızca ikili biçim dağıtılmış olabilir
+        if npz_path.exists():
+            return load_compiled(npz_path)[0]
+        _cache.pop(path, None)
+        raise
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    compiled = None
+    if npz_path.exists():
+        try:
+            compiled, npz_signature = load_compiled(npz_path)
+            if npz_signature != signature:
+                compiled = None
+        except Exception:
+            compiled = None
+
+    if compiled is None:
+        with open(path, "r") as f:
+            compiled = compile_calibration(json.load(f))
+        try:
+            save_compiled(compiled, npz_path, signature)
+        except OSError:
+            # Salt okunur klasörde yalnızca bellek önbelleği kullanılır
+            pass
+
+    _cache[path] = (signature, compiled)
+    return compiled
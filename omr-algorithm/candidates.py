@@ -0,0 +1,125 @@
+"""
+Bubble Aday Çıkarımı
+Eşiklenmiş görüntüdeki bağlı bileşenleri cv2.connectedComponentsWithStats ile
+tek geçişte etiketler; alan, kutu en-boy oranı ve doluluk filtreleri tüm
+bileşenler üzerinde NumPy dizi işlemleriyle uygulanır.
+
+Gürültülü fotoğraflarda binlerce leke çıkar; konturları tek tek Python'da
+dolaşmak (contourArea, arcLength, minEnclosingCircle) yerine yalnızca dizi
+filtrelerinden geçen birkaç yüz aday için kontur çıkarılıp dairesellik
+kontrol edilir.
+
+    Kutu yarıçapı   max(w, h) / 2, [min_radius, max_radius] aralığında
+    En-boy oranı    min(w, h) / max(w, h) >= MIN_ASPECT
+    Doluluk         piksel sayısı / (w * h) >= MIN_DENSITY (ince çizgi ve
+                    seyrek gürültü elenir; boş halka da dolu daire de geçer)
+    Dairesellik     4π × alan / çevre² >= min_circularity (yalnızca adaylarda)
+"""
+
+import cv2
+import numpy as np
+
+# Dizi filtrelerinin varsayılan eşikleri
+MIN_ASPECT = 0.6
+MIN_DENSITY = 0.15
+
+
+def component_stats(binary):
+    """
+    Bağlı bileşenler (arka plan hariç)
+
+    Returns:
+        (labels, stats (N, 5): x, y, w, h, alan, etiketler (N,))
+    """
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    return labels, stats[1:], np.arange(1, len(stats), dtype=np.int32)
+
+
+def filter_components(stats, min_radius, max_radius, min_aspect=MIN_ASPECT, min_density=MIN_DENSITY):
+    """Alan / en-boy / doluluk filtreleri: geçen bileşenlerin boolean maskesi"""
+    w = stats[:, cv2.CC_STAT_WIDTH].astype(np.float32)
+    h = stats[:, cv2.CC_STAT_HEIGHT].astype(np.float32)
+    area = stats[:, cv2.CC_STAT_AREA].astype(np.float32)
+
+    long_side = np.maximum(w, h)
+    radius = long_side / 2.0
+    aspect = np.minimum(w, h) / np.maximum(long_side, 1.0)
+    density = area / np.maximum(w * h, 1.0)
+
+    return (
+        (radius >= min_radius) & (radius <= max_radius + 1)
+        & (aspect >= min_aspect)
+        & (density >= min_density)
+    )
+
+
+def _outer_contour(labels, label, box):
+    """Tek bileşenin dış konturu (yalnızca kendi kutusunda, tam görüntü koordinatında)"""
+    x, y, w, h = box
+    patch = (labels[y:y + h, x:x + w] == label).astype(np.uint8)
+    patch = cv2.copyMakeBorder(patch, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    contours, _ = cv2.findContours(patch, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    return max(contours, key=cv2.contourArea) + np.array([x - 1, y - 1], dtype=np.int32)
+
+
+def bubble_candidates(binary, min_radius, max_radius, min_circularity, min_area=None, max_area=None):
+    """
+    Eşiklenmiş görüntüden daire adaylarını çıkar
+
+    Args:
+        binary: Tek kanallı eşiklenmiş görüntü (bubble pikselleri 255)
+        min_radius, max_radius: Kabul edilen yarıçap aralığı (piksel)
+        min_circularity: En düşük dairesellik (4π × alan / çevre²)
+        min_area, max_area: Kontur alanı aralığı (varsayılan π r² sınırları)
+
+    Returns:
+        [(cx, cy, radius), ...] (int)
+    """
+    if min_area is None:
+        min_area = 3.14 * min_radius * min_radius
+    if max_area is None:
+        max_area = 3.14 * max_radius * max_radius
+
+    labels, stats, ids = component_stats(binary)
+    keep = filter_components(stats, min_radius, max_radius)
+
+    circles = []
+    for label, box in zip(ids[keep], stats[keep, :4]):
+        contour = _outer_contour(labels, label, box)
+        if contour is None:
+            continue
+
+        area = cv2.contourArea(contour)
+        if area < min_area or area > max_area:
+            continue
+
+        perimeter = cv2.arcLength(contour, True)
+        if perimeter == 0 or 4 * 3.14159 * area / (perimeter * perimeter) < min_circularity:
+            continue
+
+        (cx, cy), radius = cv2.minEnclosingCircle(contour)
+        cx, cy, radius = int(cx), int(cy), int(radius)
+        if radius < min_radius or radius > max_radius:
+            continue
+
+        circles.append((cx, cy, radius))
+
+    return drop_nested(circles)
+
+
+def drop_nested(circles):
+    """
+    Merkezi başka (daha büyük) bir adayın içinde kalan adayları at
+    (RETR_EXTERNAL ile aynı sonuç: halkanın içindeki ayrık işaret ayrı
+    bubble sayılmaz)
+    """
+    if len(circles) < 2:
+        return circles
+
+    arr = np.asarray(circles, dtype=np.float32)
+    dx = arr[:, None, 0] - arr[None, :, 0]
+    dy = arr[:, None, 1] - arr[None, :, 1]
+    inside = (dx * dx + dy * dy < arr[None, :, 2] ** 2) & (arr[:, None, 2] < arr[None, :, 2])
+    return [circle for circle, nested in zip(circles, inside.any(axis=1)) if not nested]
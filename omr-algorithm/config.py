@@ -3,6 +3,21 @@ OMR Algorithm Configuration
 Optik form için konfigürasyon parametreleri
 """
 
+import os
+
+
+def env_flag(name, default=False):
+    """Ortam değişkeninden açık/kapalı ayarı (1/true/yes/on = açık)"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name):
+    """Ortam değişkenindeki virgülle ayrılmış adlar (boşsa boş küme)"""
+    return {item.strip() for item in os.environ.get(name, "").split(",") if item.strip()}
+
 # Hedef görüntü boyutları (perspektif düzeltme sonrası)
 TARGET_WIDTH = 800
 TARGET_HEIGHT = 1100
@@ -35,8 +50,141 @@ PERSPECTIVE = {
     "canny_low": 50,
     "canny_high": 150,
     "contour_approx_factor": 0.02,
+    # Kağıt tespiti piramitte bu uzun kenar boyutunun altına inilerek yapılır
+    # (None/0 = tam çözünürlükte tespit)
+    "pyramid_max_side": 1000,
+    # Küçük seviyede bulunan köşeler tam çözünürlükte cornerSubPix ile iyileştirilir
+    "refine_corners": True,
+}
+
+# Köşe işaretleri (fiducial) ile kayıt
+# Formda köşelere basılmış dolu kareler veya ArUco işaretleri varsa kağıt
+# kenarı yerine bunlar aranır; bulunamazsa kontur aramasına dönülür.
+FIDUCIALS = {
+    "mode": None,               # None (kapalı), "squares" veya "aruco"
+    "search_fraction": 0.25,    # Her köşede aranan pencere (görüntü boyutunun oranı)
+    "min_area_ratio": 0.0002,   # İşaret alanı / görüntü alanı alt sınırı
+    "max_area_ratio": 0.02,     # İşaret alanı / görüntü alanı üst sınırı
+    "aruco_dictionary": "DICT_4X4_50",
+    "aruco_ids": (0, 1, 2, 3),  # Formun köşelerindeki işaretlerin id'leri
+    # İşaretlerin dış köşelerinin sayfa kenarından uzaklığı (genişlik, yükseklik oranı);
+    # (0, 0) = işaretlerin dış köşeleri sayfa köşesi kabul edilir
+    "page_inset": (0.0, 0.0),
+}
+
+# Sayfa yönü tespiti (bkz. orientation.py) - ters, yan veya aynalanmış çekilen
+# formlar köşe eşlemesi değiştirilerek düzeltilir
+ORIENTATION = {
+    "enabled": True,
+    "thumb_width": 160,         # Adayların puanlandığı sayfa önizlemesinin genişliği
+    "check_mirror": True,       # Kalibrasyon varsa aynalanmış eşlemeleri de dene
+    "min_margin": 4.0,          # En iyi iki aday arasındaki en az puan farkı (gri seviye)
+    # Kalibrasyonsuz (başlık bandı) yöntemde alt şerit boş olmalı: ortalama
+    # mürekkebi kağıdınkini en fazla bu kadar aşabilir; alt bilgili formlar döndürülmez
+    "header_blank_margin": 8.0,
 }
 
+# Form kimliği (bkz. sheet_id.py) - formun sağ üst köşesine basılan QR kod
+# şablonu, sınavı ve öğrenciyi taşır; yalnızca düzeltilmiş sayfadaki bu
+# pencere (sayfa oranları) warp edilip taranır. Pencere warp'ı + QR çözme her
+# formda ~10-17 ms tutar (kağıt tespitiyle aynı mertebe); bu yüzden varsayılan
+# kapalıdır, QR basılı formlar için OMR_SHEET_ID=1 ortam değişkeniyle açılır
+# (worker ve tek seferlik okuyucu backend'in ortamını devralır)
+SHEET_ID = {
+    "enabled": env_flag("OMR_SHEET_ID"),
+    "search_box": {"x_start": 0.72, "x_end": 0.99, "y_start": 0.0, "y_end": 0.16},
+    "route_template": True,     # QR'daki şablon, template_id verilmediyse kullanılır
+}
+
+# Kare kalite ön kontrolü (canlı tarama) - küçük önizleme üzerinde ölçülür
+FRAME_QUALITY = {
+    "thumbnail_side": 480,      # Ölçümlerin yapıldığı önizlemenin uzun kenarı
+    "min_brightness": 50,       # Ortalama gri seviye bunun altındaysa çok karanlık
+    "min_sharpness": 50,        # Orta bölgede Laplacian varyansı (bulanıklık)
+    "max_glare_ratio": 0.01,    # En büyük parlama lekesinin kağıt alanına oranı
+    "glare_margin": 25,         # Parlama pikseli kağıt medyanından en az bu kadar parlak
+    "min_sheet_ratio": 0.20,    # En büyük parlak bölgenin kare alanına oranı
+    "min_sheet_contrast": 40,   # Kağıt ile arka plan ortalama gri farkı
+}
+
+# Form şablonları (bkz. templates.py) - her sınav formu düzeni için tek kayıt;
+# okuyucular template_id ile seçer, verilmezse DEFAULT_TEMPLATE kullanılır
+#   page_size:     Perspektif düzeltme sonrası sayfa (genişlik, yükseklik)
+#   roi:           Cevap bölgesi oranları (x_start, x_end, y_start, y_end)
+#   grid:          rows = bloktaki soru satırı, blocks = yan yana blok sayısı,
+#                  order = "column" (blok blok numaralama) / "row"
+#   num_questions: Formdaki soru sayısı (fazlası okunmaz)
+#   thresholds:    Okuyucu eşikleri
+#   calibration:   Kalibrasyon dosyası (bu klasöre göre) veya None (grid tabanlı;
+#                  kalibre okuyucular ve worker bu şablonu reddeder)
+#   fields:        Cevap bölgesi dışındaki rakam alanları (bkz. fields.py);
+#                  box = alan kutusu (sayfa oranları), digits = basamak sütunu,
+#                  symbols = yukarıdan aşağı satırlar (varsayılan 0-9),
+#                  enabled = False ise alan okunmaz (ENABLED_FIELDS açabilir)
+DEFAULT_TEMPLATE = "standard-10"
+
+TEMPLATES = {
+    # Kalibre edilmiş okuyucunun formu: 10 soru, 2 blok x 5 satır
+    "standard-10": {
+        "description": "10 soruluk kalibre edilmiş form (A4, 2 blok x 5 satır)",
+        "page_size": (1654, 2339),
+        "roi": {"x_start": 0.04, "x_end": 0.96, "y_start": 0.38, "y_end": 0.92},
+        "grid": {"rows": 5, "blocks": 2, "order": "column"},
+        "num_questions": 10,
+        "options": OPTIONS,
+        "thresholds": {
+            "bubble_radius": 10,    # Örnekleme penceresinin yarıçapı (piksel)
+            # İşaret eşiği her formda bubble ortalamalarının iki küme ayrımıyla
+            # bulunur (bkz. decision.py); mürekkep ve kağıt kümesi ortalamaları
+            # arasında bundan az fark varsa formda işaret yok sayılır
+            "min_gap": 15,
+        },
+        "calibration": "calibration.json",
+        "fields": {
+            # Başlıktaki öğrenci numarası: 8 basamak x 10 rakam (ROI bunu atlar).
+            # Kutu gerçek formdan ölçülmedi, sentetik test formlarındaki düzene
+            # göre verildi; açıkken her okumada 80 başlık bubble'ı örneklenir ve
+            # basılı başlık içeriği numara gibi okunabilir. Bu kutuya numara
+            # grid'i basılan formlarda OMR_FIELDS=roll_no ile açılır.
+            "roll_no": {
+                "enabled": False,
+                "type": "digits",
+                "box": {"x_start": 0.06, "x_end": 0.40, "y_start": 0.17, "y_end": 0.37},
+                "digits": 8,
+            },
+        },
+    },
+    # Grid tabanlı 50 soruluk form (yukarıdaki GRID_* / ROI / BUBBLE değerleri;
+    # doluluk oranı eşikleri kullanılır, kalibrasyonu yok: bubble_detector /
+    # omr_adaptive_reader okur, omr_answer_reader ve worker reddeder)
+    "grid-50": {
+        "description": "50 soruluk grid formu (5 sütun x 10 satır)",
+        "page_size": (TARGET_WIDTH, TARGET_HEIGHT),
+        "roi": ROI,
+        "grid": {"rows": GRID_ROWS, "blocks": GRID_COLS, "order": "column"},
+        "num_questions": NUM_QUESTIONS,
+        "options": OPTIONS,
+        "thresholds": BUBBLE,
+        "calibration": None,
+    },
+    # omr_reader.py'nin eski sabit düzeni: 15 soru, 5 sütun x 10 satır
+    # (cevap bölgesi standard-10 ile aynı; kalibrasyonu yok, omr_reader okur)
+    "legacy-15": {
+        "description": "omr_reader'ın 15 soruluk düzeni (5 sütun x 10 satır)",
+        "page_size": (TARGET_WIDTH, TARGET_HEIGHT),
+        "roi": {"x_start": 0.04, "x_end": 0.96, "y_start": 0.38, "y_end": 0.92},
+        "grid": {"rows": GRID_ROWS, "blocks": GRID_COLS, "order": "column"},
+        "num_questions": 15,
+        "options": OPTIONS,
+        "thresholds": {"min_gap": 15},
+        "calibration": None,
+    },
+}
+
+# Şablonda kapalı ("enabled": False) olsa da okunacak alanlar; backend
+# OMR_FIELDS=roll_no ortam değişkeniyle açar (worker ve okuyucu ortamı devralır)
+ENABLED_FIELDS = env_list("OMR_FIELDS")
+
 # Debug modu
 DEBUG = True
 DEBUG_OUTPUT_DIR = "debug_output"
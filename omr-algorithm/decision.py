@@ -0,0 +1,133 @@
+"""
+Karar Aşaması (İki Küme Ayrımı)
+İşaretli / boş ayrımını sabit eşiklerle değil, her formun kendi bubble
+ölçümlerinden yapar.
+
+Formun tüm (soru x şık) ölçümleri (ortalama parlaklık veya doluluk oranı)
+tek bir 1-B örneklem olarak ele alınır ve Otsu yöntemiyle iki kümeye ayrılır:
+değerler sıralanır, her olası bölme noktası için sınıflar arası varyans
+kümülatif toplamlardan tek vektörel işlemde hesaplanır ve en büyüğü seçilir.
+Böylece eşik o formun kağıt ve mürekkep tonuna (yazıcı, ışık, kalem) göre
+belirlenir.
+
+Ayrımın gerçek olması için küme ortalamaları arasındaki fark (gap) kümelerin
+kendi yayılımının (küme içi standart sapma) en az MIN_SEPARATION katı ve
+min_gap'ten büyük olmalıdır; aksi halde formda ayrı bir mürekkep kümesi yoktur
+(ör. tamamen boş formda Otsu yalnızca gürültüyü ikiye böler) ve hiçbir şık
+işaretli sayılmaz.
+
+Güven: seçilen şık ile bir sonraki şık arasındaki farkın küme farkına oranı
+(tek ve net işaret ~1, çift işaret / silinmiş işaret ~0).
+"""
+
+import numpy as np
+
+# Küme farkı / küme içi standart sapma alt sınırı (tek tepeli gürültüde ~2.7)
+MIN_SEPARATION = 4.0
+
+
+def two_cluster_split(values, valid=None):
+    """
+    Değerleri 1-B Otsu ile iki kümeye ayır
+
+    Args:
+        values: Ölçümler (herhangi bir şekil; NaN değerler atlanır)
+        valid: values ile aynı şekilde maske (verilirse yalnızca True olanlar)
+
+    Returns:
+        dict: threshold, low_mean, high_mean, gap, spread (küme içi standart
+        sapma), separation (gap / spread)
+        veya None (ayrılacak en az iki farklı değer yoksa)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mask = np.isfinite(values)
+    if valid is not None:
+        mask &= np.asarray(valid, dtype=bool)
+    v = np.sort(values[mask])
+    n = v.size
+    if n < 2 or v[0] == v[-1]:
+        return None
+
+    # k = alt kümedeki değer sayısı (1..n-1); sınıflar arası varyans ~ k (n-k) (fark)^2
+    csum = np.cumsum(v)
+    k = np.arange(1, n)
+    low = csum[:-1] / k
+    high = (csum[-1] - csum[:-1]) / (n - k)
+    between = k * (n - k) * (high - low) ** 2
+    # Eşit değerlerin arasından bölünmez
+    between[v[1:] == v[:-1]] = -1.0
+
+    i = int(np.argmax(between))
+    gap = float(high[i] - low[i])
+    # Küme içi varyans = toplam varyans - sınıflar arası varyans
+    within = max(float(np.var(v)) - between[i] / float(n * n), 0.0)
+    spread = float(np.sqrt(within))
+    return {
+        "threshold": float((v[i] + v[i + 1]) / 2.0),
+        "low_mean": float(low[i]),
+        "high_mean": float(high[i]),
+        "gap": gap,
+        "spread": spread,
+        "separation": gap / spread if spread > 0 else float("inf"),
+    }
+
+
+def decide_marks(values, valid=None, min_gap=0.0, marked_low=True):
+    """
+    (soru x şık) ölçüm matrisinden her sorunun cevabı
+
+    Args:
+        values: (Q, O) ölçümler
+        valid: (Q, O) kalibre edilmiş / ölçülmüş şıklar (verilmezse NaN olmayanlar)
+        min_gap: İki küme ortalaması arasında olması gereken en az mutlak fark
+            (ayrıca gap / spread >= MIN_SEPARATION aranır)
+        marked_low: True = düşük değer işaretli (parlaklık), False = yüksek
+            değer işaretli (doluluk oranı)
+
+    Returns:
+        dict:
+            choice: (Q,) seçilen şık indeksi, boşsa -1
+            confidence: (Q,) 0-1
+            marked: (Q, O) eşiği geçen şıklar
+            split: two_cluster_split sonucu (ayrım yoksa / yetersizse None)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if valid is None:
+        valid = np.isfinite(values)
+    valid = np.asarray(valid, dtype=bool) & np.isfinite(values)
+
+    split = two_cluster_split(values, valid)
+    if split is not None and (split["gap"] < min_gap or split["separation"] < MIN_SEPARATION):
+        split = None
+
+    num_questions = values.shape[0]
+    choice = np.full(num_questions, -1, dtype=np.int64)
+    confidence = np.zeros(num_questions)
+    if split is None or values.shape[1] == 0:
+        return {
+            "choice": choice,
+            "confidence": confidence,
+            "marked": np.zeros(values.shape, dtype=bool),
+            "split": None,
+        }
+
+    # İşaretli yön her zaman "küçük skor" olacak şekilde çevrilir
+    sign = 1.0 if marked_low else -1.0
+    scores = np.where(valid, sign * values, np.inf)
+    threshold = sign * split["threshold"]
+    marked = valid & (scores < threshold)
+
+    order = np.argsort(scores, axis=1)
+    best = order[:, 0]
+    rows = np.arange(num_questions)
+    best_score = scores[rows, best]
+    # Tek kalibre şıklı soruda ikinci şık yerine kağıt kümesinin ortalaması
+    paper = sign * (split["high_mean"] if marked_low else split["low_mean"])
+    second_score = scores[rows, order[:, 1]] if values.shape[1] > 1 else np.full(num_questions, np.inf)
+    second_score = np.where(np.isfinite(second_score), second_score, paper)
+
+    answered = marked[rows, best]
+    choice[answered] = best[answered]
+    confidence[answered] = np.clip((second_score - best_score)[answered] / split["gap"], 0.0, 1.0)
+
+    return {"choice": choice, "confidence": confidence, "marked": marked, "split": split}
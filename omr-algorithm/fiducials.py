@@ -0,0 +1,198 @@
+"""
+Köşe İşaretleri (Fiducial) ile Kayıt
+Formun köşelerine basılmış dolu kareleri veya ArUco işaretlerini bulur ve
+kağıt köşelerinin yerine kullanılacak dört noktayı döndürür.
+
+Kontur aramasının aksine arama sınırlıdır: yalnızca görüntünün dört
+köşesindeki pencerelere (config.FIDUCIALS["search_fraction"]) bakılır ve her
+pencerede görüntü köşesine en yakın uygun işaret seçilir. İşaretlerin dış
+köşeleri tam çözünürlükte cornerSubPix ile iyileştirilir; dağınık masada
+bile homografi dört kesin noktadan hesaplanır.
+
+    mode = "squares": Otsu ile koyu bölgeler, dörtgen + kareye yakın + dolu
+    mode = "aruco":   cv2.aruco (OpenCV >= 4.7 veya contrib), aruco_ids
+                      içindeki işaretler (kağıt hangi yönde çekilirse çekilsin)
+"""
+
+import cv2
+import numpy as np
+
+import config
+from perspective import order_points, pyramid_downscale, refine_corners
+
+# Köşe adı -> (görüntü köşesinin x, y oranı); dönüş sırası da budur
+CORNERS = {
+    "tl": (0, 0),
+    "tr": (1, 0),
+    "br": (1, 1),
+    "bl": (0, 1),
+}
+
+# Kareye yakınlık (kısa / uzun kenar) ve doluluk (kontur alanı / dikdörtgen alanı) alt sınırları
+MIN_SQUARENESS = 0.6
+MIN_SOLIDITY = 0.8
+
+# Dört işaretin oluşturduğu dörtgen en az görüntü alanının bu oranı kadar olmalı
+MIN_QUAD_RATIO = 0.15
+
+
+def _search_windows(shape, fraction):
+    """Köşe adı -> (x0, y0, x1, y1) arama penceresi"""
+    h, w = shape[:2]
+    sw, sh = int(w * fraction), int(h * fraction)
+    return {
+        name: (int(fx * (w - sw)), int(fy * (h - sh)), int(fx * (w - sw)) + sw, int(fy * (h - sh)) + sh)
+        for name, (fx, fy) in CORNERS.items()
+    }
+
+
+def _outer_vertex(quad, corner, shape):
+    """Dörtgenin görüntü köşesine en yakın köşesi ve uzaklığı"""
+    h, w = shape[:2]
+    fx, fy = CORNERS[corner]
+    target = np.array([fx * (w - 1), fy * (h - 1)], dtype=np.float32)
+    distances = np.linalg.norm(quad - target, axis=1)
+    i = int(np.argmin(distances))
+    return quad[i], float(distances[i])
+
+
+def find_square_markers(gray, settings):
+    """
+    Her köşe penceresinde dolu kare işaret ara
+
+    Returns:
+        {köşe adı: dış köşe (x, y)} (bulunamayan köşeler yok)
+    """
+    image_area = float(gray.shape[0] * gray.shape[1])
+    min_area = settings["min_area_ratio"] * image_area
+    max_area = settings["max_area_ratio"] * image_area
+
+    found = {}
+    for name, (x0, y0, x1, y1) in _search_windows(gray.shape, settings["search_fraction"]).items():
+        patch = gray[y0:y1, x0:x1]
+        _, dark = cv2.threshold(patch, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(dark, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        best = None
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if not min_area <= area <= max_area:
+                continue
+
+            approx = cv2.approxPolyDP(contour, 0.05 * cv2.arcLength(contour, True), True)
+            if len(approx) != 4 or not cv2.isContourConvex(approx):
+                continue
+
+            _, (rw, rh), _ = cv2.minAreaRect(contour)
+            if min(rw, rh) / max(rw, rh) < MIN_SQUARENESS or area / (rw * rh) < MIN_SOLIDITY:
+                continue
+
+            quad = approx.reshape(4, 2).astype(np.float32) + (x0, y0)
+            vertex, distance = _outer_vertex(quad, name, gray.shape)
+            if best is None or distance < best[1]:
+                best = (vertex, distance)
+
+        if best is not None:
+            found[name] = best[0]
+
+    return found
+
+
+def _aruco_detector(dictionary_name):
+    """ArUco sözlüğü ve dedektörü (OpenCV sürümüne göre); aruco yoksa None"""
+    aruco = getattr(cv2, "aruco", None)
+    if aruco is None:
+        return None
+
+    dictionary = aruco.getPredefinedDictionary(getattr(aruco, dictionary_name))
+    if hasattr(aruco, "ArucoDetector"):
+        detector = aruco.ArucoDetector(dictionary, aruco.DetectorParameters())
+        return detector.detectMarkers
+
+    parameters = aruco.DetectorParameters_create()
+    return lambda image: aruco.detectMarkers(image, dictionary, parameters=parameters)
+
+
+def find_aruco_markers(gray, settings):
+    """
+    Her köşe penceresinde formun ArUco işaretlerinden birini ara
+    Kağıt ters veya yan çekilmiş olabileceğinden pencerede aruco_ids içindeki
+    herhangi bir id kabul edilir; yön sonradan bulunur (bkz. orientation).
+
+    Returns:
+        {köşe adı: dış köşe (x, y)} (bulunamayan köşeler yok)
+    """
+    detect = _aruco_detector(settings["aruco_dictionary"])
+    if detect is None:
+        return {}
+
+    expected = set(settings["aruco_ids"])
+    found = {}
+    for name, (x0, y0, x1, y1) in _search_windows(gray.shape, settings["search_fraction"]).items():
+        corners, ids, _ = detect(gray[y0:y1, x0:x1])
+        if ids is None:
+            continue
+
+        best = None
+        for marker_corners, detected_id in zip(corners, ids.flatten()):
+            if int(detected_id) not in expected:
+                continue
+            quad = marker_corners.reshape(4, 2).astype(np.float32) + (x0, y0)
+            vertex, distance = _outer_vertex(quad, name, gray.shape)
+            if best is None or distance < best[1]:
+                best = (vertex, distance)
+
+        if best is not None:
+            found[name] = best[0]
+
+    return found
+
+
+def _page_corners(outer, inset):
+    """İşaretlerin dış köşelerinden sayfa köşelerini çıkar (page_inset ile)"""
+    fx, fy = inset
+    if not fx and not fy:
+        return outer
+
+    # İşaret köşelerinin sayfadaki yeri (birim kare üzerinde)
+    marked = np.array([[fx, fy], [1 - fx, fy], [1 - fx, 1 - fy], [fx, 1 - fy]], dtype=np.float32)
+    page = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float32)
+    H = cv2.getPerspectiveTransform(marked, outer)
+    return cv2.perspectiveTransform(page.reshape(-1, 1, 2), H).reshape(4, 2)
+
+
+def find_fiducial_corners(image, settings=None):
+    """
+    Köşe işaretlerinden kağıt köşelerini bul
+
+    Args:
+        image: BGR veya gri görüntü
+        settings: config.FIDUCIALS üzerine yazılacak ayarlar
+
+    Returns:
+        4x2 float32 köşeler (sol-üst, sağ-üst, sağ-alt, sol-alt; tam çözünürlük)
+        veya None (dört işaret bulunamadı / geçersiz dörtgen / mode kapalı)
+    """
+    settings = {**config.FIDUCIALS, **(settings or {})}
+    mode = settings.get("mode")
+    if not mode:
+        return None
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small, scale = pyramid_downscale(gray, config.PERSPECTIVE.get("pyramid_max_side"))
+
+    finder = find_aruco_markers if mode == "aruco" else find_square_markers
+    found = finder(small, settings)
+    if len(found) < 4:
+        return None
+
+    outer = np.array([found[name] for name in CORNERS], dtype=np.float32)
+
+    # İşaretler makul bir sayfa dörtgeni oluşturmalı
+    if not cv2.isContourConvex(order_points(outer).reshape(-1, 1, 2)):
+        return None
+    if cv2.contourArea(outer) < MIN_QUAD_RATIO * small.shape[0] * small.shape[1]:
+        return None
+
+    outer = refine_corners(gray, outer * scale, max(5, int(round(2 * scale))))
+    return _page_corners(outer, settings["page_inset"]).astype(np.float32)
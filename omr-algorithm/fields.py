@@ -0,0 +1,122 @@
+"""
+Form Alanları (Rakam Bubble Grid'leri)
+Başlık bölgesindeki öğrenci numarası gibi rakam alanlarını cevaplarla aynı
+geçişte okur.
+
+Rakam alanı, sayfada (oranlarla verilen) bir kutuya yerleşmiş bir bubble
+grid'idir: her sütun bir basamak, her satır bir semboldür (varsayılan 0-9,
+yukarıdan aşağı). Alanın bubble merkezleri kutudan bir kez hesaplanıp
+CompiledCalibration olarak derlenir (soru = basamak, şık = sembol); böylece
+cevaplarla aynı SamplingPlan önbelleği ve aynı vektörel örnekleyici
+kullanılır. Kağıt köşeleri bulunduysa pencereler ROI homografisinden
+türetilen alan homografisiyle doğrudan fotoğraftan örneklenir (warp yok);
+bulunamadıysa prepare_sheet'in yeniden boyutlandırdığı sayfadan okunur.
+"""
+
+import numpy as np
+
+from calibration_store import CompiledCalibration
+from decision import decide_marks
+from sampling import get_sampling_plan
+
+DIGITS = "0123456789"
+
+
+class DigitField:
+    """Rakam alanı: basamak sütunları x sembol satırları"""
+
+    def __init__(self, name, spec, box, thresholds):
+        self.name = name
+        self.box = box
+        self.digits = int(spec["digits"])
+        self.symbols = list(spec.get("symbols", DIGITS))
+        self.thresholds = {**thresholds, **spec.get("thresholds", {})}
+
+        # Bubble merkezleri alan kutusunun içinde (x, y): hücre ortaları
+        x1, y1, x2, y2 = box
+        col_pitch = (x2 - x1) / float(self.digits)
+        row_pitch = (y2 - y1) / float(len(self.symbols))
+        cols = (np.arange(self.digits) + 0.5) * col_pitch
+        rows = (np.arange(len(self.symbols)) + 0.5) * row_pitch
+        points = np.stack(np.meshgrid(cols, rows, indexing="ij"), axis=-1)
+
+        # Derlenmiş düzen süreç boyunca aynı nesne: örnekleme planı önbellekte kalır
+        self.layout = CompiledCalibration(
+            np.arange(1, self.digits + 1),
+            points,
+            np.ones(points.shape[:2], dtype=bool),
+            self.symbols,
+        )
+
+    def shape(self):
+        x1, y1, x2, y2 = self.box
+        return (y2 - y1, x2 - x1)
+
+    def sample(self, sheet, page_size):
+        """
+        Alan bubble'larının ortalama parlaklığı (basamak x sembol)
+
+        Args:
+            sheet: prepare_sheet sonucu (source, roi_matrix, roi_box; köşe
+                yoksa page = page_size'a boyutlandırılmış gri sayfa)
+            page_size: Düzeltilmiş sayfa (genişlik, yükseklik)
+        """
+        x1, y1, x2, y2 = self.box
+        plan = get_sampling_plan(self.layout, self.shape(), self.thresholds["bubble_radius"])
+
+        if sheet["roi_matrix"] is not None:
+            # Kaynak -> ROI homografisini alan kutusuna kaydır
+            roi_x1, roi_y1 = sheet["roi_box"][:2]
+            shift = np.array([[1, 0, roi_x1 - x1], [0, 1, roi_y1 - y1], [0, 0, 1]], dtype=np.float64)
+            return plan.sample_source(sheet["source"], shift @ sheet["roi_matrix"])
+
+        return plan.sample(sheet["page"][y1:y2, x1:x2])
+
+    def decide(self, means):
+        """
+        Her basamak sütununda en koyu sembol; eşik alanın kendi ölçümlerinden
+        iki küme ayrımıyla bulunur (bkz. decision, eşik: min_gap)
+
+        Returns:
+            dict: value (tüm basamaklar okunduysa dizge, değilse None),
+            digits (basamak başına sembol veya None), confidence
+        """
+        decision = decide_marks(means, self.layout.valid, self.thresholds["min_gap"])
+        choice = decision["choice"]
+
+        digits = [self.symbols[i] if i >= 0 else None for i in choice]
+        confidence = decision["confidence"]
+        return {
+            "value": "".join(digits) if (choice >= 0).all() else None,
+            "digits": digits,
+            "confidence": round(float(confidence.mean()), 2) if len(confidence) else 0.0,
+        }
+
+    def read(self, sheet, page_size):
+        """Alanı örnekle ve oku (bkz. decide)"""
+        return self.decide(self.sample(sheet, page_size))
+
+
+def build_fields(specs, page_box, thresholds, enable=()):
+    """
+    Şablonun "fields" kayıtlarından alan nesneleri
+
+    Args:
+        specs: {ad: {"type": "digits", "box": oranlar, "digits": N, ...}};
+            "enabled": False olan alanlar atlanır
+        page_box: Oran kutusunu sayfa piksel kutusuna çeviren fonksiyon
+        thresholds: Şablon eşikleri (alan kendi eşikleriyle ezebilir)
+        enable: "enabled": False olsa da kurulacak alan adları
+            (bkz. config.ENABLED_FIELDS)
+
+    Raises:
+        ValueError: Bilinmeyen alan türü
+    """
+    fields = {}
+    for name, spec in (specs or {}).items():
+        if not spec.get("enabled", True) and name not in enable:
+            continue
+        if spec.get("type", "digits") != "digits":
+            raise ValueError(f"Bilinmeyen alan türü: {spec.get('type')} ({name})")
+        fields[name] = DigitField(name, spec, page_box(spec["box"]), thresholds)
+    return fields
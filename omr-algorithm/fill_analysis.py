@@ -0,0 +1,96 @@
+"""
+Bubble Doluluk Analizi
+Eşiklenmiş (dolu = 255) görüntüde bubble'ların doluluk oranlarını hesaplar.
+
+Her bubble için tam boyutlu maske çizmek yerine yarıçap başına bir kez
+hazırlanan dairesel şablon (stamp) ofsetleri kullanılır; aynı yarıçaplı tüm
+bubble'lar tek bir NumPy indeksleme işlemiyle yalnızca kendi küçük
+pencerelerinden okunur. Maliyet bubble x görüntü pikseli yerine
+bubble x daire alanıdır.
+"""
+
+import cv2
+import numpy as np
+
+# Yarıçap -> (dy, dx) daire içi piksel ofsetleri
+_stamp_cache = {}
+
+
+def circle_offsets(radius):
+    """
+    Dolu dairenin piksel ofsetlerini döndür (cv2.circle ile aynı rasterleştirme)
+
+    Returns:
+        (dy, dx): merkeze göre satır/sütun ofsetleri
+    """
+    radius = max(0, int(radius))
+    offsets = _stamp_cache.get(radius)
+    if offsets is None:
+        size = 2 * radius + 1
+        stamp = np.zeros((size, size), dtype=np.uint8)
+        cv2.circle(stamp, (radius, radius), radius, 255, -1)
+        dy, dx = np.nonzero(stamp)
+        offsets = (dy - radius, dx - radius)
+        _stamp_cache[radius] = offsets
+    return offsets
+
+
+def fill_ratios(binary, circles):
+    """
+    Tüm bubble'ların doluluk oranlarını tek geçişte hesapla
+
+    Args:
+        binary: Eşiklenmiş tek kanallı görüntü (dolu pikseller 255)
+        circles: (N, 3) dizi veya liste: (cx, cy, yarıçap)
+
+    Returns:
+        (N,) float dizi: daire içindeki dolu piksel oranı
+        (görüntü dışına taşan kısımlar sayılmaz)
+    """
+    circles = np.asarray(circles, dtype=np.int64).reshape(-1, 3)
+    ratios = np.zeros(len(circles), dtype=np.float64)
+    height, width = binary.shape[:2]
+
+    for radius in np.unique(circles[:, 2]):
+        idx = np.nonzero(circles[:, 2] == radius)[0]
+        dy, dx = circle_offsets(radius)
+
+        ys = circles[idx, 1][:, None] + dy[None, :]
+        xs = circles[idx, 0][:, None] + dx[None, :]
+        inside = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+
+        values = binary[np.clip(ys, 0, height - 1), np.clip(xs, 0, width - 1)]
+        white = np.count_nonzero((values == 255) & inside, axis=1)
+        total = np.count_nonzero(inside, axis=1)
+
+        ratios[idx] = np.divide(white, total, out=np.zeros(len(idx)), where=total > 0)
+
+    return ratios
+
+
+def fill_ratio_grid(binary, grid, inset=2, min_radius=0):
+    """
+    {soru_no: {şık: (cx, cy, r)}} grid'i için doluluk oranları
+
+    Args:
+        binary: Eşiklenmiş görüntü (dolu pikseller 255)
+        grid: Organize edilmiş bubble grid'i
+        inset: Kenar çizgisini dışlamak için yarıçaptan düşülen piksel
+        min_radius: Ölçüm dairesinin en küçük yarıçapı
+
+    Returns:
+        {soru_no: {şık: doluluk}}
+    """
+    keys = []
+    circles = []
+    for q_num, options in grid.items():
+        for option, (cx, cy, r) in options.items():
+            keys.append((q_num, option))
+            circles.append((cx, cy, max(min_radius, r - inset)))
+
+    ratios = fill_ratios(binary, circles) if circles else []
+
+    result = {q_num: {} for q_num in grid}
+    for (q_num, option), ratio in zip(keys, ratios):
+        result[q_num][option] = float(ratio)
+    return result
@@ -0,0 +1,148 @@
+"""
+Kare Kalite Ön Kontrolü
+Canlı taramada karelerin çoğu kullanılamaz (bulanık, karanlık, parlamalı veya
+kağıt kadrajda değil). Bu kareleri kağıt tespiti, warp ve eşikleme
+yapılmadan, küçük bir önizleme üzerinde birkaç milisaniyede reddeder.
+
+Ölçümler (config.FRAME_QUALITY eşikleriyle karşılaştırılır):
+    brightness     ortalama gri seviye
+    sheet_ratio    Otsu ile ayrılan en büyük parlak bölgenin kare alanına oranı
+    sheet_contrast bu bölge ile geri kalanın ortalama gri farkı
+    glare_ratio    kağıttaki en büyük parlama lekesinin kağıt alanına oranı;
+                   leke = kağıdın medyanından belirgin parlak, doymuş
+                   (>= GLARE_LEVEL) pikseller (bkz. glare_ratio)
+    sharpness      orta bölgenin Laplacian varyansı
+
+Sonuç, mobil uygulamanın kullanıcıya gösterebileceği yapılandırılmış bir
+sebep içerir:
+    {"ok": False, "reason": "blurry", "message": "...", "metrics": {...}}
+"""
+
+import cv2
+import numpy as np
+
+import config
+
+# Sebep kodları ve kullanıcı mesajları (kontrol sırası)
+REASONS = {
+    "too_dark": "Görüntü çok karanlık, daha aydınlık bir ortamda çekin",
+    "no_sheet": "Kağıt bulunamadı, formun tamamını kadraja alın",
+    "glare": "Kağıt üzerinde parlama veya aşırı ışık var, ışığın açısını değiştirin",
+    "blurry": "Görüntü bulanık, telefonu sabit tutun",
+}
+
+# Doymuş piksel seviyesi; parlama pikseli ayrıca kağıt medyanını
+# config.FRAME_QUALITY["glare_margin"] kadar aşmalı
+GLARE_LEVEL = 250
+
+
+def make_thumbnail(image, max_side):
+    """Uzun kenarı max_side olacak şekilde gri önizleme üret"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    h, w = gray.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale >= 1.0:
+        return gray
+    return cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def sheet_mask(thumb):
+    """
+    Otsu ile parlak bölgeyi ayır ve en büyük parçasını kağıt kabul et
+
+    Returns:
+        (maske, alan oranı, kağıt-arka plan kontrastı)
+    """
+    _, bright = cv2.threshold(thumb, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(bright, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, 0.0, 0.0
+
+    largest = max(contours, key=cv2.contourArea)
+    mask = np.zeros_like(thumb)
+    cv2.drawContours(mask, [largest], -1, 255, -1)
+
+    ratio = cv2.contourArea(largest) / float(thumb.size)
+    inside = mask > 0
+    if inside.all():
+        # Kağıt kadrajı dolduruyor; kontrast mürekkep ile kağıt arasında ölçülür
+        contrast = float(thumb[bright > 0].mean() - thumb[bright == 0].mean()) if (bright == 0).any() else 0.0
+    else:
+        contrast = float(thumb[inside].mean() - thumb[~inside].mean())
+    return mask, ratio, contrast
+
+
+def glare_ratio(thumb, mask, margin):
+    """
+    Kağıttaki en büyük parlama lekesinin kağıt alanına oranı
+    Doğru pozlanmış beyaz kağıdın kendisi de doymuş olabilir; bu yüzden
+    doymuş piksel sayılmaz, kağıdın medyanından en az margin parlak doymuş
+    piksellerin oluşturduğu kompakt lekeye bakılır (ince kenar / yazı
+    parlamaları 3x3 açma ile atılır).
+    """
+    inside = mask > 0
+    paper = thumb[inside]
+    if paper.size == 0:
+        return 0.0
+
+    level = max(GLARE_LEVEL, float(np.median(paper)) + margin)
+    if level > 255:
+        return 0.0
+
+    spots = ((thumb >= level) & inside).astype(np.uint8)
+    spots = cv2.morphologyEx(spots, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(spots, connectivity=8)
+    if count <= 1:
+        return 0.0
+    return float(stats[1:, cv2.CC_STAT_AREA].max()) / paper.size
+
+
+def assess_frame(image, thresholds=None):
+    """
+    Kareyi hızlıca değerlendir
+
+    Args:
+        image: BGR veya gri kare
+        thresholds: Eşikler (varsayılan config.FRAME_QUALITY)
+
+    Returns:
+        dict: ok, reason (None veya REASONS anahtarı), message, metrics
+    """
+    limits = {**config.FRAME_QUALITY, **(thresholds or {})}
+    thumb = make_thumbnail(image, limits["thumbnail_side"])
+
+    brightness = float(thumb.mean())
+    mask, sheet_ratio, sheet_contrast = sheet_mask(thumb)
+
+    glare = glare_ratio(thumb, mask, limits["glare_margin"]) if mask is not None else 0.0
+
+    # Netlik, kağıt kenarı baskın olmasın diye orta bölgede ölçülür
+    h, w = thumb.shape
+    center = thumb[h // 4:3 * h // 4, w // 4:3 * w // 4]
+    sharpness = float(cv2.Laplacian(center, cv2.CV_64F).var())
+
+    metrics = {
+        "brightness": round(brightness, 1),
+        "sheet_ratio": round(sheet_ratio, 3),
+        "sheet_contrast": round(sheet_contrast, 1),
+        "glare_ratio": round(glare, 3),
+        "sharpness": round(sharpness, 1),
+    }
+
+    if brightness < limits["min_brightness"]:
+        reason = "too_dark"
+    elif sheet_ratio < limits["min_sheet_ratio"] or sheet_contrast < limits["min_sheet_contrast"]:
+        reason = "no_sheet"
+    elif glare > limits["max_glare_ratio"]:
+        reason = "glare"
+    elif sharpness < limits["min_sharpness"]:
+        reason = "blurry"
+    else:
+        reason = None
+
+    return {
+        "ok": reason is None,
+        "reason": reason,
+        "message": REASONS.get(reason),
+        "metrics": metrics,
+    }
@@ -0,0 +1,107 @@
+"""
+Projeksiyon Profili ile Grid Konumlandırma
+Eşiklenmiş cevap bölgesinin satır ve sütun mürekkep profillerinden (her
+satırdaki / sütundaki dolu piksel sayısı) bubble satırlarını ve şık
+sütunlarını bulur.
+
+Sabit width / GRID_COLS x height / GRID_ROWS hücreleri baskı kaydığında
+bubble'ları yanlış soruya atar; morfolojik çizgi çıkarma ise tam sayfada
+pahalıdır. Profil tek geçişte (O(genişlik x yükseklik)) çıkarılır, üçgen
+çekirdekle yumuşatılır (bir bubble halkasının iki kenarı tek tepeye
+birleşir) ve en yüksek tepeler en az yarım aralıkla seçilir. Tepe konumları
+parabol uydurmasıyla alt-piksel hassasiyetine getirilir.
+"""
+
+import numpy as np
+
+
+def ink_profile(binary, axis):
+    """
+    Mürekkep profili
+
+    Args:
+        binary: Eşiklenmiş görüntü (mürekkep != 0)
+        axis: 1 = satır profili (uzunluk yükseklik), 0 = sütun profili
+    """
+    return np.count_nonzero(binary, axis=axis).astype(np.float32)
+
+
+def smooth_profile(profile, window):
+    """
+    Üçgen çekirdekle yumuşat (uzunluk korunur)
+    Kutu filtresinden farklı olarak halkanın iki kenarı arasında düz bir
+    plato değil, ortada tek bir tepe oluşur.
+    """
+    half = int(round(window / 2.0))
+    if half < 1:
+        return profile
+    kernel = (half + 1 - np.abs(np.arange(-half, half + 1))).astype(np.float32)
+    return np.convolve(profile, kernel / kernel.sum(), mode="same")
+
+
+def find_peaks(profile, count, min_distance):
+    """
+    Aralarında en az min_distance olan en yüksek count tepeyi bul
+
+    Returns:
+        Artan sırada alt-piksel tepe konumları (float dizi) veya
+        None (yeterli tepe yoksa)
+    """
+    p = profile
+    if len(p) < 3:
+        return None
+
+    # Yerel maksimumlar, yüksekten alçağa
+    local = np.nonzero((p[1:-1] >= p[:-2]) & (p[1:-1] > p[2:]) & (p[1:-1] > 0))[0] + 1
+    local = local[np.argsort(p[local])[::-1]]
+
+    chosen = []
+    for i in local:
+        if all(abs(i - c) >= min_distance for c in chosen):
+            chosen.append(i)
+            if len(chosen) == count:
+                break
+    if len(chosen) < count:
+        return None
+
+    peaks = np.sort(np.array(chosen))
+    left, center, right = p[peaks - 1], p[peaks], p[peaks + 1]
+    curvature = left - 2 * center + right
+    offset = np.divide(0.5 * (left - right), curvature, out=np.zeros(len(peaks), dtype=np.float32),
+                       where=curvature < 0)
+    return peaks + np.clip(offset, -0.5, 0.5)
+
+
+def locate_grid(binary, rows, columns):
+    """
+    Bubble satır ve şık sütunu merkezlerini bul
+
+    Args:
+        binary: Eşiklenmiş cevap bölgesi (bubble mürekkebi != 0)
+        rows: Beklenen bubble satırı sayısı
+        columns: Beklenen şık sütunu sayısı (blok sayısı x şık sayısı)
+
+    Returns:
+        (satır merkezleri (rows,), sütun merkezleri (columns,)) veya None
+    """
+    height, width = binary.shape[:2]
+    row_pitch = height / float(rows)
+    column_pitch = width / float(columns)
+
+    ys = find_peaks(smooth_profile(ink_profile(binary, 1), row_pitch / 2), rows, row_pitch / 2)
+    xs = find_peaks(smooth_profile(ink_profile(binary, 0), column_pitch / 2), columns, column_pitch / 2)
+    if ys is None or xs is None:
+        return None
+    return ys, xs
+
+
+def nearest_index(centres, values, tolerance):
+    """
+    Her değer için en yakın merkezin indeksi (tolerance dışındakiler -1)
+    """
+    centres = np.asarray(centres, dtype=np.float32)
+    values = np.asarray(values, dtype=np.float32)
+    distance = np.abs(values[:, None] - centres[None, :])
+    index = distance.argmin(axis=1)
+    index[distance[np.arange(len(values)), index] > tolerance] = -1
+    return index
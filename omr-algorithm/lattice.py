@@ -0,0 +1,210 @@
+"""
+Bubble Kafesi (Lattice) Uydurma
+Optik formdaki bubble'lar düzenli bir kafes üzerindedir:
+
+    konum = başlangıç + şık x şık_adımı + satır x satır_adımı + blok x blok_adımı
+
+Her adım 2B bir vektördür (hafif dönme / eğiklik de modele dahil), yani
+model 4x2 parametrelik afin bir eşlemedir. Tespit edilen bubble
+merkezlerine (şık, satır, blok) indeksleriyle birlikte RANSAC ile
+uydurulur: yanlış indekslenmiş veya gürültü lekeleri aykırı değer olarak
+elenir, model inlier'larla en küçük karelerle yeniden hesaplanır.
+
+Ardından tüm Q x şık konumları analitik olarak hesaplanır; bir bubble
+tespit edilemese bile soru atlanmaz ve sonraki sorular yeniden
+numaralanmaz. Örnekleme, kaç leke bulunursa bulunsun sabit boyutlu olur.
+"""
+
+import numpy as np
+
+# RANSAC ayarları
+RANSAC_ITERATIONS = 200
+MIN_INLIER_RATIO = 0.5
+
+
+def design_matrix(indices):
+    """(N, 3) (şık, satır, blok) indekslerinden (N, 4) [1, şık, satır, blok] matrisi"""
+    indices = np.asarray(indices, dtype=np.float64).reshape(-1, 3)
+    return np.hstack([np.ones((len(indices), 1)), indices])
+
+
+def predict(model, indices):
+    """Kafes modelinden (N, 2) konum"""
+    return design_matrix(indices) @ model
+
+
+def lattice_indices(rows, blocks, options):
+    """Tüm kafes indeksleri: (rows x blocks x options, 3) (şık, satır, blok); satır, blok, şık sırasıyla"""
+    row, block, option = np.meshgrid(np.arange(rows), np.arange(blocks), np.arange(options), indexing="ij")
+    return np.stack([option.ravel(), row.ravel(), block.ravel()], axis=1)
+
+
+def fit_lattice(points, indices, tolerance, iterations=RANSAC_ITERATIONS, seed=0):
+    """
+    İndekslenmiş bubble merkezlerine RANSAC ile afin kafes uydur
+
+    Args:
+        points: (N, 2) tespit edilen merkezler
+        indices: (N, 3) her merkezin (şık, satır, blok) indeksi
+        tolerance: Inlier sayılmak için en büyük konum hatası (piksel)
+        iterations: RANSAC deneme sayısı
+        seed: Tekrarlanabilir örnekleme için tohum
+
+    Returns:
+        (model (4, 2), inlier maskesi (N,), ortalama inlier hatası) veya None
+        (yeterli / bağımsız nokta yoksa veya inlier oranı düşükse)
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    A = design_matrix(indices)
+    n = len(points)
+    if n < 4:
+        return None
+
+    # Bir eksende (ör. tek blok) hiç çeşitlilik yoksa o adım çözülemez;
+    # bu sütun modelden çıkarılır, adımı sıfır kabul edilir
+    free = np.ones(4, dtype=bool)
+    free[1:] = np.ptp(A[:, 1:], axis=0) > 0
+    A_free = A[:, free]
+    k = int(free.sum())
+    if n < k or np.linalg.matrix_rank(A_free) < k:
+        return None
+
+    rng = np.random.RandomState(seed)
+    best_mask = None
+    best_count = 0
+    for _ in range(iterations):
+        sample = rng.choice(n, k, replace=False)
+        if np.linalg.matrix_rank(A_free[sample]) < k:
+            continue
+        params = np.linalg.lstsq(A_free[sample], points[sample], rcond=None)[0]
+        errors = np.linalg.norm(A_free @ params - points, axis=1)
+        mask = errors < tolerance
+        count = int(mask.sum())
+        if count > best_count:
+            best_mask, best_count = mask, count
+            if count == n:
+                break
+
+    if best_mask is None or best_count < max(k, MIN_INLIER_RATIO * n):
+        return None
+    if np.linalg.matrix_rank(A_free[best_mask]) < k:
+        return None
+
+    # Inlier'larla yeniden uydur
+    params = np.linalg.lstsq(A_free[best_mask], points[best_mask], rcond=None)[0]
+    model = np.zeros((4, 2))
+    model[free] = params
+    errors = np.linalg.norm(A @ model - points, axis=1)
+    mask = errors < tolerance
+    return model, mask, float(errors[mask].mean()) if mask.any() else 0.0
+
+
+def group_rows(bubbles, tolerance, min_count=4):
+    """
+    (x, y, r) bubble'larını y'ye göre satırlara grupla
+    Ardışık y farkı tolerance altındaysa aynı satır; min_count'tan az
+    bubble'lı satırlar (yazı, gürültü) atılır.
+    """
+    if not bubbles:
+        return []
+
+    bubbles_sorted_y = sorted(bubbles, key=lambda b: b[1])
+    rows = []
+    current_row = [bubbles_sorted_y[0]]
+
+    for prev_bubble, curr_bubble in zip(bubbles_sorted_y, bubbles_sorted_y[1:]):
+        if abs(curr_bubble[1] - prev_bubble[1]) < tolerance:
+            current_row.append(curr_bubble)
+        else:
+            if len(current_row) >= min_count:
+                rows.append(current_row)
+            current_row = [curr_bubble]
+
+    if len(current_row) >= min_count:
+        rows.append(current_row)
+
+    return rows
+
+
+def fit_rows(rows, num_options, expected_rows=None, first_row=None):
+    """
+    Satırlara ayrılmış bubble'lara kafes uydur
+
+    Satır indeksi satır merkezleri arasındaki medyan adımdan, şık / blok
+    indeksi tüm satırlardaki x konumlarının kümelenmesinden gelir; bir
+    satırda eksik bubble sonraki soruları kaydırmaz. Şık sütunları
+    1.5 şık adımından büyük boşlukta veya num_options'a ulaşınca yeni
+    bloğa geçer.
+
+    Satır başlangıcı şablondan sabitlenir (expected_rows verilirse): ilk
+    tespit edilen satırın indeksi first_row'a (ilk satır merkezinin beklenen
+    y'si; verilmezse tespit edilen ilk satır) uzaklığının satır adımına
+    oranından gelir ve [0, expected_rows - tespit edilen satır aralığı]
+    ile sınırlanır. Böylece ilk satırın tamamı kaçırılsa da sorular bir satır
+    kaymaz; eksik son satırlar da modelden hesaplanır (rows = expected_rows).
+
+    Args:
+        rows: group_rows sonucu
+        num_options: Sorudaki şık sayısı
+        expected_rows: Şablonun bloktaki satır sayısı (None = tespit edilen satırlar)
+        first_row: İlk satır merkezinin beklenen y'si (ROI pikseli)
+
+    Returns:
+        dict: model, rows, blocks, radius (medyan), inliers, detected,
+        error_px; veya None
+    """
+    if not rows:
+        return None
+
+    row_centres = np.array([np.median([b[1] for b in row]) for row in rows])
+    row_pitch = float(np.median(np.diff(row_centres))) if len(rows) > 1 else 1.0
+    row_index = np.rint((row_centres - row_centres[0]) / row_pitch).astype(int)
+    if expected_rows is not None and first_row is not None and len(rows) > 1:
+        offset = int(np.rint((row_centres[0] - first_row) / row_pitch))
+        row_index += int(np.clip(offset, 0, max(0, expected_rows - 1 - row_index.max())))
+
+    # Şık adımı: satır içi ardışık x farklarının medyanı (çoğu şıklar arası)
+    gaps = np.concatenate([np.diff(sorted(b[0] for b in row)) for row in rows])
+    option_pitch = float(np.median(gaps)) if len(gaps) else 0.0
+    if option_pitch <= 0:
+        return None
+
+    # Şık sütunları: tüm x'ler yarım adımdan büyük boşluklarda bölünür
+    xs = np.sort(np.array([b[0] for row in rows for b in row], dtype=np.float64))
+    splits = np.flatnonzero(np.diff(xs) > option_pitch / 2) + 1
+    column_centres = np.array([chunk.mean() for chunk in np.split(xs, splits)])
+
+    column_option, column_block = [], []
+    option, block = 0, 0
+    for i, centre in enumerate(column_centres):
+        if i > 0:
+            if centre - column_centres[i - 1] > 1.5 * option_pitch or option == num_options - 1:
+                option, block = 0, block + 1
+            else:
+                option += 1
+        column_option.append(option)
+        column_block.append(block)
+
+    points, indices, radii = [], [], []
+    for row, r_index in zip(rows, row_index):
+        for x, y, radius in row:
+            column = int(np.abs(column_centres - x).argmin())
+            points.append((x, y))
+            indices.append((column_option[column], r_index, column_block[column]))
+            radii.append(radius)
+
+    radius = int(np.median(radii))
+    fit = fit_lattice(np.array(points), np.array(indices), tolerance=max(3.0, radius / 2.0))
+    if fit is None:
+        return None
+    model, inliers, error = fit
+
+    return {
+        "model": model,
+        "rows": max(int(row_index.max()) + 1, expected_rows or 0),
+        "blocks": column_block[-1] + 1,
+        "radius": radius,
+        "inliers": int(inliers.sum()),
+        "detected": len(points),
+        "error_px": round(error, 2),
+    }
@@ -0,0 +1,190 @@
+"""
+Canlı Tarama Köşe Takibi
+Aynı oturumdaki ardışık karelerde kağıdı her seferinde baştan aramak yerine
+son bulunan dört köşeyi piramidal Lucas-Kanade optik akışıyla
+(cv2.calcOpticalFlowPyrLK) takip eder.
+
+Takip küçültülmüş gri karede yapılır (kare 2x2 kutu ortalamasıyla yarıya
+indirilir; tam çözünürlükte pyrDown'dan birkaç kat ucuz); ileri-geri
+(forward-backward) hata FB_ERROR_THRESHOLD'u aşarsa, dörtgen geçersizleşirse
+veya art arda REDETECT_EVERY kare takip edildiyse tam tespite
+(find_paper_contour) dönülür.
+Köşeler yalnızca tam tespitte tam çözünürlükte cornerSubPix ile iyileştirilir;
+takip edilen karede LK'nın alt-piksel sonucu ölçekle büyütülür, tam
+çözünürlükte ek iş yapılmaz (karenin maliyeti küçültme + iki LK çağrısıdır).
+
+Kullanım:
+    corners, tracking = SESSIONS.track(session_id, frame, find_paper_contour)
+    # tracking = {"mode": "tracked" | "detected" | "lost", ...}
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from perspective import order_points
+
+# Optik akışın çalıştığı küçük karenin uzun kenarı
+TRACK_MAX_SIDE = 640
+
+# İleri-geri takip hatası eşiği (küçük kare pikseli)
+FB_ERROR_THRESHOLD = 1.5
+
+# Birikmiş kaymayı önlemek için bu kadar takip edilen kareden sonra yeniden tespit
+REDETECT_EVERY = 30
+
+# Takip edilen dörtgen en az görüntü alanının bu oranı kadar olmalı
+MIN_AREA_RATIO = 0.1
+
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.01),
+)
+
+# Oturum yönetimi
+SESSION_TTL = 60.0   # saniye; bu süre kare gelmeyen oturum silinir
+MAX_SESSIONS = 32
+
+
+def downscale(image, max_side):
+    """
+    Uzun kenar max_side altına inene kadar kareyi yarıya indir
+    Tam yarıya INTER_LINEAR her küçük pikseli 2x2 bloğun ortalaması yapar.
+
+    Returns:
+        (küçük görüntü, ölçek): tam çözünürlük koordinatı = (küçük + 0.5) * ölçek - 0.5
+    """
+    small, scale = image, 1.0
+    while max(small.shape[:2]) > max_side:
+        height, width = small.shape[:2]
+        small = cv2.resize(small[:height - height % 2, :width - width % 2], (width // 2, height // 2),
+                           interpolation=cv2.INTER_LINEAR)
+        scale *= 2.0
+    return small, scale
+
+
+def _plausible_quad(corners, shape):
+    """Takip edilen köşeler hâlâ makul bir kağıt dörtgeni mi?"""
+    height, width = shape[:2]
+    quad = order_points(corners.reshape(4, 2).astype("float32"))
+
+    if not cv2.isContourConvex(quad.reshape(-1, 1, 2)):
+        return False
+    return cv2.contourArea(quad) >= MIN_AREA_RATIO * height * width
+
+
+class CornerTracker:
+    """Tek bir canlı tarama oturumunun köşe takibi"""
+
+    def __init__(self):
+        self.prev_gray = None
+        self.corners = None
+        self.tracked_frames = 0
+        self.last_used = time.monotonic()
+
+    def reset(self):
+        self.prev_gray = None
+        self.corners = None
+        self.tracked_frames = 0
+
+    def _track(self, gray, scale):
+        """Son köşeleri yeni kareye taşı; başarısızsa None"""
+        if (
+            self.prev_gray is None
+            or self.corners is None
+            or self.prev_gray.shape != gray.shape
+            or self.tracked_frames >= REDETECT_EVERY
+        ):
+            return None, None
+
+        p0 = ((self.corners + 0.5) / scale - 0.5).reshape(-1, 1, 2).astype(np.float32)
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, p0, None, **LK_PARAMS)
+        if p1 is None or not status.all():
+            return None, None
+
+        # Geri takip: doğru eşleşmede başlangıç noktasına geri dönülmeli
+        p0_back, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, p1, None, **LK_PARAMS)
+        if p0_back is None or not status_back.all():
+            return None, None
+
+        fb_error = float(np.linalg.norm((p0 - p0_back).reshape(-1, 2), axis=1).max())
+        if fb_error > FB_ERROR_THRESHOLD or not _plausible_quad(p1, gray.shape):
+            return None, fb_error
+
+        return (p1.reshape(4, 2) + 0.5) * scale - 0.5, fb_error
+
+    def update(self, image, detect):
+        """
+        Yeni karede köşeleri bul (önce takip, gerekirse tam tespit)
+
+        Args:
+            image: Tam çözünürlüklü BGR kare
+            detect: Tam tespit fonksiyonu, detect(image) -> köşeler veya None
+
+        Returns:
+            (köşeler veya None, {"mode": ..., "fb_error": ...})
+        """
+        self.last_used = time.monotonic()
+
+        small, scale = downscale(image, TRACK_MAX_SIDE)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        corners, fb_error = self._track(gray, scale)
+        if corners is not None:
+            self.prev_gray = gray
+            self.corners = corners
+            self.tracked_frames += 1
+            return corners, {
+                "mode": "tracked",
+                "fb_error": round(fb_error * scale, 2),
+                "frames_since_detection": self.tracked_frames,
+            }
+
+        corners = detect(image)
+        self.prev_gray = gray
+        self.corners = None if corners is None else np.asarray(corners, dtype=np.float32)
+        self.tracked_frames = 0
+
+        tracking = {"mode": "detected" if corners is not None else "lost"}
+        if fb_error is not None:
+            tracking["fb_error"] = round(fb_error * scale, 2)
+        return corners, tracking
+
+
+class LiveSessions:
+    """Oturum kimliği -> CornerTracker (süresi dolan oturumlar temizlenir)"""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.trackers = {}
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, t in self.trackers.items() if now - t.last_used > self.ttl]:
+            del self.trackers[key]
+
+        while len(self.trackers) >= self.max_sessions:
+            oldest = min(self.trackers, key=lambda k: self.trackers[k].last_used)
+            del self.trackers[oldest]
+
+    def get(self, session_id):
+        tracker = self.trackers.get(session_id)
+        if tracker is None:
+            self._prune()
+            tracker = CornerTracker()
+            self.trackers[session_id] = tracker
+        return tracker
+
+    def track(self, session_id, image, detect):
+        """Oturumun köşe takibini bir kare ilerlet"""
+        return self.get(session_id).update(image, detect)
+
+    def end(self, session_id):
+        self.trackers.pop(session_id, None)
+
+
+# Süreç genelinde paylaşılan oturumlar (worker kalıcı olduğu için kareler arası korunur)
+SESSIONS = LiveSessions()
@@ -10,6 +10,15 @@ import json
 import sys
 from pathlib import Path
 
+from candidates import bubble_candidates
+from fill_analysis import fill_ratio_grid
+from frame_quality import assess_frame
+from lattice import fit_rows, group_rows, lattice_indices, predict
+from live_tracker import SESSIONS as LIVE_SESSIONS
+from orientation import detect_orientation, page_matrix
+from perspective import find_paper_contour as detect_paper_corners
+from timing import StageTimer
+
 # Config
 TARGET_WIDTH = 800
 TARGET_HEIGHT = 1100
@@ -25,6 +34,7 @@ BUBBLE_MIN_RADIUS = 5
 BUBBLE_MAX_RADIUS = 15
 FILL_THRESHOLD = 0.35  # %35 doluluk = işaretli
 CIRCULARITY_THRESHOLD = 0.60  # Dairesellik eşiği (biraz daha esnek)
+OPTIONS = ["A", "B", "C", "D"]
 
 
 def order_points(pts):
@@ -41,53 +51,15 @@ def order_points(pts):
 
 def find_paper_contour(image):
     """
-    Görüntüde kağıt sınırlarını bul (perspective.py'den alındı)
+    Görüntüde kağıt sınırlarını bul (perspective.py'deki çok ölçekli tespit)
     Returns: 4 köşe noktası veya None
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blurred, 50, 150)
-    
-    kernel = np.ones((3, 3), np.uint8)
-    edges = cv2.dilate(edges, kernel, iterations=2)
-    
-    contours, _ = cv2.findContours(edges.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    if not contours:
-        return None
-    
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)
-    approx_factors = [0.02, 0.03, 0.04, 0.05, 0.01]
-    
-    for contour in contours[:5]:
-        area = cv2.contourArea(contour)
-        image_area = image.shape[0] * image.shape[1]
-        
-        if area < image_area * 0.1:
-            continue
-        
-        for factor in approx_factors:
-            peri = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, factor * peri, True)
-            
-            if len(approx) == 4:
-                return approx.reshape(4, 2)
-    
-    return None
+    return detect_paper_corners(image, hull_fallback=False)
 
 
-def correct_perspective(image, corners):
-    """Perspektif dönüşümü uygula"""
-    rect = order_points(corners.astype("float32"))
-    
-    dst = np.array([
-        [0, 0],
-        [TARGET_WIDTH - 1, 0],
-        [TARGET_WIDTH - 1, TARGET_HEIGHT - 1],
-        [0, TARGET_HEIGHT - 1]
-    ], dtype="float32")
-    
-    M = cv2.getPerspectiveTransform(rect, dst)
+def correct_perspective(image, corners, orientation=None):
+    """Perspektif dönüşümü uygula (orientation: ters / yan kağıt için köşe eşlemesi)"""
+    M = page_matrix(corners, TARGET_WIDTH, TARGET_HEIGHT, orientation)
     warped = cv2.warpPerspective(image, M, (TARGET_WIDTH, TARGET_HEIGHT))
     
     return warped
@@ -96,7 +68,7 @@ def correct_perspective(image, corners):
 def detect_bubbles_adaptive(image):
     """
     Calibration olmadan bubble tespit et
-    Contour analizi kullanarak bubble'ları bul
+    Bağlı bileşen analizi kullanarak bubble'ları bul
     
     Returns: [(x, y, radius), ...] listesi
     """
@@ -112,81 +84,56 @@ def detect_bubbles_adaptive(image):
     kernel = np.ones((2, 2), np.uint8)
     thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
     
-    # Contour bul
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Bağlı bileşenler: alan / en-boy / doluluk dizi filtreleri, dairesellik
+    # yalnızca kalan adaylarda (bkz. candidates)
+    return bubble_candidates(thresh, BUBBLE_MIN_RADIUS, BUBBLE_MAX_RADIUS, CIRCULARITY_THRESHOLD)
+
+
+def _lattice_grid(rows):
+    """
+    Satırlara ayrılmış bubble'lardan afin kafes uydur ve tüm konumları hesapla
+    (bkz. lattice.fit_rows); sorular satır-öncelikli numaralanır.
     
-    bubbles = []
-    height, width = gray.shape
+    Returns: {question_num: {"A": (x, y, r), ...}} veya None
+    """
+    fit = fit_rows(rows, len(OPTIONS))
+    if fit is None:
+        return None
     
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        
-        # Alan filtresi
-        min_area = 3.14 * BUBBLE_MIN_RADIUS * BUBBLE_MIN_RADIUS
-        max_area = 3.14 * BUBBLE_MAX_RADIUS * BUBBLE_MAX_RADIUS
-        
-        if area < min_area or area > max_area:
-            continue
-        
-        # Dairesellik kontrolü
-        perimeter = cv2.arcLength(contour, True)
-        if perimeter == 0:
-            continue
-        
-        circularity = 4 * 3.14159 * area / (perimeter * perimeter)
-        
-        if circularity < CIRCULARITY_THRESHOLD:
-            continue
-        
-        # Daire merkezi ve yarıçapı
-        (cx, cy), radius = cv2.minEnclosingCircle(contour)
-        cx, cy, radius = int(cx), int(cy), int(radius)
-        
-        if radius < BUBBLE_MIN_RADIUS or radius > BUBBLE_MAX_RADIUS:
-            continue
-        
-        bubbles.append((cx, cy, radius))
+    num_blocks = fit["blocks"]
+    all_indices = lattice_indices(fit["rows"], num_blocks, len(OPTIONS))
+    centres = np.rint(predict(fit["model"], all_indices)).astype(int)
     
-    return bubbles
+    organized = {}
+    for (option, row, block), (x, y) in zip(all_indices, centres):
+        question_num = int(row) * num_blocks + int(block) + 1
+        organized.setdefault(question_num, {})[OPTIONS[option]] = (int(x), int(y), fit["radius"])
+    
+    return organized
 
 
 def organize_bubbles_to_grid(bubbles, image_shape):
     """
     Bubble'ları grid sistemine yerleştir
-    Otomatik olarak sütun ve satırları tespit et
+    Otomatik olarak sütun ve satırları tespit et; konumlar afin kafesten
+    hesaplanır (eksik bubble soruyu düşürmez, numaralamayı kaydırmaz).
+    Kafes uydurulamazsa her satırdaki her 4 bubble sırayla bir soru sayılır.
     
-    Returns: {question_num: [(x, y, r, option), ...]}
+    Returns: {question_num: {"A": (x, y, r), ...}}
     """
     if not bubbles:
         return {}
     
     height, width = image_shape[:2]
     
-    # Bubble'ları y koordinatına göre satırlara grupla
-    bubbles_sorted_y = sorted(bubbles, key=lambda b: b[1])
-    
-    # Satırları bul (y ekseninde yakın olan bubble'lar aynı satır)
-    rows = []
-    current_row = [bubbles_sorted_y[0]]
-    
-    for i in range(1, len(bubbles_sorted_y)):
-        prev_bubble = bubbles_sorted_y[i-1]
-        curr_bubble = bubbles_sorted_y[i]
-        
-        # Y farkı küçükse aynı satır
-        y_diff = abs(curr_bubble[1] - prev_bubble[1])
-        threshold = height * 0.03  # %3 tolerans
-        
-        if y_diff < threshold:
-            current_row.append(curr_bubble)
-        else:
-            if len(current_row) >= 4:  # En az 4 bubble varsa geçerli satır
-                rows.append(current_row)
-            current_row = [curr_bubble]
+    # Satırları bul (y ekseninde yakın olan bubble'lar aynı satır, %3 tolerans)
+    rows = group_rows(bubbles, height * 0.03)
+    if not rows:
+        return {}
     
-    # Son satırı ekle
-    if len(current_row) >= 4:
-        rows.append(current_row)
+    organized = _lattice_grid(rows)
+    if organized is not None:
+        return organized
     
     # Her satırdaki bubble'ları x'e göre sırala ve A,B,C,D ata
     organized = {}
@@ -213,12 +160,14 @@ def organize_bubbles_to_grid(bubbles, image_shape):
     return organized
 
 
-def analyze_bubble_fill(image, bubbles_grid):
+def analyze_bubble_fill(image, bubbles_grid, timer=None):
     """
     Her bubble'ın dolu olup olmadığını kontrol et
     
     Returns: {question_num: {option: is_filled, ...}}
     """
+    timer = timer or StageTimer()
+    
     if len(image.shape) == 3:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
@@ -231,24 +180,11 @@ def analyze_bubble_fill(image, bubbles_grid):
         cv2.THRESH_BINARY_INV,
         15, 3
     )
+    timer.lap("threshold")
     
-    fill_data = {}
-    
-    for q_num, options in bubbles_grid.items():
-        fill_data[q_num] = {}
-        
-        for option, (cx, cy, r) in options.items():
-            # Daire içindeki pikselleri analiz et
-            mask = np.zeros(thresh.shape, dtype=np.uint8)
-            cv2.circle(mask, (cx, cy), max(1, r - 2), 255, -1)
-            
-            circle_pixels = cv2.bitwise_and(thresh, mask)
-            total_pixels = np.sum(mask == 255)
-            white_pixels = np.sum(circle_pixels == 255)
-            
-            fill_ratio = white_pixels / total_pixels if total_pixels > 0 else 0.0
-            fill_data[q_num][option] = fill_ratio
-    
+    # Daire içlerindeki (r - 2) dolu piksel oranları, tek geçişte
+    fill_data = fill_ratio_grid(thresh, bubbles_grid, inset=2, min_radius=1)
+    timer.lap("sampling")
     return fill_data
 
 
@@ -304,14 +240,21 @@ def draw_overlay(frame, corners, bubbles_grid, answers):
     return overlay
 
 
-def process_frame(frame_path, output_path=None, debug=False):
+def process_frame(frame_path, output_path=None, debug=False, request_id=None, session_id=None,
+                  quality_check=False):
     """
     Ana fonksiyon: Video frame'i işle
     
     Args:
-        frame_path: Frame görüntüsü yolu
+        frame_path: Frame görüntüsü yolu veya bellekteki kodlanmış frame baytları
+                    (canlı akışta geçici dosya yazmadan)
         output_path: Çıkış görüntüsü (overlay ile)
         debug: Debug modu
+        request_id: Çağıranın istek kimliği, sonuçta aynen geri döner
+        session_id: Canlı tarama oturumu; verilirse köşeler önceki kareden
+                    optik akışla takip edilir, takip bozulursa yeniden tespit edilir
+        quality_check: Önce hızlı kalite kontrolü yap (bkz. frame_quality); bulanık,
+                    karanlık, parlamalı veya kağıtsız kare birkaç ms'de reddedilir
     
     Returns:
         {
@@ -321,30 +264,78 @@ def process_frame(frame_path, output_path=None, debug=False):
             "bubbles_count": int,
             "answers": {q_num: answer, ...},
             "confidence": {q_num: conf, ...},
-            "summary": {...}
+            "summary": {...},
+            "timings": {"decode_ms": ..., "total_ms": ...},
+            "tracking": {"mode": "tracked" | "detected" | "lost", ...},  # yalnızca oturumda
+            "orientation": {"rotation": 180, "mirrored": False, ...},     # yalnızca kağıt dik değilse
+            "quality": {"ok": bool, "reason": ..., "message": ..., "metrics": {...}}
         }
     """
-    # Görüntüyü yükle
-    frame = cv2.imread(str(frame_path))
+    timer = StageTimer(request_id)
+    tracking = None
+    
+    orientation = None
+    
+    def finish(result):
+        if tracking is not None:
+            result["tracking"] = tracking
+        if orientation and (orientation["rotation"] or orientation["mirrored"]):
+            result["orientation"] = orientation
+        return timer.attach(result)
+    
+    # Görüntüyü yükle (bayt ise diske yazmadan bellekte çöz)
+    if isinstance(frame_path, (bytes, bytearray, memoryview)):
+        buffer = np.frombuffer(frame_path, dtype=np.uint8)
+        frame = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
+    else:
+        frame = cv2.imread(str(frame_path))
     if frame is None:
-        return {
+        return timer.attach({
             "success": False,
             "error": "Frame yüklenemedi",
             "paper_detected": False
-        }
-    
-    # Kağıt tespiti
-    corners = find_paper_contour(frame)
+        })
+    timer.lap("decode")
+    
+    # Kalite ön kontrolü: kötü kareyi tespit/warp/eşikleme yapmadan reddet
+    if quality_check:
+        quality = assess_frame(frame)
+        timer.lap("quality")
+        if not quality["ok"]:
+            return timer.attach({
+                "success": False,
+                "error": quality["message"],
+                "paper_detected": False,
+                "quality": quality
+            })
+    
+    # Kağıt tespiti (oturum varsa önceki kareden takip)
+    if session_id is not None:
+        corners, tracking = LIVE_SESSIONS.track(session_id, frame, find_paper_contour)
+    else:
+        corners = find_paper_contour(frame)
+    timer.lap("detect")
     
     if corners is None:
-        return {
+        return finish({
             "success": False,
             "error": "Kağıt tespit edilemedi",
             "paper_detected": False
-        }
+        })
+    
+    # Sayfa yönü (kalibrasyon yok: başlık bandı ile ters kağıt ayrılır)
+    roi_box = (
+        int(TARGET_WIDTH * ROI_X_START),
+        int(TARGET_HEIGHT * ROI_Y_START),
+        int(TARGET_WIDTH * ROI_X_END),
+        int(TARGET_HEIGHT * ROI_Y_END)
+    )
+    orientation = detect_orientation(frame, corners, (TARGET_WIDTH, TARGET_HEIGHT), roi_box)
+    timer.lap("orientation")
     
     # Perspektif düzeltme
-    corrected = correct_perspective(frame, corners)
+    corrected = correct_perspective(frame, corners, orientation)
+    timer.lap("warp")
     
     # ROI'yi çıkar (cevap bölgesi)
     h, w = corrected.shape[:2]
@@ -354,42 +345,49 @@ def process_frame(frame_path, output_path=None, debug=False):
     roi_x2 = int(w * ROI_X_END)
     
     roi = corrected[roi_y1:roi_y2, roi_x1:roi_x2]
+    timer.lap("roi")
     
     if debug:
         cv2.imwrite("debug_roi.jpg", roi)
         print(f"DEBUG: ROI boyutu: {roi.shape}")
+        timer.skip()
     
     # Bubble tespit (ROI üzerinde)
     bubbles = detect_bubbles_adaptive(roi)
+    timer.lap("bubbles")
     
     if debug:
         print(f"DEBUG: Tespit edilen bubble sayısı: {len(bubbles)}")
     
     if len(bubbles) < 4:
-        return {
+        return finish({
             "success": False,
             "error": f"Yeterli bubble bulunamadı ({len(bubbles)} bulunan, minimum 4 gerekli)",
             "paper_detected": True,
             "corners": corners.tolist(),
             "bubbles_count": len(bubbles)
-        }
+        })
     
     # Grid organizasyonu
     bubbles_grid = organize_bubbles_to_grid(bubbles, roi.shape)
+    timer.lap("grid")
     
     if debug:
         print(f"DEBUG: Organize edilen soru sayısı: {len(bubbles_grid)}")
+        timer.skip()
     
-    # Doluluk analizi
-    fill_data = analyze_bubble_fill(roi, bubbles_grid)
+    # Doluluk analizi (threshold + sampling)
+    fill_data = analyze_bubble_fill(roi, bubbles_grid, timer)
     
     # Cevap çıkarma
     answers, confidence = extract_answers(fill_data)
+    timer.lap("decision")
     
     # Overlay çiz
     if output_path:
         overlay = draw_overlay(frame, corners, bubbles_grid, answers)
         cv2.imwrite(str(output_path), overlay)
+        timer.lap("overlay")
     
     # Özet
     answered_count = sum(1 for ans in answers.values() if ans is not None)
@@ -399,8 +397,9 @@ def process_frame(frame_path, output_path=None, debug=False):
     import base64
     _, buffer = cv2.imencode('.jpg', corrected, [cv2.IMWRITE_JPEG_QUALITY, 85])
     corrected_base64 = base64.b64encode(buffer).decode('utf-8')
+    timer.lap("encoding")
     
-    return {
+    return finish({
         "success": True,
         "paper_detected": True,
         "corners": corners.tolist(),
@@ -414,7 +413,7 @@ def process_frame(frame_path, output_path=None, debug=False):
             "answered": answered_count,
             "blank": total_questions - answered_count
         }
-    }
+    })
 
 
 def main():
@@ -422,6 +421,7 @@ def main():
         print("Kullanım: python omr_adaptive_reader.py <frame_path> [output_path]")
         print("\nÖrnek:")
         print("  python omr_adaptive_reader.py test_form.png output_overlay.jpg")
+        print("  cat frame.jpg | python omr_adaptive_reader.py - output_overlay.jpg   # frame stdin'den")
         sys.exit(1)
     
     frame_path = sys.argv[1]
@@ -433,7 +433,8 @@ def main():
     print(f"📸 Frame: {frame_path}")
     print()
     
-    result = process_frame(frame_path, output_path, debug=True)
+    frame = sys.stdin.buffer.read() if frame_path == "-" else frame_path
+    result = process_frame(frame, output_path, debug=True)
     
     # Sonucu ekrana yazdır
     if not result["success"]:
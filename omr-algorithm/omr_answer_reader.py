@@ -5,49 +5,108 @@ Kalibre edilmiş bubble pozisyonlarını kullanarak işaretli şıkları tespit
 
 import cv2
 import numpy as np
+import io
 import json
 import sys
 from pathlib import Path
 
+import config
+from calibration_store import OPTIONS, as_compiled
+from decision import decide_marks
+from live_tracker import SESSIONS as LIVE_SESSIONS
+from orientation import detect_orientation, page_matrix
+from perspective import find_paper_contour as detect_paper_corners
+from sampling import get_sampling_plan, sample_bubbles
+from sheet_id import read_sheet_id
+from templates import get_calibrated_template, get_template
+from timing import StageTimer
+
+# Sayfa boyutu, cevap bölgesi ve eşikler form şablonundan gelir (bkz. templates,
+# config.TEMPLATES); buradaki değerler varsayılan şablonunkilerdir
+_DEFAULT_TEMPLATE = get_template()
+
 # Config
-TARGET_WIDTH = 1654
-TARGET_HEIGHT = 2339
+TARGET_WIDTH, TARGET_HEIGHT = _DEFAULT_TEMPLATE.page_size
 
 # Cevap bölgesi oranları
-ROI_Y_START = 0.38
-ROI_Y_END = 0.92
-ROI_X_START = 0.04
-ROI_X_END = 0.96
-
-# Şıklar
-OPTIONS = ["A", "B", "C", "D"]
+ROI_Y_START = _DEFAULT_TEMPLATE.roi["y_start"]
+ROI_Y_END = _DEFAULT_TEMPLATE.roi["y_end"]
+ROI_X_START = _DEFAULT_TEMPLATE.roi["x_start"]
+ROI_X_END = _DEFAULT_TEMPLATE.roi["x_end"]
 
 # Bubble tespit parametreleri
-BUBBLE_RADIUS = 10  # Bubble çapı (piksel)
-INTENSITY_THRESHOLD = 220  # Bu değerin altındaki bubble'lar "işaretli" sayılır (210'dan 220'ye çıkardık)
-CONTRAST_THRESHOLD = 5  # Kontrast eşiği (10'dan 5'e düşürdük - çok hassas)
+BUBBLE_RADIUS = _DEFAULT_TEMPLATE.thresholds["bubble_radius"]  # Örnekleme yarıçapı (piksel)
+# İşaret eşiği her formda iki küme ayrımıyla bulunur (bkz. decision); mürekkep
+# ve kağıt kümelerinin ortalamaları en az bu kadar ayrık olmalı
+MIN_GAP = _DEFAULT_TEMPLATE.thresholds["min_gap"]
+
+# read_answers varsayılan olarak ROI'yi warp etmez; kalibre bubble pencereleri
+# ters homografiyle doğrudan fotoğraftan örneklenir (bkz. sampling.sample_source)
+WARP_FREE_SAMPLING = True
+
+# İnsan okunur log çıktısının gideceği yer: "stdout", "stderr" veya None (sessiz)
+# Makine modunda stdout yalnızca JSON sonucu içermeli
+LOG_MODE = "stdout"
 
 
-def load_calibration():
-    """calibration.json dosyasını yükle"""
+def set_log_mode(mode):
+    """Log çıktısını yönlendir: "stdout", "stderr" veya None (sessiz)"""
+    global LOG_MODE
+    LOG_MODE = mode
+
+
+def log(*args, **kwargs):
+    """LOG_MODE'a göre insan okunur mesaj yaz"""
+    if LOG_MODE is None:
+        return
+    stream = sys.stderr if LOG_MODE == "stderr" else sys.stdout
+    print(*args, file=stream, **kwargs)
+
+
+def load_calibration(template=None, num_questions=None):
+    """
+    Derlenmiş kalibrasyonu yükle (bkz. calibration_store)
+    JSON yalnızca değiştiğinde yeniden ayrıştırılır; aynı süreçteki sonraki
+    çağrılar bellekteki dizileri, yeni süreçler calibration.npz'yi kullanır.
+    
+    Args:
+        template: Form şablonu (verilmezse varsayılan şablon)
+        num_questions: Sınavın soru sayısı; fazlası kalibrasyondan düşer
+    """
+    template = template or get_template()
     try:
-        # Get the directory where this script is located
-        script_dir = Path(__file__).parent
-        calibration_path = script_dir / "calibration.json"
-        
-        with open(calibration_path, "r") as f:
-            data = json.load(f)
-        calibration = {}
-        for q_str, options in data.items():
-            calibration[int(q_str)] = options
-        return calibration
+        return template.calibration(num_questions)
     except FileNotFoundError:
-        print("❌ HATA: calibration.json bulunamadı!")
-        print("Önce kalibrasyon yapmalısınız:")
-        print("  python calibrate_runner.py <roi_görüntüsü>")
+        log(f"❌ HATA: {template.calibration_path.name if template.calibration_path else 'calibration.json'} bulunamadı!")
+        log("Önce kalibrasyon yapmalısınız:")
+        log("  python calibrate_runner.py <roi_görüntüsü>")
         return None
     except Exception as e:
-        print(f"❌ Kalibrasyon yükleme hatası: {e}")
+        log(f"❌ Kalibrasyon yükleme hatası: {e}")
+        return None
+
+
+def routes_template(template_id=None, calibration=None):
+    """
+    Şablon formdaki QR'dan mı seçilecek: ne template_id ne kalibrasyon
+    verildiyse ve QR okuma açıksa (bkz. config.SHEET_ID)
+    """
+    return (
+        template_id is None
+        and calibration is None
+        and config.SHEET_ID["enabled"]
+        and config.SHEET_ID["route_template"]
+    )
+
+
+def orientation_layout(template):
+    """
+    Yön tespiti için şablonun derlenmiş bubble düzeni
+    Kalibrasyonu yoksa veya okunamazsa None (yön başlık bandıyla bulunur).
+    """
+    try:
+        return template.calibration()
+    except Exception:
         return None
 
 
@@ -64,78 +123,105 @@ def order_points(pts):
 
 
 def find_paper_contour(image):
-    """Görüntüde kağıt sınırlarını bul"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blurred, 50, 150)
-    
-    kernel = np.ones((3, 3), np.uint8)
-    edges = cv2.dilate(edges, kernel, iterations=2)
-    
-    contours, _ = cv2.findContours(edges.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    if not contours:
-        return None
-    
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)
-    approx_factors = [0.02, 0.03, 0.04, 0.05, 0.01]
-    
-    for contour in contours[:5]:
-        area = cv2.contourArea(contour)
-        image_area = image.shape[0] * image.shape[1]
-        
-        if area < image_area * 0.1:
-            continue
-        
-        for factor in approx_factors:
-            peri = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, factor * peri, True)
-            
-            if len(approx) == 4:
-                return approx.reshape(4, 2)
+    """
+    Görüntüde kağıt sınırlarını bul
+    Tespit küçültülmüş piramit seviyesinde yapılır, köşeler tam çözünürlükte
+    alt-piksel hassasiyetle iyileştirilir (bkz. perspective.find_paper_contour).
+    """
+    return detect_paper_corners(image, hull_fallback=False)
+
+
+def perspective_matrix(corners, orientation=None, page_size=None):
+    """
+    Kağıt köşelerinden page_size (varsayılan TARGET_WIDTH x TARGET_HEIGHT)
+    sayfaya homografi
+    orientation verilirse (bkz. orientation.detect_orientation) ters / yan /
+    aynalanmış kağıt aynı warp içinde dik sayfaya çevrilir.
+    """
+    width, height = page_size or (TARGET_WIDTH, TARGET_HEIGHT)
+    return page_matrix(corners, width, height, orientation)
+
+
+def correct_perspective(image, corners, orientation=None, page_size=None):
+    """Perspektif dönüşümü uygula (tam sayfa)"""
+    M = perspective_matrix(corners, orientation, page_size)
+    warped = cv2.warpPerspective(image, M, page_size or (TARGET_WIDTH, TARGET_HEIGHT))
     
-    return None
+    return warped
+
 
+def answer_region_box(width=TARGET_WIDTH, height=TARGET_HEIGHT):
+    """Düzeltilmiş sayfada cevap bölgesinin (x1, y1, x2, y2) piksel kutusu"""
+    return (
+        int(width * ROI_X_START),
+        int(height * ROI_Y_START),
+        int(width * ROI_X_END),
+        int(height * ROI_Y_END),
+    )
 
-def correct_perspective(image, corners):
-    """Perspektif dönüşümü uygula"""
-    rect = order_points(corners.astype("float32"))
+
+def answer_region_matrix(corners, box, orientation=None, page_size=None):
+    """Kaynak görüntüden cevap bölgesine homografi: ROI kırpması öteleme olarak eklenir (T @ M)"""
+    x1, y1, _, _ = box
+    crop = np.array([
+        [1, 0, -x1],
+        [0, 1, -y1],
+        [0, 0, 1]
+    ], dtype=np.float64)
+    
+    return crop @ perspective_matrix(corners, orientation, page_size)
+
+
+def decode_image(data):
+    """
+    Bellekteki kodlanmış görüntüyü (JPEG/PNG baytları) diske yazmadan çöz
     
-    dst = np.array([
-        [0, 0],
-        [TARGET_WIDTH - 1, 0],
-        [TARGET_WIDTH - 1, TARGET_HEIGHT - 1],
-        [0, TARGET_HEIGHT - 1]
-    ], dtype="float32")
+    Returns:
+        BGR görüntü veya None
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
     
-    M = cv2.getPerspectiveTransform(rect, dst)
-    warped = cv2.warpPerspective(image, M, (TARGET_WIDTH, TARGET_HEIGHT))
+    # OpenCV başarısız olursa PIL ile dene
+    if image is None and buffer.size:
+        log("⚠️ cv2.imdecode başarısız, PIL ile deneniyor...")
+        try:
+            from PIL import Image
+            pil_image = Image.open(io.BytesIO(bytes(data))).convert('RGB')
+            image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            log("✅ PIL ile görüntü çözüldü")
+        except Exception as e:
+            log(f"❌ PIL ile de çözülemedi: {e}")
+            image = None
     
-    return warped
+    return image
 
 
-def read_answers(image_path):
+def load_image(source):
     """
-    OMR formundaki cevapları oku
+    Görüntüyü yükle: dosya yolu veya bellekteki kodlanmış baytlar
+    (dosyadan okumada cv2.imread başarısız olursa PIL ile dene)
     
     Args:
-        image_path: Form görüntüsü yolu
-        
+        source: Dosya yolu (str/Path) veya bytes/bytearray/memoryview
+    
     Returns:
-        dict: Soru numarası -> Cevap (A/B/C/D) veya None
+        BGR görüntü veya None
     """
-    # Kalibrasyon verilerini yükle
-    calibration = load_calibration()
-    if calibration is None:
-        return None
-    
-    # Görüntüyü yükle
-    print(f"📸 Görüntü yükleniyor: {image_path}")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        log(f"📸 Görüntü bellekten çözülüyor: {len(source)} bayt")
+        image = decode_image(source)
+        if image is None:
+            log("❌ HATA: Görüntü çözülemedi")
+        return image
+    
+    image_path = source
+    log(f"📸 Görüntü yükleniyor: {image_path}")
     image = cv2.imread(str(image_path))
     
     # OpenCV başarısız olursa PIL ile dene
     if image is None:
-        print("⚠️ cv2.imread başarısız, PIL ile deneniyor...")
+        log("⚠️ cv2.imread başarısız, PIL ile deneniyor...")
         try:
             from PIL import Image
             pil_image = Image.open(str(image_path))
@@ -146,116 +232,347 @@ def read_answers(image_path):
             image = np.array(pil_image)
             # RGB -> BGR (OpenCV formatı)
             image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            print("✅ PIL ile görüntü yüklendi")
+            log("✅ PIL ile görüntü yüklendi")
         except Exception as e:
-            print(f"❌ PIL ile de yüklenemedi: {e}")
+            log(f"❌ PIL ile de yüklenemedi: {e}")
             image = None
     
     if image is None:
-        print(f"❌ HATA: Görüntü yüklenemedi: {image_path}")
-        return None
+        log(f"❌ HATA: Görüntü yüklenemedi: {image_path}")
+    
+    return image
+
+
+def prepare_sheet(image, timer=None, session_id=None, full_page=False, warp_roi=True, calibration=None,
+                  template=None, route_template=False):
+    """
+    Kağıdı bul, perspektifi düzelt ve cevap bölgesini (ROI) çıkar
+    Görüntü warp'tan önce griye çevrilir ve ROI kırpması homografiye
+    katılır; böylece warpPerspective yalnızca cevap bölgesini tek kanalda
+    üretir. Tam renkli sayfa yalnızca full_page ile (görseller için) üretilir.
+    Kağıdın yönü (ters / yan / aynalı) warp'tan önce bulunur ve homografiye
+    katılır (bkz. orientation). QR okuma açıksa (config.SHEET_ID) yön
+    bulunduktan sonra sağ üstteki QR form kimliği küçük bir pencerede okunur
+    (bkz. sheet_id).
+    
+    Args:
+        image: BGR görüntü
+        timer: Aşama süreleri için StageTimer (detect, warp, page)
+        session_id: Canlı tarama oturumu; verilirse köşeler önceki kareden
+            optik akışla takip edilir (bkz. live_tracker)
+        full_page: Düzeltilmiş tam sayfayı da üret (warped, gray)
+        warp_roi: False ise köşeler bulunduğunda ROI de warp edilmez (roi None);
+            bubble'lar source + roi_matrix ile fotoğraftan örneklenir
+        calibration: Verilirse yön kalibre bubble düzeniyle doğrulanır
+            (verilmezse başlık bandı ile yalnızca ters kağıt ayrılır)
+        template: Form şablonu (sayfa boyutu, cevap bölgesi); verilmezse varsayılan
+        route_template: QR başka bir kalibre şablon bildiriyorsa ona geç; yön
+            o şablonun bubble düzeniyle yeniden puanlanır (calibration
+            verilmediyse şablonların kendi düzenleri kullanılır)
+    
+    Returns:
+        dict: image, source (gri fotoğraf), corners (veya None), roi_matrix
+        (kaynak -> ROI homografisi veya None), warped, gray (full_page değilse
+        None), roi, roi_box (x1, y1, x2, y2), page (köşe bulunamadıysa
+        boyutlandırılmış gri sayfa, yoksa None), orientation (köşe yoksa None),
+        template (QR ile seçilmiş olabilir), sheet_id (QR yoksa None); oturumlu çağrıda ayrıca tracking
+    """
+    timer = timer or StageTimer()
+    template = template or get_template()
+    page_size = template.page_size
+    
+    # Tespit de warp da gri görüntü üzerinde yapılır (tek dönüşüm)
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
     
     # A4 tespiti ve perspektif düzeltme
-    print("🔍 A4 kağıt tespiti yapılıyor...")
-    corners = find_paper_contour(image)
+    tracking = None
+    if session_id is not None:
+        corners, tracking = LIVE_SESSIONS.track(session_id, gray_image, find_paper_contour)
+        log(f"🎯 Köşe takibi: {tracking['mode']}")
+    else:
+        log("🔍 A4 kağıt tespiti yapılıyor...")
+        corners = find_paper_contour(gray_image)
+    timer.lap("detect")
     
+    roi_x1, roi_y1, roi_x2, roi_y2 = roi_box = template.roi_box()
+    
+    # Sayfa yönü: doğru köşe eşlemesi homografiye katılır
+    orientation = roi_matrix = sheet_id = None
     if corners is not None:
-        print("✅ Kağıt köşeleri bulundu, perspektif düzeltiliyor...")
-        warped = correct_perspective(image, corners)
+        if calibration is not None:
+            calibration = as_compiled(calibration)
+        elif route_template:
+            calibration = orientation_layout(template)
+        orientation = detect_orientation(
+            gray_image, corners, page_size, roi_box, calibration
+        )
+        if orientation["rotation"] or orientation["mirrored"]:
+            log(f"🔄 Kağıt yönü düzeltiliyor: {orientation['rotation']}°"
+                + (" (aynalı)" if orientation["mirrored"] else ""))
+        timer.lap("orientation")
+        
+        # Form kimliği (QR): şablon, sınav ve öğrenci aynı geçişte
+        sheet_id = read_sheet_id(gray_image, corners, page_size, orientation)
+        if sheet_id is not None:
+            log(f"🏷️ Form kimliği: {sheet_id['raw']}")
+            routed = sheet_id["template_id"]
+            if route_template and routed and routed != template.id:
+                try:
+                    template = get_calibrated_template(routed)
+                except ValueError as e:
+                    log(f"⚠️ QR'daki şablon kullanılamadı: {e}")
+                else:
+                    page_size = template.page_size
+                    roi_x1, roi_y1, roi_x2, roi_y2 = roi_box = template.roi_box()
+                    log(f"📋 Şablon QR'dan seçildi: {template.id}")
+                    # Yön önceki şablonun düzeniyle puanlandı; seçilen şablonunkiyle yeniden
+                    orientation = detect_orientation(
+                        gray_image, corners, page_size, roi_box, orientation_layout(template)
+                    )
+        timer.lap("identify")
+        roi_matrix = answer_region_matrix(corners, roi_box, orientation, page_size)
+    
+    # ROI (cevap bölgesi) doğrudan warp edilir
+    roi = page = None
+    if corners is not None:
+        log("✅ Kağıt köşeleri bulundu, perspektif düzeltiliyor...")
+        if warp_roi:
+            log("📐 Cevap bölgesi çıkarılıyor...")
+            roi = cv2.warpPerspective(gray_image, roi_matrix, (roi_x2 - roi_x1, roi_y2 - roi_y1))
+    else:
+        log("⚠️ Kağıt köşeleri bulunamadı, görüntü resize ediliyor...")
+        # Boyutlandırılmış sayfa rakam alanları için de saklanır (bkz. fields)
+        page = cv2.resize(gray_image, page_size)
+        roi = page[roi_y1:roi_y2, roi_x1:roi_x2]
+    timer.lap("warp")
+    
+    warped = gray = None
+    if full_page:
+        if corners is not None:
+            warped = correct_perspective(image, corners, orientation, page_size)
+        else:
+            warped = cv2.resize(image, page_size)
+        gray = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+        timer.lap("page")
+    
+    sheet = {
+        "image": image,
+        "source": gray_image,
+        "corners": corners,
+        "roi_matrix": roi_matrix,
+        "warped": warped,
+        "gray": gray,
+        "roi": roi,
+        "roi_box": roi_box,
+        "page": page,
+        "orientation": orientation,
+        "template": template,
+        "sheet_id": sheet_id,
+    }
+    if tracking is not None:
+        sheet["tracking"] = tracking
+    return sheet
+
+
+def read_answers(image_path, calibration=None, request_id=None, warp_free=WARP_FREE_SAMPLING,
+                 template_id=None, num_questions=None):
+    """
+    OMR formundaki cevapları oku
+    
+    Args:
+        image_path: Form görüntüsü yolu veya bellekteki kodlanmış görüntü baytları
+        calibration: Önceden yüklenmiş kalibrasyon (verilmezse şablonun
+            kalibrasyonu okunur)
+        request_id: Çağıranın istek kimliği, sonuçta aynen geri döner
+        warp_free: Bubble'ları ROI'yi warp etmeden fotoğraftan örnekle
+            (köşe bulunamazsa yeniden boyutlandırılmış ROI kullanılır)
+        template_id: Form şablonu (bkz. config.TEMPLATES); verilmezse formdaki
+            QR'ın bildirdiği şablon (QR okuma açıksa), o da yoksa varsayılan
+        num_questions: Sınavın soru sayısı; yalnızca bu sorular örneklenir
+        
+    Returns:
+        dict: Soru numarası -> Cevap (A/B/C/D) veya None
+        (aşama süreleri "timings" altında, milisaniye)
+    
+    Raises:
+        ValueError: Bilinmeyen veya kalibrasyonu olmayan template_id
+    """
+    timer = StageTimer(request_id)
+    template = get_calibrated_template(template_id)
+    # Şablon ne açıkça verildi ne de kalibrasyonuyla sabitlendiyse QR seçer;
+    # kalibrasyon o durumda şablon belli olduktan sonra yüklenir
+    route = routes_template(template_id, calibration)
+    
+    # Kalibrasyon verilerini yükle (sınavın sorularıyla sınırlı)
+    if calibration is not None:
+        calibration = as_compiled(calibration).limit(template.question_count(num_questions))
+    elif not route:
+        calibration = load_calibration(template, num_questions)
+        if calibration is None:
+            return None
+    timer.lap("calibration")
+    
+    image = load_image(image_path)
+    if image is None:
+        return None
+    timer.lap("decode")
+    
+    sheet = prepare_sheet(image, timer, warp_roi=not warp_free, calibration=calibration, template=template,
+                          route_template=route)
+    if calibration is None:
+        calibration = load_calibration(sheet["template"], num_questions)
+        if calibration is None:
+            return None
+        timer.lap("calibration")
+    result = read_answers_from_sheet(sheet, calibration, timer)
+    return timer.attach(result)
+
+
+def read_answers_from_sheet(sheet, calibration, timer=None):
+    """
+    prepare_sheet çıktısından cevapları oku
+    ROI warp edilmediyse (warp_roi=False) bubble pencereleri ters homografiyle
+    doğrudan gri fotoğraftan örneklenir. Kağıt dik değilse düzeltilen yön
+    sonuçta "orientation" altında döner; şablon "template", okunan QR form
+    kimliği "sheet_id" altında döner.
+    Şablonun rakam alanları (bkz. fields) aynı örnekleyiciyle okunup "fields"
+    altında döner; öğrenci numarası "roll_no"ya QR'dan, yoksa roll_no
+    alanından yazılır.
+    """
+    timer = timer or StageTimer()
+    template = sheet.get("template") or get_template()
+    if sheet["roi"] is not None:
+        result = read_answers_from_roi(sheet["roi"], calibration, timer, template)
     else:
-        print("⚠️ Kağıt köşeleri bulunamadı, görüntü resize ediliyor...")
-        warped = cv2.resize(image, (TARGET_WIDTH, TARGET_HEIGHT))
+        calibration = as_compiled(calibration)
+        
+        x1, y1, x2, y2 = sheet["roi_box"]
+        log("🎯 Bubble'lar fotoğraftan örnekleniyor (warp yok)...")
+        plan = get_sampling_plan(calibration, (y2 - y1, x2 - x1), template.thresholds["bubble_radius"])
+        bubble_means = plan.sample_source(sheet["source"], sheet["roi_matrix"])
+        timer.lap("sampling")
+        
+        result = read_answers_from_means(bubble_means, calibration, timer, template)
+    
+    result["template"] = template.id
+    orientation = sheet.get("orientation")
+    if orientation and (orientation["rotation"] or orientation["mirrored"]):
+        result["orientation"] = orientation
+    
+    if template.fields:
+        result["fields"] = {
+            name: field.read(sheet, template.page_size) for name, field in template.fields.items()
+        }
+        timer.lap("fields")
+    
+    sheet_id = sheet.get("sheet_id")
+    if sheet_id:
+        result["sheet_id"] = sheet_id
+    roll_no = (sheet_id or {}).get("roll_no") or result.get("fields", {}).get("roll_no", {}).get("value")
+    if roll_no:
+        log(f"🎓 Öğrenci numarası: {roll_no}")
+        result["roll_no"] = roll_no
+    return result
+
+
+def read_answers_from_roi(roi, calibration, timer=None, template=None):
+    """
+    Gri tonlu cevap bölgesinden (ROI) kalibre edilmiş koordinatlarla cevapları oku
+    
+    Args:
+        roi: Gri tonlu cevap bölgesi
+        calibration: Derlenmiş kalibrasyon veya {soru_no: {şık: {"x", "y"}}}
+        timer: Aşama süreleri için StageTimer (sampling, decision)
+        template: Eşiklerin alınacağı form şablonu (verilmezse varsayılan)
+    
+    Returns:
+        dict: success, answers, confidence, summary
+    """
+    timer = timer or StageTimer()
+    template = template or get_template()
+    calibration = as_compiled(calibration)
+    
+    # Tüm bubble'ların ortalama parlaklığı tek seferde: (soru x şık)
+    # ROI dışında kalan bubble'lar 255 (beyaz, okunamadı) döner
+    bubble_means = sample_bubbles(roi, calibration, template.thresholds["bubble_radius"])
+    timer.lap("sampling")
     
-    # ROI (cevap bölgesi) extract et
-    print("📐 Cevap bölgesi çıkarılıyor...")
-    gray = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
+    return read_answers_from_means(bubble_means, calibration, timer, template)
+
+
+def read_answers_from_means(bubble_means, calibration, timer=None, template=None):
+    """
+    Bubble ortalama parlaklıklarından (soru x şık) cevapları çıkar
+    İşaretli / boş eşiği formun kendi ölçümlerinden iki küme ayrımıyla bulunur
+    (bkz. decision); şablondan yalnızca min_gap gelir.
     
-    roi_y1 = int(h * ROI_Y_START)
-    roi_y2 = int(h * ROI_Y_END)
-    roi_x1 = int(w * ROI_X_START)
-    roi_x2 = int(w * ROI_X_END)
+    Returns:
+        dict: success, answers, confidence, summary, split (eşik, mürekkep
+        ve kağıt kümesi ortalamaları; ayrım yoksa None)
+    """
+    timer = timer or StageTimer()
+    template = template or get_template()
+    calibration = as_compiled(calibration)
     
-    roi = gray[roi_y1:roi_y2, roi_x1:roi_x2]
-    roi_h, roi_w = roi.shape
+    # Tüm form tek vektörel adımda: eşik, seçilen şık, güven
+    decision = decide_marks(bubble_means, calibration.valid, template.thresholds["min_gap"])
+    split = decision["split"]
     
     # Her soru için cevapları oku
-    print(f"🎯 Cevaplar okunuyor... ({len(calibration)} soru)")
-    print("="*60)
+    log(f"🎯 Cevaplar okunuyor... ({len(calibration)} soru)")
+    if split is not None:
+        log(f"📊 Eşik: {split['threshold']:.0f} (mürekkep: {split['low_mean']:.0f}, kağıt: {split['high_mean']:.0f})")
+    else:
+        log("📊 Mürekkep kümesi bulunamadı (boş form)")
+    log("="*60)
     
     answers = {}
     confidence_scores = {}
     
-    for q_num in sorted(calibration.keys()):
-        # Her şık için intensity değerini ölç
-        intensities = {}
+    for qi, q_num in enumerate(calibration.keys()):
+        # Kalibre edilmiş şıkların intensity değerleri
+        intensities = {
+            option: bubble_means[qi, oi]
+            for oi, option in enumerate(calibration.options)
+            if calibration.valid[qi, oi]
+        }
         
-        for option in OPTIONS:
-            if option in calibration[q_num]:
-                x_center = calibration[q_num][option]["x"]
-                y_center = calibration[q_num][option]["y"]
-                
-                # Bubble bölgesini al
-                bx1 = max(0, x_center - BUBBLE_RADIUS)
-                bx2 = min(roi_w, x_center + BUBBLE_RADIUS)
-                by1 = max(0, y_center - BUBBLE_RADIUS)
-                by2 = min(roi_h, y_center + BUBBLE_RADIUS)
-                
-                bubble = roi[by1:by2, bx1:bx2]
-                
-                if bubble.size > 0:
-                    avg_intensity = np.mean(bubble)
-                    intensities[option] = avg_intensity
-                else:
-                    intensities[option] = 255  # Beyaz (okunamadı)
+        if not intensities:
+            answers[q_num] = None
+            confidence_scores[q_num] = 0.0
+            log(f"  ✗ Soru {q_num:2d}: OKUNAMADI")
+            continue
         
-        # En koyu şıkkı bul (en düşük intensity)
-        if intensities:
-            darkest_option = min(intensities, key=intensities.get)
-            darkest_value = intensities[darkest_option]
-            
-            # En açık şıkkı bul (kontrast hesabı için)
-            lightest_value = max(intensities.values())
-            contrast = lightest_value - darkest_value
-            
-            # TÜM ŞIK DEĞERLERİNİ GÖSTER (DEBUG)
-            intensities_str = " | ".join([f"{opt}:{int(intensities[opt])}" for opt in OPTIONS if opt in intensities])
+        # TÜM ŞIK DEĞERLERİNİ GÖSTER (DEBUG)
+        intensities_str = " | ".join([f"{opt}:{int(intensities[opt])}" for opt in OPTIONS if opt in intensities])
+        darkest_value = min(intensities.values())
+        
+        choice = decision["choice"][qi]
+        if choice >= 0:
+            answers[q_num] = calibration.options[choice]
+            confidence = float(decision["confidence"][qi])
+            confidence_scores[q_num] = confidence
             
-            # Karar ver: Yeterince koyu mu ve kontrast yeterli mi?
-            if darkest_value < INTENSITY_THRESHOLD and contrast > CONTRAST_THRESHOLD:
-                answers[q_num] = darkest_option
-                confidence = min(contrast / 80.0, 1.0)
-                confidence_scores[q_num] = confidence
-                
-                # Detaylı bilgi göster
-                status = "✓"
-                print(f"  {status} Soru {q_num:2d}: {darkest_option} "
-                      f"(koyu: {int(darkest_value)}, kontrast: {int(contrast)}, "
-                      f"güven: {confidence:.0%})")
-                print(f"      [{intensities_str}]")
-            else:
-                # Boş bırakılmış veya eşikleri geçememiş
-                answers[q_num] = None
-                confidence_scores[q_num] = 0.0
-                reason = ""
-                if darkest_value >= INTENSITY_THRESHOLD:
-                    reason = "çok açık"
-                elif contrast <= CONTRAST_THRESHOLD:
-                    reason = "kontrast düşük"
-                print(f"  ○ Soru {q_num:2d}: BOŞ "
-                      f"(koyu: {int(darkest_value)}, kontrast: {int(contrast)}, sebep: {reason})")
-                print(f"      [{intensities_str}]")
+            # Eşiğin altındaki birden fazla şık: en koyusu seçildi
+            status = "✓" if decision["marked"][qi].sum() == 1 else "⚠"
+            log(f"  {status} Soru {q_num:2d}: {answers[q_num]} "
+                  f"(koyu: {int(darkest_value)}, güven: {confidence:.0%})")
+            log(f"      [{intensities_str}]")
         else:
+            # Boş bırakılmış veya eşiğin altında şık yok
             answers[q_num] = None
             confidence_scores[q_num] = 0.0
-            print(f"  ✗ Soru {q_num:2d}: OKUNAMADI")
+            reason = "çok açık" if split is not None else "ayrım yok"
+            log(f"  ○ Soru {q_num:2d}: BOŞ (koyu: {int(darkest_value)}, sebep: {reason})")
+            log(f"      [{intensities_str}]")
     
-    print("="*60)
+    log("="*60)
     
     # Özet
     answered_count = sum(1 for ans in answers.values() if ans is not None)
     blank_count = len(answers) - answered_count
     avg_confidence = sum(confidence_scores.values()) / len(confidence_scores) if confidence_scores else 0
+    timer.lap("decision")
     
     return {
         "success": True,
@@ -266,25 +583,117 @@ def read_answers(image_path):
             "answered": answered_count,
             "blank": blank_count,
             "average_confidence": round(avg_confidence, 2)
-        }
+        },
+        "split": {key: round(split[key], 2) for key in ("threshold", "low_mean", "high_mean", "gap")} if split else None,
     }
 
 
+def image_source(arg):
+    """Komut satırı argümanını görüntü kaynağına çevir ("-" = stdin'den baytlar)"""
+    if arg == "-":
+        return sys.stdin.buffer.read()
+    return arg
+
+
+def run_machine_mode(image_paths, template_id=None, num_questions=None):
+    """
+    Makine modu: stdout'a yalnızca JSON yaz
+    Tek görüntü için tek bir JSON dokümanı, birden fazla görüntü için
+    her satırda bir sonuç (JSONL). Dosyaya hiçbir şey yazılmaz.
+    
+    Returns:
+        int: Çıkış kodu (tek görüntü başarısızsa 1)
+    
+    Raises:
+        ValueError: Bilinmeyen veya kalibrasyonu olmayan template_id
+    """
+    template = get_calibrated_template(template_id)
+    # Şablon sabitse kalibrasyon bir kez yüklenir; QR seçecekse her formda
+    # şablon belli olduktan sonra read_answers yükler
+    route = routes_template(template_id)
+    calibration = None if route else load_calibration(template, num_questions)
+    missing = not route and calibration is None
+    failed = False
+    
+    for image_path in image_paths:
+        result = None if missing else read_answers(
+            image_source(image_path), calibration=calibration, template_id=template_id, num_questions=num_questions
+        )
+        
+        if result is None:
+            failed = True
+            result = {
+                "success": False,
+                "error": "calibration.json bulunamadı" if missing else "OMR okuma başarısız"
+            }
+        
+        result["image"] = str(image_path)
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+    
+    return 1 if failed and len(image_paths) == 1 else 0
+
+
+def parse_args(args):
+    """
+    Komut satırı: bayraklar, --template ID, --questions N ve görüntü yolları
+    
+    Returns:
+        (bayraklar kümesi, seçenekler sözlüğü, görüntü yolları)
+    """
+    flags, options, image_paths = set(), {}, []
+    i = 0
+    while i < len(args):
+        if args[i] in ("--template", "--questions") and i + 1 < len(args):
+            options[args[i][2:]] = args[i + 1]
+            i += 2
+        elif args[i].startswith("--"):
+            flags.add(args[i])
+            i += 1
+        else:
+            image_paths.append(args[i])
+            i += 1
+    return flags, options, image_paths
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Kullanım: python omr_answer_reader.py <görüntü_yolu>")
+    flags, options, image_paths = parse_args(sys.argv[1:])
+    json_mode = "--json" in flags
+    quiet = "--quiet" in flags
+    template_id = options.get("template")
+    num_questions = int(options["questions"]) if "questions" in options else None
+    
+    if not image_paths:
+        print("Kullanım: python omr_answer_reader.py [--json [--quiet]] [--template ID] [--questions N] "
+              "<görüntü_yolu> [<görüntü_yolu> ...]")
         print("\nÖrnek:")
         print("  python omr_answer_reader.py test_uploaded.png")
+        print("  python omr_answer_reader.py --json sheet1.jpg sheet2.jpg > results.jsonl")
+        print("  cat sheet.jpg | python omr_answer_reader.py --json -")
+        print("  python omr_answer_reader.py --template standard-10 --questions 8 sheet.jpg")
+        print("\n--json:      stdout'a yalnızca JSON (çoklu görüntüde JSONL), loglar stderr'e")
+        print("--quiet:     --json ile birlikte logları tamamen kapat")
+        print("--template:  form şablonu (config.TEMPLATES, varsayılan: " + get_template().id + ")")
+        print("--questions: sınavın soru sayısı (yalnızca bu sorular okunur)")
+        print("-:           görüntüyü dosya yerine stdin'den (ham JPEG/PNG baytları) oku")
         print("\nNot: calibration.json dosyası aynı klasörde olmalı!")
         sys.exit(1)
     
-    image_path = sys.argv[1]
+    if json_mode:
+        set_log_mode(None if quiet else "stderr")
+        try:
+            sys.exit(run_machine_mode(image_paths, template_id, num_questions))
+        except ValueError as e:
+            sys.stdout.write(json.dumps({"success": False, "error": str(e)}, ensure_ascii=False) + "\n")
+            sys.exit(1)
+    
+    image_path = image_paths[0]
     
     print("="*60)
     print("OMR CEVAP OKUYUCU")
     print("="*60)
     
-    result = read_answers(image_path)
+    result = read_answers(image_source(image_path), template_id=template_id, num_questions=num_questions)
     
     if result is None:
         print("\n❌ Cevap okuma başarısız!")
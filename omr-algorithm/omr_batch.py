@@ -0,0 +1,294 @@
+"""
+OMR Toplu Okuma
+Bir klasör, glob deseni veya liste dosyasındaki tüm formları süreç havuzunda
+paralel okur ve her formun sonucunu tamamlandığı anda JSONL/CSV olarak yazar.
+
+Kullanım:
+    python omr_batch.py <klasör|glob|liste_dosyası> [seçenekler]
+
+Seçenekler:
+    --workers N      Süreç sayısı (varsayılan: CPU çekirdek sayısı)
+    --format F       jsonl (varsayılan) veya csv
+    --ordered        Sonuçları giriş sırasıyla yaz (varsayılan: bitiş sırası)
+    --output DOSYA   Sonuç dosyası (varsayılan: stdout)
+    --template ID    Form şablonu (config.TEMPLATES, varsayılan: config.DEFAULT_TEMPLATE)
+    --questions N    Sınavın soru sayısı (yalnızca bu sorular okunur)
+
+Örnek:
+    python omr_batch.py scans/ --workers 16 --format csv --output sonuc.csv
+    python omr_batch.py "scans/*.jpg" --ordered > sonuc.jsonl
+    python omr_batch.py manifest.txt
+
+Liste dosyası (.txt/.lst) her satırda bir görüntü yolu içerir ('#' ile
+başlayan satırlar atlanır); .json ise yol listesi olmalıdır.
+
+Şablonu formdaki QR seçiyorsa (--template yok, QR okuma açık) CSV sütunları
+kalibre edilmiş tüm şablonların sorularının birleşimidir; soru sayısı farklı
+şablonlara yönlenen formlar da aynı başlığa hizalanır.
+"""
+
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+
+from omr_answer_reader import load_calibration, read_answers, routes_template, set_log_mode
+from templates import get_calibrated_template, get_template, list_templates
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+# Her havuz sürecinde bir kez yüklenen şablon ve kalibrasyon (şablonu formdaki
+# QR seçecekse kalibrasyon her formda şablon belli olunca yüklenir)
+_template_id = None
+_num_questions = None
+_route = False
+_calibration = None
+
+
+def collect_images(source):
+    """Klasör, glob deseni veya liste dosyasından görüntü yollarını topla"""
+    path = Path(source)
+
+    if path.is_dir():
+        return sorted(str(p) for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+    if path.is_file() and path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return [str(p) for p in json.load(f)]
+
+    if path.is_file() and path.suffix.lower() in (".txt", ".lst"):
+        base = path.parent
+        images = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                image = Path(line)
+                images.append(str(image if image.is_absolute() else base / image))
+        return images
+
+    if path.is_file():
+        return [str(path)]
+
+    return sorted(glob.glob(source, recursive=True))
+
+
+def _init_worker(template_id=None, num_questions=None):
+    """Havuz süreci başlangıcı: logları kapat, şablon kalibrasyonunu bir kez yükle"""
+    global _template_id, _num_questions, _route, _calibration
+    set_log_mode(None)
+    # Paralellik süreç düzeyinde; OpenCV'nin kendi thread'leri çekirdekleri aşırı doldurmasın
+    cv2.setNumThreads(1)
+    _template_id = template_id
+    _num_questions = num_questions
+    _route = routes_template(template_id)
+    _calibration = None if _route else load_calibration(get_template(template_id), num_questions)
+
+
+def _read_one(image_path):
+    """Tek formu oku (havuz sürecinde çalışır)"""
+    started = time.perf_counter()
+
+    if _calibration is None and not _route:
+        result = {"success": False, "error": "calibration.json bulunamadı"}
+    else:
+        try:
+            result = read_answers(image_path, calibration=_calibration, template_id=_template_id,
+                                  num_questions=_num_questions)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        if result is None:
+            result = {"success": False, "error": "OMR okuma başarısız"}
+
+    result["image"] = image_path
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def iter_results(images, workers, ordered=False, template_id=None, num_questions=None):
+    """Sonuçları hazır oldukça üret (ordered=True ise giriş sırasıyla)"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template_id, num_questions)) as executor:
+        if ordered:
+            yield from executor.map(_read_one, images, chunksize=1)
+        else:
+            futures = [executor.submit(_read_one, image) for image in images]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+class JsonlWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, result):
+        self.stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+class CsvWriter:
+    def __init__(self, stream, question_numbers):
+        self.stream = stream
+        self.question_numbers = question_numbers
+        self.writer = csv.writer(stream)
+        self.writer.writerow(
+            ["image", "success", "error", "answered", "blank", "average_confidence"]
+            + [f"Q{q}" for q in question_numbers]
+        )
+
+    def write(self, result):
+        summary = result.get("summary", {})
+        answers = result.get("answers", {})
+        self.writer.writerow(
+            [
+                result["image"],
+                result.get("success", False),
+                result.get("error", ""),
+                summary.get("answered", ""),
+                summary.get("blank", ""),
+                summary.get("average_confidence", ""),
+            ]
+            + [answers.get(q) or "" for q in self.question_numbers]
+        )
+        self.stream.flush()
+
+
+def csv_question_numbers(template, num_questions=None, route=False):
+    """
+    CSV'nin soru sütunları: şablonun kalibre soruları; QR şablon seçiyorsa
+    kalibrasyonu yüklenebilen tüm şablonların sorularının birleşimi
+    """
+    templates = [template]
+    if route:
+        templates = [t for t in list_templates() if t.calibration_path is not None]
+
+    numbers = set()
+    for candidate in templates:
+        calibration = load_calibration(candidate, num_questions)
+        if calibration is not None:
+            numbers.update(calibration.keys())
+    return sorted(numbers)
+
+
+def default_workers():
+    """Kullanılabilir çekirdek sayısı (konteyner CPU kısıtlarını dikkate alır)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def parse_args(argv):
+    """
+    Basit argüman ayrıştırma
+
+    Raises:
+        ValueError: Değeri eksik / sayı olmayan seçenek veya bilinmeyen seçenek
+    """
+    options = {
+        "source": None,
+        "workers": default_workers(),
+        "format": "jsonl",
+        "ordered": False,
+        "output": None,
+        "template": None,
+        "questions": None,
+    }
+    valued = {"--workers": "workers", "--format": "format", "--output": "output",
+              "--template": "template", "--questions": "questions"}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in valued:
+            if i + 1 >= len(argv):
+                raise ValueError(f"{arg} bir değer bekliyor")
+            value = argv[i + 1]
+            if arg in ("--workers", "--questions"):
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError(f"{arg} bir tam sayı bekliyor: {value}") from None
+                if arg == "--workers":
+                    value = max(1, value)
+            options[valued[arg]] = value
+            i += 1
+        elif arg == "--ordered":
+            options["ordered"] = True
+        elif arg.startswith("--"):
+            raise ValueError(f"Bilinmeyen argüman: {arg}")
+        else:
+            options["source"] = arg
+        i += 1
+    return options
+
+
+def main():
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        print(__doc__, file=sys.stderr)
+        sys.exit(1)
+
+    if options["source"] is None or options["format"] not in ("jsonl", "csv"):
+        print(__doc__, file=sys.stderr)
+        sys.exit(1)
+
+    images = collect_images(options["source"])
+    if not images:
+        print(f"❌ Görüntü bulunamadı: {options['source']}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        template = get_calibrated_template(options["template"])
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    set_log_mode(None)
+    # QR şablonu seçiyorsa varsayılan şablonun kalibrasyonu şart değil (bkz. _init_worker)
+    route = routes_template(options["template"])
+    question_numbers = csv_question_numbers(template, options["questions"], route)
+    if not question_numbers:
+        print("❌ HATA: calibration.json bulunamadı!", file=sys.stderr)
+        sys.exit(1)
+
+    workers = min(options["workers"], len(images))
+    print(f"📚 {len(images)} form, {workers} süreç ile okunuyor...", file=sys.stderr)
+
+    out = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else sys.stdout
+
+    if options["format"] == "csv":
+        writer = CsvWriter(out, question_numbers)
+    else:
+        writer = JsonlWriter(out)
+
+    started = time.perf_counter()
+    failed = 0
+
+    try:
+        for result in iter_results(images, workers, ordered=options["ordered"],
+                                   template_id=options["template"], num_questions=options["questions"]):
+            if not result.get("success"):
+                failed += 1
+            writer.write(result)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ {len(images)} form {elapsed:.1f} sn'de okundu "
+        f"({len(images) / elapsed:.1f} form/sn, {failed} başarısız)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ import sys
 import json
 sys.path.append('/app/omr-algorithm')
 
-from omr_answer_reader import read_answers
+from omr_answer_reader import read_answers, set_log_mode
 
 def main():
     if len(sys.argv) < 2:
@@ -13,6 +13,8 @@ def main():
         sys.exit(0)
     
     image_path = sys.argv[1]
+    # stdout yalnızca JSON içermeli, loglar stderr'e
+    set_log_mode("stderr")
     result = read_answers(image_path)
     
     if result is None:
@@ -1,342 +1,194 @@
 """
 OMR Pipeline Visualizer
 A4 tespiti, cevap bölgesi yakınlaştırma ve bubble detection aşamalarını ayrı ayrı görselleştirir
+
+Kağıt tespiti, perspektif düzeltme ve ROI çıkarma omr_answer_reader.prepare_sheet
+ile bir kez yapılır; read_and_visualize aynı ara çıktılardan hem cevapları hem
+de istenen görselleri üretir.
 """
 
+import base64
 import cv2
 import numpy as np
 import json
 import sys
 from pathlib import Path
 
-# Config
-TARGET_WIDTH = 1654
-TARGET_HEIGHT = 2339
-
-# Cevap bölgesi oranları
-ROI_Y_START = 0.38
-ROI_Y_END = 0.92
-ROI_X_START = 0.04
-ROI_X_END = 0.96
-
-# Grid parametreleri
-NUM_QUESTIONS = 15
-GRID_COLS = 5
-GRID_ROWS = 10
-OPTIONS = ["A", "B", "C", "D"]
-
-# Kalibrasyon verisini yükle (varsa)
-def load_calibration():
-    """calibration.json dosyasını yükle"""
-    try:
-        with open("calibration.json", "r") as f:
-            data = json.load(f)
-        # String key'leri integer'a çevir
-        calibration = {}
-        for q_str, options in data.items():
-            calibration[int(q_str)] = options
-        return calibration
-    except FileNotFoundError:
-        return None
-    except Exception as e:
-        print(f"⚠️ Kalibrasyon yükleme hatası: {e}")
-        return None
+from calibration_store import as_compiled
+from decision import decide_marks
+from frame_quality import assess_frame
+from sampling import get_sampling_plan
+from templates import get_calibrated_template, get_template
+from timing import StageTimer
+from omr_answer_reader import (
+    OPTIONS,
+    image_source,
+    load_calibration,
+    parse_args,
+    load_image,
+    log,
+    prepare_sheet,
+    read_answers_from_sheet,
+    routes_template,
+    set_log_mode,
+)
 
-# Perspective correction parametreleri
-BLUR_KERNEL = (5, 5)
-CANNY_LOW = 50
-CANNY_HIGH = 150
-
-
-def order_points(pts):
-    """Dört köşe noktasını sırala: sol-üst, sağ-üst, sağ-alt, sol-alt"""
-    rect = np.zeros((4, 2), dtype="float32")
-    
-    s = pts.sum(axis=1)
-    rect[0] = pts[np.argmin(s)]  # Sol-üst
-    rect[2] = pts[np.argmax(s)]  # Sağ-alt
-    
-    diff = np.diff(pts, axis=1)
-    rect[1] = pts[np.argmin(diff)]  # Sağ-üst
-    rect[3] = pts[np.argmax(diff)]  # Sol-alt
-    
-    return rect
-
-
-def find_paper_contour(image):
-    """Görüntüde kağıt sınırlarını bul"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, BLUR_KERNEL, 0)
-    edges = cv2.Canny(blurred, CANNY_LOW, CANNY_HIGH)
-    
-    kernel = np.ones((3, 3), np.uint8)
-    edges = cv2.dilate(edges, kernel, iterations=2)
-    
-    contours, _ = cv2.findContours(edges.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    if not contours:
-        return None
-    
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)
-    
-    approx_factors = [0.02, 0.03, 0.04, 0.05, 0.01]
-    
-    for contour in contours[:5]:
-        area = cv2.contourArea(contour)
-        image_area = image.shape[0] * image.shape[1]
-        
-        if area < image_area * 0.1:
-            continue
-        
-        for factor in approx_factors:
-            peri = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, factor * peri, True)
-            
-            if len(approx) == 4:
-                return approx.reshape(4, 2)
-    
-    return None
-
-
-def correct_perspective(image, corners):
-    """Perspektif dönüşümü uygula"""
-    rect = order_points(corners.astype("float32"))
-    
-    dst = np.array([
-        [0, 0],
-        [TARGET_WIDTH - 1, 0],
-        [TARGET_WIDTH - 1, TARGET_HEIGHT - 1],
-        [0, TARGET_HEIGHT - 1]
-    ], dtype="float32")
-    
-    M = cv2.getPerspectiveTransform(rect, dst)
-    warped = cv2.warpPerspective(image, M, (TARGET_WIDTH, TARGET_HEIGHT))
-    
-    return warped
-
-
-def visualize_pipeline(image_path, output_dir="output"):
-    """
-    OMR pipeline'ı görselleştir ve aşamaları ayrı ayrı kaydet
-    
-    Args:
-        image_path: Giriş görüntüsü yolu
-        output_dir: Çıkış klasörü
-    """
-    # Çıkış klasörünü oluştur
-    output_path = Path(output_dir)
-    output_path.mkdir(exist_ok=True)
-    
-    # Görüntüyü yükle
-    print(f"📸 Görüntü yükleniyor: {image_path}")
-    image = cv2.imread(str(image_path))
-    if image is None:
-        print(f"❌ HATA: Görüntü yüklenemedi: {image_path}")
-        return False
-    
-    # ============================================================
-    # AŞAMA 1: A4 KAĞIT TESPİTİ VE PERSPEKTİF DÜZELTİLMESİ
-    # ============================================================
-    print("\n" + "="*60)
-    print("AŞAMA 1: A4 KAĞIT TESPİTİ")
-    print("="*60)
-    
-    # Kağıt köşelerini bul
-    corners = find_paper_contour(image)
-    
-    # Tespit edilen köşeleri görselleştir
+# Üretilebilen görseller: anahtar -> (dosya adı, etiket)
+PIPELINE_ARTIFACTS = {
+    "a4_detection": ("1_a4_detection.jpg", "A4 Köşe Algılama"),
+    "a4_corrected": ("1_a4_corrected.jpg", "Perspektif Düzeltme"),
+    "answer_region_marked": ("2_answer_region_marked.jpg", "Cevap Bölgesi"),
+    "answer_region_zoomed": ("2_answer_region_zoomed.jpg", "Cevap Yakınlaştırma"),
+    "bubble_detection": ("3_bubble_detection.jpg", "Bubble Algılama"),
+}
+
+# Düzeltilmiş tam sayfaya ihtiyaç duyan görseller
+FULL_PAGE_ARTIFACTS = ("a4_corrected", "answer_region_marked")
+
+# Warp edilmiş ROI'ye ihtiyaç duyan görseller; hiçbiri istenmezse cevaplar
+# ROI warp edilmeden fotoğraftan örneklenir
+ROI_ARTIFACTS = ("answer_region_zoomed", "bubble_detection")
+
+def draw_a4_detection(image, corners):
+    """AŞAMA 1: Tespit edilen kağıt köşelerini orijinal görüntüye çiz"""
     stage1_visual = image.copy()
-    
+
     if corners is not None:
-        print("✅ Kağıt köşeleri bulundu!")
-        
         # Köşeleri çiz
         for i, corner in enumerate(corners):
             x, y = int(corner[0]), int(corner[1])
             cv2.circle(stage1_visual, (x, y), 15, (0, 255, 0), -1)
             cv2.putText(stage1_visual, f"{i+1}", (x-10, y-20),
                        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3)
-        
+
         # Sınırları çiz
         cv2.polylines(stage1_visual, [corners.astype(np.int32)], True, (0, 255, 0), 5)
-        
-        # Perspektif düzeltme uygula
-        warped = correct_perspective(image, corners)
-    else:
-        print("⚠️ Kağıt köşeleri bulunamadı, görüntü resize ediliyor...")
-        warped = cv2.resize(image, (TARGET_WIDTH, TARGET_HEIGHT))
-    
-    # ÇIKTI 1: A4 tespit görüntüsü
-    output1 = output_path / "1_a4_detection.jpg"
-    cv2.imwrite(str(output1), stage1_visual)
-    print(f"💾 Kaydedildi: {output1}")
-    
-    # Düzeltilmiş görüntü
-    output1_corrected = output_path / "1_a4_corrected.jpg"
-    cv2.imwrite(str(output1_corrected), warped)
-    print(f"💾 Kaydedildi: {output1_corrected}")
-    
-    # ============================================================
-    # AŞAMA 2: CEVAP BÖLGESİ YAKINLAŞTIRMA (ROI EXTRACTION)
-    # ============================================================
-    print("\n" + "="*60)
-    print("AŞAMA 2: CEVAP BÖLGESİ YAKINLAŞTIRMA")
-    print("="*60)
-    
-    # Gri tonlama
-    gray = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
-    
-    # ROI koordinatları
-    roi_y1 = int(h * ROI_Y_START)
-    roi_y2 = int(h * ROI_Y_END)
-    roi_x1 = int(w * ROI_X_START)
-    roi_x2 = int(w * ROI_X_END)
-    
-    print(f"📐 ROI Koordinatları:")
-    print(f"   X: {roi_x1} - {roi_x2} (genişlik: {roi_x2 - roi_x1}px)")
-    print(f"   Y: {roi_y1} - {roi_y2} (yükseklik: {roi_y2 - roi_y1}px)")
-    
-    # ROI'yi kes
-    roi = gray[roi_y1:roi_y2, roi_x1:roi_x2]
-    
-    # ROI bölgesini ana görüntüde işaretle
+
+    return stage1_visual
+
+
+def draw_answer_region(warped, roi_box):
+    """AŞAMA 2: ROI bölgesini düzeltilmiş görüntüde işaretle"""
+    roi_x1, roi_y1, roi_x2, roi_y2 = roi_box
+
     stage2_visual = warped.copy()
     cv2.rectangle(stage2_visual, (roi_x1, roi_y1), (roi_x2, roi_y2), (0, 255, 0), 8)
     cv2.putText(stage2_visual, "CEVAP BOLGESI", (roi_x1 + 20, roi_y1 - 20),
                cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4)
-    
-    # ÇIKTI 2A: ROI işaretli tam görüntü
-    output2a = output_path / "2_answer_region_marked.jpg"
-    cv2.imwrite(str(output2a), stage2_visual)
-    print(f"💾 Kaydedildi: {output2a}")
-    
-    # ÇIKTI 2B: Sadece ROI (yakınlaştırılmış)
-    output2b = output_path / "2_answer_region_zoomed.jpg"
-    roi_bgr = cv2.cvtColor(roi, cv2.COLOR_GRAY2BGR)
-    cv2.imwrite(str(output2b), roi_bgr)
-    print(f"💾 Kaydedildi: {output2b}")
-    
-    # ============================================================
-    # AŞAMA 3: BUBBLE DETECTION
-    # ============================================================
-    print("\n" + "="*60)
-    print("AŞAMA 3: BUBBLE DETECTION")
-    print("="*60)
-    
+
+    return stage2_visual
+
+
+def draw_bubbles(roi, calibration, template=None):
+    """
+    AŞAMA 3: Bubble bölgelerini ve intensity değerlerini ROI üzerine çiz
+    Kalibrasyon yoksa şablonun gridi (soru sayısı, blok x satır) çizilir.
+    """
     roi_h, roi_w = roi.shape
-    
-    # Kalibrasyon verısını yükle
-    calibration = load_calibration()
-    
-    if calibration:
-        print(f"✅ Kalibrasyon dosyası bulundu! ({len(calibration)} soru)")
-        print(f"📍 Kalibre edilmiş koordinatlar kullanılıyor...")
-        use_calibration = True
-    else:
-        print(f"⚠️ Kalibrasyon dosyası yok, grid tabanlı tespit kullanılıyor...")
-        use_calibration = False
-        
-        # Grid parametreleri
-        col_width = roi_w / GRID_COLS
-        row_height = roi_h / GRID_ROWS
-        option_width = col_width / len(OPTIONS)
-        
-        print(f"📊 Grid Parametreleri:")
-        print(f"   Sütun genişliği: {col_width:.1f}px")
-        print(f"   Satır yüksekliği: {row_height:.1f}px")
-        print(f"   Şık genişliği: {option_width:.1f}px")
-    
+    template = template or get_template()
+
     # Debug görüntüsü oluştur
     stage3_visual = cv2.cvtColor(roi.copy(), cv2.COLOR_GRAY2BGR)
-    
+
     # Tüm bubble'ları tespit et ve işaretle
     bubble_count = 0
-    
-    if use_calibration:
+
+    if calibration:
+        log(f"✅ Kalibrasyon dosyası bulundu! ({len(calibration)} soru)")
+        log(f"📍 Kalibre edilmiş koordinatlar kullanılıyor...")
+
         # KALİBRASYON TABANLI BUBBLE DETECTION
-        for q_num in calibration.keys():
-            for option in OPTIONS:
-                if option in calibration[q_num]:
-                    # Kalibre edilmiş koordinatları al
-                    x_center = calibration[q_num][option]["x"]
-                    y_center = calibration[q_num][option]["y"]
-                    
-                    # Bubble çapı (ortalama 15-20 piksel)
-                    bubble_radius = 10
-                    
-                    # Bubble bölgesi
-                    bx1 = max(0, x_center - bubble_radius)
-                    bx2 = min(roi_w, x_center + bubble_radius)
-                    by1 = max(0, y_center - bubble_radius)
-                    by2 = min(roi_h, y_center + bubble_radius)
-                    
-                    bubble = roi[by1:by2, bx1:bx2]
-                    
-                    if bubble.size > 0:
-                        avg_intensity = np.mean(bubble)
-                        bubble_count += 1
-                        
-                        # Renk kodlu çizim - MAVİ (kalibre edilmiş)
-                        if avg_intensity < 200:
-                            color = (255, 128, 0)  # Mavi - potansiyel işaretli
-                            thickness = 2
-                        else:
-                            color = (200, 150, 100)  # Açık mavi - boş
-                            thickness = 1
-                        
-                        # Bubble dikdörtgeni
-                        cv2.rectangle(stage3_visual, (bx1, by1), (bx2, by2), color, thickness)
-                        
-                        # Intensity değeri
-                        cv2.putText(stage3_visual, f"{int(avg_intensity)}", 
-                                   (bx1 + 2, by1 + 12), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
-            
+        # Okuyucuyla aynı örnekleme planı: aynı pencereler, aynı ortalamalar
+        calibration = as_compiled(calibration)
+        plan = get_sampling_plan(calibration, roi.shape, template.thresholds["bubble_radius"])
+        bubble_means = plan.sample(roi)
+        # Okuyucuyla aynı karar: formun kendi eşiğinin altındaki şıklar
+        marked = decide_marks(bubble_means, calibration.valid, template.thresholds["min_gap"])["marked"]
+        centers = np.rint(calibration.points).astype(np.int32)
+
+        for qi, q_num in enumerate(calibration.keys()):
+            for oi, option in enumerate(calibration.options):
+                if calibration.valid[qi, oi] and plan.area[qi, oi] > 0:
+                    # Bubble bölgesi (ROI'ye kırpılmış)
+                    bx1, by1 = int(plan.x1[qi, oi]), int(plan.y1[qi, oi])
+                    bx2, by2 = int(plan.x2[qi, oi]), int(plan.y2[qi, oi])
+
+                    avg_intensity = bubble_means[qi, oi]
+                    bubble_count += 1
+
+                    # Renk kodlu çizim - MAVİ (kalibre edilmiş)
+                    if marked[qi, oi]:
+                        color = (255, 128, 0)  # Mavi - potansiyel işaretli
+                        thickness = 2
+                    else:
+                        color = (200, 150, 100)  # Açık mavi - boş
+                        thickness = 1
+
+                    # Bubble dikdörtgeni
+                    cv2.rectangle(stage3_visual, (bx1, by1), (bx2, by2), color, thickness)
+
+                    # Intensity değeri
+                    cv2.putText(stage3_visual, f"{int(avg_intensity)}",
+                               (bx1 + 2, by1 + 12),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
+
             # Soru numarası (ilk şıkkın yanına)
-            if "A" in calibration[q_num]:
-                x_pos = calibration[q_num]["A"]["x"] - 30
-                y_pos = calibration[q_num]["A"]["y"] + 5
-                cv2.putText(stage3_visual, f"S{q_num}", 
-                           (x_pos, y_pos), 
+            if calibration.valid[qi, 0]:
+                x_pos = int(centers[qi, 0, 0]) - 30
+                y_pos = int(centers[qi, 0, 1]) + 5
+                cv2.putText(stage3_visual, f"S{q_num}",
+                           (x_pos, y_pos),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-        
-        print(f"✅ {bubble_count} bubble (KALİBRE) tespit edildi")
-        
+
+        log(f"✅ {bubble_count} bubble (KALİBRE) tespit edildi")
+
         # Legend ekle
         legend_y = roi_h - 40
         cv2.rectangle(stage3_visual, (10, legend_y), (30, legend_y + 20), (255, 128, 0), 2)
-        cv2.putText(stage3_visual, "Kalibre Edilmis", (35, legend_y + 15), 
+        cv2.putText(stage3_visual, "Kalibre Edilmis", (35, legend_y + 15),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 128, 0), 2)
-    
+
     else:
+        log(f"⚠️ Kalibrasyon dosyası yok, grid tabanlı tespit kullanılıyor...")
+
+        # Grid parametreleri (şablondan)
+        grid_cols = template.grid["blocks"]
+        grid_rows = template.grid["rows"]
+        col_width = roi_w / grid_cols
+        row_height = roi_h / grid_rows
+        option_width = col_width / len(OPTIONS)
+
+        log(f"📊 Grid Parametreleri:")
+        log(f"   Sütun genişliği: {col_width:.1f}px")
+        log(f"   Satır yüksekliği: {row_height:.1f}px")
+        log(f"   Şık genişliği: {option_width:.1f}px")
+
         # GRİD TABANLI BUBBLE DETECTION (FALLBACK)
-        for q_num in range(1, NUM_QUESTIONS + 1):
-            col = (q_num - 1) // GRID_ROWS
-            row = (q_num - 1) % GRID_ROWS
-            
+        for q_num in range(1, template.num_questions + 1):
+            col, row = template.grid_position(q_num)
+
             y_center = int((row + 0.5) * row_height)
             x_col_start = int(col * col_width)
-            
+
             for opt_idx, option in enumerate(OPTIONS):
                 x_option_center = int(x_col_start + (opt_idx + 0.5) * option_width)
-                
+
                 # Bubble boyutları
                 bubble_w = int(option_width * 0.4)
                 bubble_h = int(row_height * 0.4)
-                
+
                 # Bubble bölgesi
                 bx1 = max(0, x_option_center - bubble_w // 2)
                 bx2 = min(roi_w, x_option_center + bubble_w // 2)
                 by1 = max(0, y_center - bubble_h // 2)
                 by2 = min(roi_h, y_center + bubble_h // 2)
-                
+
                 bubble = roi[by1:by2, bx1:bx2]
-                
+
                 if bubble.size > 0:
                     avg_intensity = np.mean(bubble)
                     bubble_count += 1
-                    
+
                     # Renk kodlu çizim - YEŞİL/GRİ (grid tabanlı)
                     if avg_intensity < 200:
                         color = (0, 255, 0)  # Yeşil - potansiyel işaretli
@@ -344,72 +196,275 @@ def visualize_pipeline(image_path, output_dir="output"):
                     else:
                         color = (128, 128, 128)  # Gri - boş
                         thickness = 1
-                    
+
                     # Bubble dikdörtgeni
                     cv2.rectangle(stage3_visual, (bx1, by1), (bx2, by2), color, thickness)
-                    
+
                     # Intensity değeri
-                    cv2.putText(stage3_visual, f"{int(avg_intensity)}", 
-                               (bx1 + 2, by1 + 12), 
+                    cv2.putText(stage3_visual, f"{int(avg_intensity)}",
+                               (bx1 + 2, by1 + 12),
                                cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
-            
+
             # Soru numarası
-            cv2.putText(stage3_visual, f"S{q_num}", 
-                       (x_col_start - 30, y_center + 5), 
+            cv2.putText(stage3_visual, f"S{q_num}",
+                       (x_col_start - 30, y_center + 5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 0), 1)
-        
-        print(f"✅ {bubble_count} bubble (GRID) tespit edildi")
-        
+
+        log(f"✅ {bubble_count} bubble (GRID) tespit edildi")
+
         # Grid çizgileri ekle
-        for col in range(GRID_COLS + 1):
+        for col in range(grid_cols + 1):
             x = int(col * col_width)
             cv2.line(stage3_visual, (x, 0), (x, roi_h), (255, 0, 255), 1)
-        
-        for row in range(GRID_ROWS + 1):
+
+        for row in range(grid_rows + 1):
             y = int(row * row_height)
             cv2.line(stage3_visual, (0, y), (roi_w, y), (255, 0, 255), 1)
-        
+
         # Legend ekle
         legend_y = roi_h - 40
         cv2.rectangle(stage3_visual, (10, legend_y), (30, legend_y + 20), (0, 255, 0), 2)
-        cv2.putText(stage3_visual, "Grid Tabanli (kalibre edin!)", (35, legend_y + 15), 
+        cv2.putText(stage3_visual, "Grid Tabanli (kalibre edin!)", (35, legend_y + 15),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-    
-    # ÇIKTI 3: Bubble detection görüntüsü
-    output3 = output_path / "3_bubble_detection.jpg"
-    cv2.imwrite(str(output3), stage3_visual)
-    print(f"💾 Kaydedildi: {output3}")
-    
+
+    return stage3_visual
+
+
+def render_artifacts(sheet, calibration, artifacts=None):
+    """
+    prepare_sheet çıktısından istenen görselleri üret
+
+    Args:
+        sheet: prepare_sheet sonucu (image, corners, warped, roi, roi_box);
+            FULL_PAGE_ARTIFACTS için full_page=True, ROI_ARTIFACTS için
+            warp_roi=True ile hazırlanmış olmalı
+        calibration: Kalibrasyon verisi veya None (grid tabanlı çizim)
+        artifacts: PIPELINE_ARTIFACTS anahtarları (None = hepsi)
+
+    Returns:
+        dict: anahtar -> BGR görüntü
+    """
+    if artifacts is None:
+        artifacts = list(PIPELINE_ARTIFACTS.keys())
+
+    rendered = {}
+
+    if "a4_detection" in artifacts:
+        rendered["a4_detection"] = draw_a4_detection(sheet["image"], sheet["corners"])
+
+    if "a4_corrected" in artifacts:
+        rendered["a4_corrected"] = sheet["warped"]
+
+    if "answer_region_marked" in artifacts:
+        rendered["answer_region_marked"] = draw_answer_region(sheet["warped"], sheet["roi_box"])
+
+    if "answer_region_zoomed" in artifacts:
+        rendered["answer_region_zoomed"] = cv2.cvtColor(sheet["roi"], cv2.COLOR_GRAY2BGR)
+
+    if "bubble_detection" in artifacts:
+        rendered["bubble_detection"] = draw_bubbles(sheet["roi"], calibration, sheet.get("template"))
+
+    return rendered
+
+
+def save_artifacts(rendered, output_dir):
+    """Görselleri PIPELINE_ARTIFACTS dosya adlarıyla klasöre kaydet"""
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+
+    for key, image in rendered.items():
+        output_file = output_path / PIPELINE_ARTIFACTS[key][0]
+        cv2.imwrite(str(output_file), image)
+        log(f"💾 Kaydedildi: {output_file}")
+
+
+def encode_artifacts(rendered, quality=85):
+    """Görselleri JPEG + base64 olarak kodla (dosyaya yazmadan)"""
+    encoded = {}
+
+    for key, image in rendered.items():
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        encoded[key] = {
+            "base64": base64.b64encode(buffer).decode('utf-8'),
+            "label": PIPELINE_ARTIFACTS[key][1],
+        }
+
+    return encoded
+
+
+def read_and_visualize(image_path, calibration=None, artifacts=None, output_dir=None, request_id=None,
+                       session_id=None, quality_check=False, template_id=None, num_questions=None):
+    """
+    Tek geçişte cevapları oku ve görselleri üret
+    Görüntü bir kez çözülür, kağıt bir kez tespit edilir ve warp edilir;
+    hem okuyucu hem görselleştirici aynı ROI'yi kullanır.
+
+    Args:
+        image_path: Giriş görüntüsü yolu veya bellekteki kodlanmış görüntü baytları
+        calibration: Kalibrasyon verisi (None ise şablonun kalibrasyonu okunur)
+        artifacts: İstenen görsel anahtarları (None = hepsi, [] = hiçbiri)
+        output_dir: Verilirse görseller dosyaya yazılır, verilmezse base64 döner
+        request_id: Çağıranın istek kimliği, sonuçta aynen geri döner
+        session_id: Canlı tarama oturumu; köşeler kareler arasında takip edilir
+        quality_check: Önce hızlı kalite kontrolü yap (bkz. frame_quality);
+            kötü kare pipeline'a girmeden success=False ve "quality" ile döner
+        template_id: Form şablonu (bkz. config.TEMPLATES); verilmezse formdaki
+            QR'ın bildirdiği şablon (QR okuma açıksa), o da yoksa varsayılan
+        num_questions: Sınavın soru sayısı; yalnızca bu sorular örneklenir
+
+    Returns:
+        dict: read_answers sonucu + "pipeline_images" veya None
+        (aşama süreleri "timings" altında; render ve encoding dahil,
+        oturumlu çağrıda köşe takibi durumu "tracking" altında)
+    """
+    timer = StageTimer(request_id)
+    template = get_calibrated_template(template_id)
+    # Şablon ne açıkça verildi ne de kalibrasyonuyla sabitlendiyse QR seçer;
+    # kalibrasyon o durumda şablon belli olduktan sonra yüklenir
+    route = routes_template(template_id, calibration)
+
+    if calibration is not None:
+        calibration = as_compiled(calibration).limit(template.question_count(num_questions))
+    elif not route:
+        calibration = load_calibration(template, num_questions)
+        if calibration is None:
+            log("❌ HATA: calibration.json bulunamadı!")
+            return None
+    timer.lap("calibration")
+
+    image = load_image(image_path)
+    if image is None:
+        return None
+    timer.lap("decode")
+
+    if quality_check:
+        quality = assess_frame(image)
+        timer.lap("quality")
+        if not quality["ok"]:
+            log(f"⛔ Kare reddedildi ({quality['reason']}): {quality['message']}")
+            return timer.attach({"success": False, "error": quality["message"], "quality": quality})
+
+    # Tam renkli sayfa ve ROI yalnızca onları gösteren görseller istendiyse warp edilir
+    wanted = PIPELINE_ARTIFACTS.keys() if artifacts is None else artifacts
+    full_page = any(key in FULL_PAGE_ARTIFACTS for key in wanted)
+    warp_roi = any(key in ROI_ARTIFACTS for key in wanted)
+
+    sheet = prepare_sheet(image, timer, session_id, full_page=full_page, warp_roi=warp_roi,
+                          calibration=calibration, template=template, route_template=route)
+    if calibration is None:
+        calibration = load_calibration(sheet["template"], num_questions)
+        if calibration is None:
+            return None
+        timer.lap("calibration")
+    result = read_answers_from_sheet(sheet, calibration, timer)
+    if "tracking" in sheet:
+        result["tracking"] = sheet["tracking"]
+
+    rendered = render_artifacts(sheet, calibration, artifacts)
+    timer.lap("render")
+
+    if output_dir:
+        save_artifacts(rendered, output_dir)
+        result["pipeline_images"] = {
+            key: str(Path(output_dir) / PIPELINE_ARTIFACTS[key][0]) for key in rendered
+        }
+    else:
+        result["pipeline_images"] = encode_artifacts(rendered)
+    timer.lap("encoding")
+
+    return timer.attach(result)
+
+
+def visualize_pipeline(image_path, output_dir="output", template_id=None):
+    """
+    OMR pipeline'ı görselleştir ve aşamaları ayrı ayrı kaydet
+
+    Args:
+        image_path: Giriş görüntüsü yolu
+        output_dir: Çıkış klasörü
+        template_id: Form şablonu (verilmezse varsayılan)
+    """
+    template = get_template(template_id)
+    image = load_image(image_path)
+    if image is None:
+        return False
+
+    sheet = prepare_sheet(image, full_page=True, template=template)
+    roi_x1, roi_y1, roi_x2, roi_y2 = sheet["roi_box"]
+
+    log("\n" + "="*60)
+    log("AŞAMA 1: A4 KAĞIT TESPİTİ")
+    log("="*60)
+    log("✅ Kağıt köşeleri bulundu!" if sheet["corners"] is not None
+        else "⚠️ Kağıt köşeleri bulunamadı, görüntü resize edildi")
+
+    log("\n" + "="*60)
+    log("AŞAMA 2: CEVAP BÖLGESİ YAKINLAŞTIRMA")
+    log("="*60)
+    log(f"📐 ROI Koordinatları:")
+    log(f"   X: {roi_x1} - {roi_x2} (genişlik: {roi_x2 - roi_x1}px)")
+    log(f"   Y: {roi_y1} - {roi_y2} (yükseklik: {roi_y2 - roi_y1}px)")
+
+    log("\n" + "="*60)
+    log("AŞAMA 3: BUBBLE DETECTION")
+    log("="*60)
+
+    # Kalibrasyon verısını yükle
+    calibration = load_calibration(template)
+
+    rendered = render_artifacts(sheet, calibration)
+    save_artifacts(rendered, output_dir)
+
     # ============================================================
     # ÖZET
     # ============================================================
-    print("\n" + "="*60)
-    print("✨ TÜM AŞAMALAR TAMAMLANDI!")
-    print("="*60)
-    print(f"\n📁 Çıktı dosyaları ({output_dir}/):")
-    print(f"   1️⃣  1_a4_detection.jpg        - A4 kağıt tespiti (köşeler işaretli)")
-    print(f"   1️⃣  1_a4_corrected.jpg        - Perspektif düzeltilmiş görüntü")
-    print(f"   2️⃣  2_answer_region_marked.jpg - Cevap bölgesi işaretli")
-    print(f"   2️⃣  2_answer_region_zoomed.jpg - Cevap bölgesi yakınlaştırılmış")
-    print(f"   3️⃣  3_bubble_detection.jpg     - Bubble detection (tüm bubble'lar)")
-    print()
-    
+    log("\n" + "="*60)
+    log("✨ TÜM AŞAMALAR TAMAMLANDI!")
+    log("="*60)
+    log(f"\n📁 Çıktı dosyaları ({output_dir}/):")
+    log(f"   1️⃣  1_a4_detection.jpg        - A4 kağıt tespiti (köşeler işaretli)")
+    log(f"   1️⃣  1_a4_corrected.jpg        - Perspektif düzeltilmiş görüntü")
+    log(f"   2️⃣  2_answer_region_marked.jpg - Cevap bölgesi işaretli")
+    log(f"   2️⃣  2_answer_region_zoomed.jpg - Cevap bölgesi yakınlaştırılmış")
+    log(f"   3️⃣  3_bubble_detection.jpg     - Bubble detection (tüm bubble'lar)")
+    log()
+
     return True
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Kullanım: python omr_pipeline_visualizer.py <görüntü_yolu> [çıkış_klasörü]")
+    flags, options, args = parse_args(sys.argv[1:])
+
+    if not args:
+        print("Kullanım: python omr_pipeline_visualizer.py [--json [--quality-check]] [--template ID] [--questions N] "
+              "<görüntü_yolu> [çıkış_klasörü]")
         print("\nÖrnek:")
         print("  python omr_pipeline_visualizer.py test_form.png")
         print("  python omr_pipeline_visualizer.py test_form.png my_outputs")
+        print("  python omr_pipeline_visualizer.py --json test_form.png   # cevaplar + base64 görseller stdout'a")
+        print("  cat test_form.png | python omr_pipeline_visualizer.py --json -   # görüntü stdin'den")
+        print("  python omr_pipeline_visualizer.py --json --quality-check frame.jpg   # kötü kareyi erken reddet")
         sys.exit(1)
-    
-    image_path = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "output"
-    
-    success = visualize_pipeline(image_path, output_dir)
-    
+
+    if "--json" in flags:
+        set_log_mode("stderr")
+        try:
+            result = read_and_visualize(
+                image_source(args[0]), quality_check="--quality-check" in flags, template_id=options.get("template"),
+                num_questions=int(options["questions"]) if "questions" in options else None,
+            )
+        except ValueError as e:
+            result = {"success": False, "error": str(e)}
+        if result is None:
+            result = {"success": False, "error": "OMR okuma başarısız"}
+        print(json.dumps(result, ensure_ascii=False))
+        sys.exit(0 if result["success"] else 1)
+
+    image_path = args[0]
+    output_dir = args[1] if len(args) > 1 else "output"
+
+    success = visualize_pipeline(image_source(image_path), output_dir, options.get("template"))
+
     if success:
         print("🎉 İşlem başarıyla tamamlandı!")
     else:
@@ -2,6 +2,11 @@
 OMR Reader - Basit Siyahlık Tabanlı Algılama
 perspective.py ile düzeltilmiş görüntüyü okur
 Bubble pozisyonlarını bulur ve en siyah olanı seçer
+
+Soru sayısı, grid (blok x satır), şıklar ve cevap bölgesi form şablonundan
+gelir (bkz. templates, config.TEMPLATES); yalnızca şablondaki sorular okunur.
+Şablon verilmezse okuyucunun kendi düzeni (READER_TEMPLATE: 15 soru,
+5 sütun x 10 satır) kullanılır, config.DEFAULT_TEMPLATE değil.
 """
 
 import cv2
@@ -9,22 +14,26 @@ import numpy as np
 import json
 import sys
 
-# 15 soru, 5 sütun x 10 satır (her sütunda 10 soru)
-NUM_QUESTIONS = 15
-GRID_COLS = 5
-GRID_ROWS = 10
-OPTIONS = ["A", "B", "C", "D"]
+from decision import decide_marks
+from templates import get_template
+
+# Karar: işaret eşiği her formda şıkların iki küme ayrımıyla bulunur
+# (bkz. decision); mürekkep ve kağıt kümesi ortalamaları en az bu kadar ayrık olmalı
+MIN_GAP = 15
 
-# Cevap bölgesi oranları (çalışan değerlerde tutuluyor)
-ROI_Y_START = 0.38
-ROI_Y_END = 0.92
-ROI_X_START = 0.04
-ROI_X_END = 0.96
+# --template verilmezse okunan düzen (bu okuyucunun eski 15 soruluk grid'i)
+READER_TEMPLATE = "legacy-15"
 
 
-def read_omr(image_path):
+def read_omr(image_path, template_id=None):
     """Ana OMR okuma fonksiyonu"""
     
+    template = get_template(template_id or READER_TEMPLATE)
+    num_questions = template.num_questions
+    options = template.options
+    grid_cols = template.grid["blocks"]
+    grid_rows = template.grid["rows"]
+    
     # 1. Görüntüyü yükle
     img = cv2.imread(image_path)
     if img is None:
@@ -35,18 +44,18 @@ def read_omr(image_path):
     h, w = gray.shape
     
     # 3. Cevap bölgesini (ROI) kes
-    roi_y1 = int(h * ROI_Y_START)
-    roi_y2 = int(h * ROI_Y_END)
-    roi_x1 = int(w * ROI_X_START)
-    roi_x2 = int(w * ROI_X_END)
+    roi_y1 = int(h * template.roi["y_start"])
+    roi_y2 = int(h * template.roi["y_end"])
+    roi_x1 = int(w * template.roi["x_start"])
+    roi_x2 = int(w * template.roi["x_end"])
     
     roi = gray[roi_y1:roi_y2, roi_x1:roi_x2]
     roi_h, roi_w = roi.shape
     
     # 4. Grid parametrelerini hesapla
-    col_width = roi_w / GRID_COLS  # Her sütunun genişliği
-    row_height = roi_h / GRID_ROWS  # Her satırın yüksekliği
-    option_width = col_width / len(OPTIONS)  # Her şıkkın genişliği
+    col_width = roi_w / grid_cols  # Her sütunun genişliği
+    row_height = roi_h / grid_rows  # Her satırın yüksekliği
+    option_width = col_width / len(options)  # Her şıkkın genişliği
     
     answers = {}
     confidence = {}
@@ -54,11 +63,13 @@ def read_omr(image_path):
     # Debug görüntüsü oluştur
     debug_img = cv2.cvtColor(roi.copy(), cv2.COLOR_GRAY2BGR)
     
-    # 5. Her soruyu işle
-    for q_num in range(1, NUM_QUESTIONS + 1):
+    # 5. Her sorunun şıklarında siyahlık ölç: (soru x şık) matrisi
+    darkness = np.full((num_questions, len(options)), 255.0)  # Beyaz (boş)
+    boxes = {}
+    
+    for q_num in range(1, num_questions + 1):
         # Sütun ve satır pozisyonunu hesapla
-        col = (q_num - 1) // GRID_ROWS
-        row = (q_num - 1) % GRID_ROWS
+        col, row = template.grid_position(q_num)
         
         # Satır merkezi Y koordinatı
         y_center = int((row + 0.5) * row_height)
@@ -66,10 +77,7 @@ def read_omr(image_path):
         # Sütun başlangıcı X koordinatı  
         x_col_start = int(col * col_width)
         
-        # Her şık için siyahlık ölç
-        darkness_values = {}
-        
-        for opt_idx, option in enumerate(OPTIONS):
+        for opt_idx, option in enumerate(options):
             # Şık merkezi X koordinatı
             x_option_center = int(x_col_start + (opt_idx + 0.5) * option_width)
             
@@ -83,6 +91,7 @@ def read_omr(image_path):
             bx2 = min(roi_w, x_option_center + bubble_w // 2)
             by1 = max(0, y_center - bubble_h // 2)
             by2 = min(roi_h, y_center + bubble_h // 2)
+            boxes[q_num, opt_idx] = (bx1, by1, bx2, by2)
             
             bubble = roi[by1:by2, bx1:bx2]
             
@@ -90,45 +99,36 @@ def read_omr(image_path):
                 # Ortalama siyahlık hesapla
                 # Düşük değer = koyu = dolu
                 # 0 = siyah, 255 = beyaz
-                avg_intensity = np.mean(bubble)
-                darkness_values[option] = avg_intensity
-            else:
-                darkness_values[option] = 255  # Beyaz (boş)
-            
-            # Debug: Bubble bölgesini çiz
-            color = (0, 255, 0) if darkness_values[option] < 200 else (128, 128, 128)
-            cv2.rectangle(debug_img, (bx1, by1), (bx2, by2), color, 1)
-            # Intensity değerini yaz
-            cv2.putText(debug_img, f"{int(darkness_values[option])}", 
-                       (bx1, by1-2), cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
-        
-        # En koyu (en düşük intensity) şıkkı bul
-        darkest_option = min(darkness_values, key=darkness_values.get)
-        darkest_value = darkness_values[darkest_option]
-        
-        # En açık (en yüksek intensity) şıkkı bul
-        lightest_value = max(darkness_values.values())
-        
-        # Kontrast hesapla (açık - koyu)
-        contrast = lightest_value - darkest_value
-        
-        # Karar ver:
-        # 1. En koyu şık yeterince koyu olmalı (< 200)
-        # 2. Kontrast yeterince yüksek olmalı (> 20)
-        if darkest_value < 200 and contrast > 20:
-            answers[q_num] = darkest_option
-            # Güven kontrasta bağlı
-            conf = min(contrast / 80.0, 1.0)
-            confidence[q_num] = float(conf)
+                darkness[q_num - 1, opt_idx] = np.mean(bubble)
+    
+    # 6. Karar: eşik sabit değil, bu formun tüm şıklarının iki küme ayrımı
+    # (kağıt / mürekkep, bkz. decision)
+    decision = decide_marks(darkness, min_gap=MIN_GAP)
+    
+    for q_num in range(1, num_questions + 1):
+        qi = q_num - 1
+        choice = decision["choice"][qi]
+        if choice >= 0:
+            answers[q_num] = options[choice]
+            confidence[q_num] = float(decision["confidence"][qi])
         else:
             # Boş bırakılmış
             answers[q_num] = None
             confidence[q_num] = 0.0
         
+        # Debug: Bubble bölgelerini ve intensity değerlerini çiz
+        for opt_idx in range(len(options)):
+            bx1, by1, bx2, by2 = boxes[q_num, opt_idx]
+            color = (0, 255, 0) if decision["marked"][qi, opt_idx] else (128, 128, 128)
+            cv2.rectangle(debug_img, (bx1, by1), (bx2, by2), color, 1)
+            cv2.putText(debug_img, f"{int(darkness[qi, opt_idx])}", 
+                       (bx1, by1-2), cv2.FONT_HERSHEY_SIMPLEX, 0.3, color, 1)
+        
         # Debug: Soru numarası ve cevabı yaz
+        col, row = template.grid_position(q_num)
         ans_text = answers[q_num] if answers[q_num] else "X"
         cv2.putText(debug_img, f"Q{q_num}:{ans_text}", 
-                   (x_col_start - 20, y_center), 
+                   (int(col * col_width) - 20, int((row + 0.5) * row_height)), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 0), 1)
     
     # Debug görüntüsünü kaydet
@@ -138,29 +138,37 @@ def read_omr(image_path):
     # Özet bilgiler
     answered = sum(1 for ans in answers.values() if ans is not None)
     avg_conf = sum(confidence.values()) / len(confidence) if confidence else 0
-    answer_str = "".join([answers.get(i) or "X" for i in range(1, NUM_QUESTIONS + 1)])
+    answer_str = "".join([answers.get(i) or "X" for i in range(1, num_questions + 1)])
     
     return {
         "success": True,
         "answers": answers,
         "confidence": confidence,
         "answer_string": answer_str,
+        "template": template.id,
         "summary": {
-            "total": NUM_QUESTIONS,
+            "total": num_questions,
             "answered": answered,
-            "blank": NUM_QUESTIONS - answered,
+            "blank": num_questions - answered,
             "average_confidence": round(avg_conf, 2)
         }
     }
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    template_id = None
+    if "--template" in args:
+        i = args.index("--template")
+        template_id = args[i + 1] if i + 1 < len(args) else None
+        args = args[:i] + args[i + 2:]
+    
+    if not args:
         print(json.dumps({"success": False, "error": "Görüntü yolu belirtilmedi"}))
         sys.exit(1)
     
-    image_path = sys.argv[1]
-    result = read_omr(image_path)
+    image_path = args[0]
+    result = read_omr(image_path, template_id)
     
     # JSON'a kaydet
     with open("omr_result.json", "w", encoding="utf-8") as f:
@@ -179,7 +187,7 @@ if __name__ == "__main__":
         
         # Detaylı
         print("\nDetayli Sonuclar:")
-        for i in range(1, NUM_QUESTIONS + 1):
+        for i in range(1, result['summary']['total'] + 1):
             ans = result['answers'].get(i)
             conf = result['confidence'].get(i, 0)
             mark = "OK" if ans else "  "
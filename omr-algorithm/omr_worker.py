@@ -0,0 +1,174 @@
+"""
+OMR Worker - Kalıcı okuma süreci
+Her tarama için yeni bir Python yorumlayıcısı başlatmak yerine tek bir süreç
+açık kalır; OpenCV/NumPy bir kez yüklenir, derlenmiş kalibrasyon bellekte tutulur
+(bkz. calibration_store).
+
+Protokol (satır bazlı JSON, her satır tek bir mesaj):
+    İstek  (stdin):  {"id": "42", "op": "read", "image_path": "/app/uploads/omr/x.jpg"}
+                     {"id": "43", "op": "visualize", "image_base64": "/9j/4AAQ..."}
+    Yanıt (stdout):  {"id": "42", "ok": true, "result": {...}}
+    Hata  (stdout):  {"id": "42", "ok": false, "error": "..."}
+
+Görüntü ya dosya yolu (image_path) ya da base64 kodlanmış JPEG/PNG baytları
+(image_base64, isteğe bağlı "data:image/...;base64," önekiyle) olarak verilir;
+base64 görüntü diske yazılmadan bellekte çözülür. İsteğe bağlı "request_id"
+sonuçta aynen döner; sonuçlar aşama süre dökümünü "timings" altında taşır.
+
+Canlı taramada isteğe bağlı "session_id" verilirse kağıt köşeleri aynı
+oturumun önceki karesinden optik akışla takip edilir (bkz. live_tracker);
+oturum durumu bu süreçte tutulduğundan aynı oturumun kareleri aynı worker'a
+gönderilmelidir. Sonuçta takip durumu "tracking" altında döner.
+
+İsteğe bağlı "template_id" form şablonunu seçer (bkz. config.TEMPLATES,
+verilmezse varsayılan şablon); "num_questions" sınavın soru sayısıdır,
+yalnızca bu sorular örneklenip karara girer. Bilinmeyen veya kalibrasyonu
+olmayan (grid tabanlı) şablon ok=false ile reddedilir.
+
+"quality_check": true verilirse kare önce hızlı kalite kontrolünden geçer
+(bkz. frame_quality); bulanık, karanlık, parlamalı veya kağıtsız kareler
+pipeline'a girmeden success=false ve "quality" (reason, message, metrics)
+ile döner.
+
+Desteklenen işlemler:
+    read      - omr_answer_reader.read_answers ile cevapları oku
+    visualize - tek geçişte cevapları oku ve pipeline görsellerini üret
+                ("artifacts": istenen görseller, varsayılan hepsi; sonuç
+                "pipeline_images" altında base64 JPEG olarak döner)
+    ping      - sağlık kontrolü
+    shutdown  - süreci düzgün kapat
+
+stdout yalnızca protokol mesajları içindir; okuyucuların insan okunur
+logları (set_log_mode) stderr'e yönlendirilir. Birden fazla worker aynı anda
+çalıştırılarak küçük bir havuz oluşturulabilir
+(bkz. backend/src/services/omrWorkerPool.cjs).
+
+Kullanım:
+    python omr_worker.py
+"""
+
+import base64
+import binascii
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from omr_answer_reader import load_calibration, read_answers, set_log_mode
+from omr_pipeline_visualizer import read_and_visualize
+from templates import get_calibrated_template
+
+
+def warm_up():
+    """OpenCV'nin ilk çağrı maliyetini (thread havuzu, tablolar) başta öde"""
+    dummy = np.full((64, 64, 3), 255, dtype=np.uint8)
+    gray = cv2.cvtColor(dummy, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    src = np.float32([[0, 0], [63, 0], [63, 63], [0, 63]])
+    M = cv2.getPerspectiveTransform(src, src)
+    cv2.warpPerspective(dummy, M, (64, 64))
+
+
+def request_image(request):
+    """İstekteki görüntü kaynağını döndür: base64 ise bayt, değilse dosya yolu"""
+    encoded = request.get("image_base64")
+    if encoded:
+        # data URL önekini at (data:image/jpeg;base64,...)
+        if encoded.startswith("data:"):
+            encoded = encoded.split(",", 1)[-1]
+        try:
+            return base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise ValueError(f"Geçersiz image_base64: {e}")
+    return request.get("image_path")
+
+
+def handle_request(request):
+    """Tek bir isteği işle, yanıt sözlüğünü döndür"""
+    op = request.get("op", "read")
+
+    if op == "ping":
+        return {"ok": True, "result": {"pid": os.getpid()}}
+
+    if op in ("read", "visualize"):
+        image = request_image(request)
+        if not image:
+            return {"ok": False, "error": "image_path veya image_base64 gerekli"}
+
+        # Kalibrasyonu olmayan şablonlar (grid tabanlı) baştan reddedilir
+        template_id = request.get("template_id")
+        num_questions = request.get("num_questions")
+        template = get_calibrated_template(template_id)
+
+        # Derlenmiş kalibrasyon bellekte tutulur, dosya değişirse yeniden derlenir;
+        # template_id verilmediyse şablonu okuyucu seçer (QR okuma açıksa formdaki
+        # QR, değilse varsayılan) ve kalibrasyonu o yükler
+        calibration = None
+        if template_id:
+            calibration = load_calibration(template, num_questions)
+            if calibration is None:
+                return {"ok": False, "error": "calibration.json bulunamadı"}
+
+        if op == "visualize":
+            result = read_and_visualize(
+                image, calibration=calibration, artifacts=request.get("artifacts"),
+                request_id=request.get("request_id"), session_id=request.get("session_id"),
+                quality_check=bool(request.get("quality_check")), template_id=template_id,
+                num_questions=num_questions,
+            )
+        else:
+            result = read_answers(image, calibration=calibration, request_id=request.get("request_id"),
+                                  template_id=template_id, num_questions=num_questions)
+        if result is None:
+            return {"ok": False, "error": "OMR okuma başarısız"}
+        return {"ok": True, "result": result}
+
+    return {"ok": False, "error": f"Bilinmeyen işlem: {op}"}
+
+
+def main():
+    # Protokol kanalını ayır; geri kalan tüm print'ler stderr'e gider
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    set_log_mode("stderr")
+
+    def send(message):
+        protocol_out.write(json.dumps(message, ensure_ascii=False) + "\n")
+        protocol_out.flush()
+
+    warm_up()
+    load_calibration()
+
+    send({"id": None, "ok": True, "event": "ready", "pid": os.getpid()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            send({"id": None, "ok": False, "error": f"Geçersiz JSON: {e}"})
+            continue
+
+        request_id = request.get("id")
+
+        if request.get("op") == "shutdown":
+            send({"id": request_id, "ok": True})
+            break
+
+        try:
+            response = handle_request(request)
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+
+        response["id"] = request_id
+        send(response)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Sayfa Yönü Tespiti
+order_points köşeleri yalnızca görüntü koordinatlarına göre sıralar; ters
+(180°), yan (90° / 270°) ya da aynalanmış çekilmiş bir form bu sırayla warp
+edilirse bütün cevaplar yanlış şıklara eşlenir.
+
+Bu modül kağıt köşeleri bulunduktan sonra, küçük bir sayfa önizlemesi
+üzerinde sekiz olası köşe eşlemesinden (4 dönüş x ayna) doğru olanı seçer:
+
+    1. Kağıt dörtgeninin en-boy oranı dik / yan eşlemeleri ayırır
+    2. Kalan adaylar puanlanır:
+       - kalibrasyon varsa bubble düzeni: doğru yönde bubble çerçevelerinin
+         mürekkebi kalibre merkezlerin çevresinde toplanır (ayna da ayrılır)
+       - yoksa başlık bandı: sayfanın üst şeridi başlık içerir, cevap
+         bölgesinin altındaki şerit boştur (yalnızca 0° / 180°). Alt şeridi
+         boş olmayan aday elenir; imza / sayfa numarası gibi alt bilgi
+         taşıyan formda iki aday da elenir ve kağıt döndürülmez (alt bilgi
+         başlıktan koyu olsa bile dik form ters çevrilmez)
+
+Seçilen eşleme homografiye katılır (page_matrix); ROI warp'ı veya warp'sız
+örnekleme doğrudan düzeltilmiş yönde yapılır, ikinci bir işlem hattı gerekmez.
+"""
+
+import cv2
+import numpy as np
+
+import config
+from perspective import order_points
+
+# Yönü belirsiz (yeterli kanıt yok) durumda kullanılan sonuç
+UPRIGHT = {"rotation": 0, "mirrored": False}
+
+# Sayfa köşelerinin yer değişimi -> aynı sonucu veren cv2.flip kodu
+# (aynı en-boy sınıfındaki adaylar tek warp'ın çevrilmiş halleridir)
+FLIP_CODES = {
+    (0, 1, 2, 3): None,
+    (2, 3, 0, 1): -1,   # 180° dönüş
+    (1, 0, 3, 2): 1,    # yatay ayna
+    (3, 2, 1, 0): 0,    # dikey ayna
+}
+
+# Düzen maskesi önbelleği: (kalibrasyon id, önizleme boyutu) -> (maske, ROI kutusu)
+_layout_cache = {}
+
+
+def corner_order(rotation, mirrored=False):
+    """
+    Görüntü köşelerinin (sol-üst, sağ-üst, sağ-alt, sol-alt) karşılık geldiği
+    sayfa köşesi indeksleri
+
+    Args:
+        rotation: Kağıdın görüntüde saat yönünün tersine dönüş açısı (0/90/180/270)
+        mirrored: Kağıt yatay olarak aynalanmış mı
+    """
+    k = (rotation // 90) % 4
+    if mirrored:
+        return [(k + 1 - i) % 4 for i in range(4)]
+    return [(i + k) % 4 for i in range(4)]
+
+
+def page_matrix(corners, width, height, orientation=None):
+    """Kağıt köşelerinden width x height sayfaya homografi (yön eşlemesi dahil)"""
+    rect = order_points(np.asarray(corners, dtype=np.float32))
+    dst = np.array([
+        [0, 0],
+        [width - 1, 0],
+        [width - 1, height - 1],
+        [0, height - 1]
+    ], dtype=np.float32)
+
+    if orientation:
+        dst = dst[corner_order(orientation["rotation"], orientation["mirrored"])]
+    return cv2.getPerspectiveTransform(rect, dst)
+
+
+def is_sideways(corners, width, height):
+    """Kağıt dörtgeni sayfanın tersine yatık mı (dikey sayfa yatay görünüyor)"""
+    rect = order_points(np.asarray(corners, dtype=np.float32))
+    horizontal = np.linalg.norm(rect[1] - rect[0]) + np.linalg.norm(rect[2] - rect[3])
+    vertical = np.linalg.norm(rect[3] - rect[0]) + np.linalg.norm(rect[2] - rect[1])
+    return (horizontal > vertical) != (width > height)
+
+
+def _layout_mask(calibration, thumb_size, page_size, roi_box):
+    """
+    Kalibre bubble merkezlerinin çevresini işaretleyen önizleme maskesi
+    Disk yarıçapı komşu şıklar arası en kısa mesafeden türetilir.
+    """
+    key = (id(calibration), thumb_size, page_size, roi_box)
+    cached = _layout_cache.get(key)
+    if cached is not None and cached[0] is calibration:
+        return cached[1], cached[2]
+
+    tw, th = thumb_size
+    sx, sy = tw / float(page_size[0]), th / float(page_size[1])
+    x1, y1, x2, y2 = roi_box
+
+    points = calibration.points[calibration.valid]
+    spacing = np.diff(calibration.points[..., 0], axis=1)
+    spacing = np.abs(spacing[calibration.valid[:, 1:] & calibration.valid[:, :-1]])
+    radius = 0.35 * (float(spacing[spacing > 0].min()) if (spacing > 0).any() else 40.0)
+
+    mask = np.zeros((th, tw), dtype=np.uint8)
+    r = max(1, int(round(radius * sx)))
+    for x, y in points:
+        cv2.circle(mask, (int(round((x + x1) * sx)), int(round((y + y1) * sy))), r, 255, -1)
+
+    box = (int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy))
+    if len(_layout_cache) > 8:
+        _layout_cache.clear()
+    _layout_cache[key] = (calibration, mask > 0, box)
+    return mask > 0, box
+
+
+def layout_score(ink, mask, box):
+    """Bubble merkezleri çevresindeki ortalama mürekkep - cevap bölgesi ortalaması"""
+    x1, y1, x2, y2 = box
+    region = ink[y1:y2, x1:x2]
+    if not mask.any() or region.size == 0:
+        return 0.0
+    return float(ink[mask].mean() - region.mean())
+
+
+def header_score(ink, band, paper=None, blank_margin=None):
+    """
+    Üst şeridin ortalama mürekkebi - alt şeridin ortalama mürekkebi
+
+    paper ve blank_margin verilirse alt şerit boş olmalıdır: ortalama
+    mürekkebi kağıdınkini (paper) blank_margin'den fazla aşarsa aday elenir (-inf)
+    """
+    if band <= 0:
+        return 0.0
+    bottom = float(ink[-band:].mean())
+    if blank_margin is not None and bottom > paper + blank_margin:
+        return float("-inf")
+    return float(ink[:band].mean()) - bottom
+
+
+def detect_orientation(gray, corners, page_size, roi_box, calibration=None, settings=None):
+    """
+    Kağıdın görüntüdeki yönünü bul
+
+    Args:
+        gray: Kaynak görüntü (gri veya BGR; köşelerin bulunduğu)
+        corners: 4x2 kağıt köşeleri (herhangi bir sırada)
+        page_size: Düzeltilmiş sayfa (genişlik, yükseklik)
+        roi_box: Sayfadaki cevap bölgesi (x1, y1, x2, y2)
+        calibration: Derlenmiş kalibrasyon (CompiledCalibration) veya None
+        settings: config.ORIENTATION üzerine yazılacak ayarlar
+
+    Returns:
+        dict: rotation (0/90/180/270), mirrored, method ("layout" / "header" /
+        None), score; kanıt yetersizse ya da kapalıysa dik kabul edilir
+    """
+    settings = {**config.ORIENTATION, **(settings or {})}
+    width, height = page_size
+    sideways = is_sideways(corners, width, height)
+    fallback = {"rotation": 90 if sideways else 0, "mirrored": False, "method": None, "score": 0.0}
+    if not settings.get("enabled"):
+        return {**UPRIGHT, "method": None, "score": 0.0}
+
+    # Tek bir önizleme warp'ı yapılır: kaynak 2x önizleme çözünürlüğünde
+    # örneklenip INTER_AREA ile küçültülür (renkliyse griye önizlemede
+    # çevrilir), diğer adaylar bunun çevrilmiş halleridir
+    tw = int(settings["thumb_width"])
+    th = max(1, int(round(tw * height / float(width))))
+
+    rotations = (90, 270) if sideways else (0, 180)
+    if calibration is not None:
+        method = "layout"
+        mask, box = _layout_mask(calibration, (tw, th), (width, height), roi_box)
+        mirrors = (False, True) if settings.get("check_mirror") else (False,)
+        score = lambda ink: layout_score(ink, mask, box)
+    else:
+        method = "header"
+        band = int(round(th * (height - roi_box[3]) / float(height)))
+        mirrors = (False,)
+        blank_margin = settings["header_blank_margin"]
+        score = lambda ink: header_score(ink, band, paper, blank_margin)
+
+    base = {"rotation": rotations[0], "mirrored": False}
+    M = page_matrix(corners, 2 * tw, 2 * th, base)
+    thumb = cv2.warpPerspective(gray, M, (2 * tw, 2 * th), flags=cv2.INTER_LINEAR)
+    thumb = cv2.resize(thumb, (tw, th), interpolation=cv2.INTER_AREA)
+    if thumb.ndim == 3:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    ink = 255.0 - thumb.astype(np.float32)
+    paper = float(np.median(ink))
+    base_order = corner_order(base["rotation"])
+
+    scores = []
+    for rotation in rotations:
+        for mirrored in mirrors:
+            order = corner_order(rotation, mirrored)
+            moved = [0] * 4
+            for source, target in zip(base_order, order):
+                moved[source] = target
+            code = FLIP_CODES[tuple(moved)]
+            candidate = ink if code is None else cv2.flip(ink, code)
+            scores.append((score(candidate), {"rotation": rotation, "mirrored": mirrored}))
+
+    scores.sort(key=lambda item: item[0], reverse=True)
+    best, orientation = scores[0]
+    runner_up = scores[1][0] if len(scores) > 1 else 0.0
+    if not np.isfinite(best) or best - runner_up < settings["min_margin"]:
+        return fallback
+    return {**orientation, "method": method, "score": round(best, 1)}
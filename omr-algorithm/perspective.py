@@ -36,19 +36,120 @@ def order_points(pts):
     return rect
 
 
-def find_paper_contour(image, debug_dir=None):
+def pyramid_downscale(image, max_side):
     """
-    Görüntüde kağıt sınırlarını bul
+    Uzun kenar max_side altına inene kadar cv2.pyrDown uygula
+    
+    Returns:
+        (küçük görüntü, ölçek): tam çözünürlük koordinatı = küçük koordinat * ölçek
+    """
+    small = image
+    scale = 1.0
+    if not max_side:
+        return small, scale
+    
+    while max(small.shape[:2]) > max_side:
+        small = cv2.pyrDown(small)
+        scale *= 2.0
+    
+    return small, scale
+
+
+def refine_corners(image, corners, window):
+    """
+    Köşeleri tam çözünürlükte cornerSubPix ile alt-piksel hassasiyetine getir
+    Yalnızca köşe çevresindeki küçük pencereler gri tonlamaya çevrilir.
+    
+    Args:
+        image: Tam çözünürlüklü BGR veya gri görüntü
+        corners: 4x2 yaklaşık köşeler (tam çözünürlük koordinatında)
+        window: cornerSubPix arama yarı-penceresi (piksel)
+    
+    Returns:
+        4x2 float32 köşeler (iyileştirme sapıtırsa ilgili köşe olduğu gibi kalır)
+    """
+    height, width = image.shape[:2]
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+    pad = window + 2
+    refined = np.asarray(corners, dtype="float32").copy()
+    
+    for i, (x, y) in enumerate(refined):
+        x0 = int(max(0, np.floor(x) - pad))
+        y0 = int(max(0, np.floor(y) - pad))
+        x1 = int(min(width, np.ceil(x) + pad + 1))
+        y1 = int(min(height, np.ceil(y) + pad + 1))
+        
+        patch = image[y0:y1, x0:x1]
+        if patch.shape[0] < 5 or patch.shape[1] < 5:
+            continue
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        
+        point = np.array([[[x - x0, y - y0]]], dtype="float32")
+        cv2.cornerSubPix(patch, point, (window, window), (-1, -1), criteria)
+        new_x, new_y = point[0, 0] + (x0, y0)
+        
+        # Pencere dışına kaçtıysa (köşe değil, doku) yaklaşık değeri koru
+        if abs(new_x - x) <= window and abs(new_y - y) <= window:
+            refined[i] = (new_x, new_y)
+    
+    return refined
+
+
+def find_paper_contour(image, debug_dir=None, hull_fallback=True):
+    """
+    Görüntüde kağıt sınırlarını bul (çok ölçekli)
+    Tespit, config.PERSPECTIVE["pyramid_max_side"] altına küçültülmüş piramit
+    seviyesinde yapılır; bulunan köşeler tam çözünürlükte cornerSubPix ile
+    iyileştirilir. Büyük telefon fotoğraflarında maliyetin çoğu böylece
+    küçük görüntüde kalır. config.FIDUCIALS["mode"] açıksa önce köşe
+    işaretleri denenir (bkz. fiducials).
     
     Args:
         image: BGR formatında görüntü
+        debug_dir: Debug görüntüleri için klasör (opsiyonel, küçük seviyede)
+        hull_fallback: Dörtgen bulunamazsa convex hull köşelerini dene
+    
+    Returns:
+        4 köşe noktası (4x2 float32, tam çözünürlük) veya None
+    """
+    # Formda köşe işaretleri varsa (config.FIDUCIALS) önce onlar aranır
+    if config.FIDUCIALS.get("mode"):
+        from fiducials import find_fiducial_corners
+        corners = find_fiducial_corners(image)
+        if corners is not None:
+            return corners
+    
+    small, scale = pyramid_downscale(image, config.PERSPECTIVE.get("pyramid_max_side"))
+    
+    corners = find_paper_contour_single(small, debug_dir, hull_fallback)
+    if corners is None:
+        return None
+    
+    corners = corners.astype("float32") * scale
+    
+    if config.PERSPECTIVE.get("refine_corners", True):
+        # Küçük seviyedeki hata ~ölçek kadar, dilate ise kenarı birkaç piksel dışarı iter
+        window = max(5, int(round(3 * scale)))
+        corners = refine_corners(image, corners, window)
+    
+    return corners
+
+
+def find_paper_contour_single(image, debug_dir=None, hull_fallback=True):
+    """
+    Görüntüde kağıt sınırlarını tek ölçekte bul
+    
+    Args:
+        image: BGR formatında (veya gri) görüntü
         debug_dir: Debug görüntüleri için klasör (opsiyonel)
+        hull_fallback: Dörtgen bulunamazsa convex hull köşelerini dene
     
     Returns:
         4 köşe noktası (4x2 array) veya None
     """
     # Gri tonlamaya çevir
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
     
     # Gaussian blur ile gürültü azalt
     blurred = cv2.GaussianBlur(gray, config.PERSPECTIVE["blur_kernel"], 0)
@@ -118,6 +219,9 @@ def find_paper_contour(image, debug_dir=None):
                 
                 return approx.reshape(4, 2)
         
+        if not hull_fallback:
+            continue
+        
         # Approximation başarısız olduysa, convex hull dene ve köşeleri bul
         hull = cv2.convexHull(contour)
         
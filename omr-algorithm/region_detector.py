@@ -9,15 +9,28 @@ import numpy as np
 from pathlib import Path
 import config
 
+# Yatay çerçeve çizgisi: satırın en az bu oranı mürekkep olmalı
+LINE_FILL = 0.5
+# Dikey çerçeve kenarı: iki yatay çizgi arasının neredeyse tamamını kaplamalı
+# (kapalı dikdörtgen; ayrı kutuların çizgileri eşleşmez)
+SIDE_FILL = 0.95
+
+
+def _line_groups(profile, min_count):
+    """Profilde min_count'u aşan ardışık indeksleri tek çizgiye topla: [(başlangıç, bitiş), ...]"""
+    above = np.concatenate(([False], profile >= min_count, [False]))
+    edges = np.flatnonzero(above[1:] != above[:-1])
+    return list(zip(edges[::2], edges[1::2] - 1))
+
 
 def find_answer_region(image, debug_dir=None):
     """
     Cevap alanını içeren dikdörtgeni bul
     
-    Strateji:
-    1. Yatay ve dikey çizgileri tespit et
-    2. Çizgilerin kesişim noktalarını bul
-    3. Alt bölgedeki en büyük dikdörtgeni seç
+    Strateji (projeksiyon profilleri, morfoloji yok):
+    1. Satır profilinde genişliğin LINE_FILL kadarını kaplayan satırlar yatay çizgidir
+    2. Alt bölgedeki yatay çizgi çiftlerinden en yüksek çerçeveyi seç
+    3. Çizgiler arasındaki sütun profilinden kapalı çerçevenin dikey kenarlarını bul
     
     Args:
         image: Perspektif düzeltilmiş görüntü (BGR)
@@ -40,62 +53,46 @@ def find_answer_region(image, debug_dir=None):
     if debug_dir:
         cv2.imwrite(str(debug_dir / "20_thresh_for_region.jpg"), thresh)
     
-    # Yatay çizgileri tespit et
-    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (width // 8, 1))
-    horizontal_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, horizontal_kernel, iterations=1)
+    # Yatay çizgiler: satır profili (bubble satırları ve yazı bu eşiğe ulaşmaz)
+    row_profile = np.count_nonzero(thresh, axis=1)
+    lines = [(y1, y2) for y1, y2 in _line_groups(row_profile, width * LINE_FILL) if y1 > height * 0.20]
     
-    # Dikey çizgileri tespit et  
-    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 8))
-    vertical_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, vertical_kernel, iterations=1)
-    
-    # Çizgileri birleştir ve dilate et
-    lines_combined = cv2.add(horizontal_lines, vertical_lines)
-    kernel = np.ones((3, 3), np.uint8)
-    lines_combined = cv2.dilate(lines_combined, kernel, iterations=2)
-    
-    if debug_dir:
-        cv2.imwrite(str(debug_dir / "21_horizontal_lines.jpg"), horizontal_lines)
-        cv2.imwrite(str(debug_dir / "22_vertical_lines.jpg"), vertical_lines)
-        cv2.imwrite(str(debug_dir / "23_lines_combined.jpg"), lines_combined)
-    
-    # Contour'ları bul - RETR_TREE ile iç contour'ları da al
-    contours, hierarchy = cv2.findContours(
-        lines_combined, 
-        cv2.RETR_TREE, 
-        cv2.CHAIN_APPROX_SIMPLE
-    )
-    
-    if not contours:
-        print("UYARI: Hiç contour bulunamadı")
-        return None
-    
-    # Dikdörtgen adaylarını filtrele
+    # Dikdörtgen adaylarını filtrele: her yatay çizgi çifti bir çerçeve adayı
     candidates = []
     min_area = (width * height) * 0.10  # En az %10 alan kaplamalı
     
-    for i, contour in enumerate(contours):
-        x, y, w, h = cv2.boundingRect(contour)
-        area = w * h
-        aspect_ratio = w / h if h > 0 else 0
-        
-        # Filtreler:
-        # - Yeterince büyük
-        # - Genişlik/yükseklik oranı makul
-        # - Görüntünün alt yarısında
-        if (area > min_area and 
-            0.5 < aspect_ratio < 2.5 and 
-            y > height * 0.20 and
-            h > height * 0.3):  # Yüksekliği yeterli
+    for i, (top, _) in enumerate(lines):
+        for _, bottom in lines[i + 1:]:
+            h = bottom - top + 1
+            if h <= height * 0.3:  # Yüksekliği yeterli
+                continue
+            
+            # Dikey kenarlar: çerçeve satırları arasındaki sütun profili
+            column_profile = np.count_nonzero(thresh[top:bottom + 1], axis=0)
+            edges = np.flatnonzero(column_profile >= h * SIDE_FILL)
+            if len(edges) < 2:
+                continue
+            
+            x, w = int(edges[0]), int(edges[-1] - edges[0] + 1)
+            aspect_ratio = w / h
             
-            candidates.append({
-                "contour": contour,
-                "bbox": (x, y, w, h),
-                "area": area,
-                "y": y,
-                "h": h
-            })
+            # Filtreler:
+            # - Yeterince büyük
+            # - Genişlik/yükseklik oranı makul
+            if w * h > min_area and 0.5 < aspect_ratio < 2.5:
+                candidates.append({
+                    "bbox": (x, int(top), w, int(h)),
+                    "area": w * h,
+                    "y": int(top),
+                    "h": int(h)
+                })
     
     if debug_dir:
+        debug_img = image.copy()
+        for y1, y2 in lines:
+            cv2.rectangle(debug_img, (0, int(y1)), (width - 1, int(y2)), (255, 0, 0), 2)
+        cv2.imwrite(str(debug_dir / "21_horizontal_lines.jpg"), debug_img)
+        
         debug_img = image.copy()
         for i, cand in enumerate(candidates):
             x, y, w, h = cand["bbox"]
@@ -106,7 +103,7 @@ def find_answer_region(image, debug_dir=None):
         cv2.imwrite(str(debug_dir / "24_candidate_rectangles.jpg"), debug_img)
     
     if not candidates:
-        print("UYARI: Contour ile bulunamadı, fallback ROI kullanılıyor")
+        print("UYARI: Çerçeve bulunamadı, fallback ROI kullanılıyor")
         # Fallback: Sabit ROI kullan
         # Cevap alanı y=38% ile y=92% arasında (header'ı atla)
         roi_y_start = int(height * 0.38)
@@ -115,7 +112,7 @@ def find_answer_region(image, debug_dir=None):
         roi_x_end = int(width * 0.96)
         return (roi_x_start, roi_y_start, roi_x_end - roi_x_start, roi_y_end - roi_y_start)
     
-    # En büyük alanı ve en altta olanı seç
+    # En yüksek ve en büyük alanlı çerçeveyi seç
     candidates.sort(key=lambda c: (-c["h"], -c["area"]))
     
     best = candidates[0]
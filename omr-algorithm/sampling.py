@@ -0,0 +1,145 @@
+"""
+Bubble Örnekleme Planı
+Kalibrasyondan bir kez derlenen örnekleme planı ile tüm bubble'ların ortalama
+parlaklığını tek vektörel işlemde hesaplar.
+
+Plan, her bubble'ın ROI'ye kırpılmış kare penceresini (x1, y1, x2, y2) ve
+piksel sayısını tutar. Ortalama, ROI'nin toplam alan tablosundan
+(cv2.integral) dört köşe okunarak bulunur; sonuç (soru x şık) dizisidir.
+Okuyucu ve görselleştirici aynı planı kullanır, böylece iki çıktı ayrışmaz.
+
+sample_source ise ROI'yi hiç warp etmeden aynı pencereleri kaynak fotoğraftan
+okur: pencere piksellerinin ROI koordinatları ters homografiyle fotoğrafa
+taşınır ve cv2.remap ile (warpPerspective'in yaptığı gibi bilineer) örneklenir.
+Yalnızca bubble pencereleri kadar piksel üretilir.
+"""
+
+import weakref
+
+import cv2
+import numpy as np
+
+from calibration_store import as_compiled
+
+# Kalibrasyon -> {(roi_şekli, yarıçap): plan}; kalibrasyon yeniden derlenince düşer
+_plan_cache = weakref.WeakKeyDictionary()
+
+# Pencere ROI dışında kalırsa kullanılan değer (beyaz = okunamadı)
+EMPTY_INTENSITY = 255.0
+
+
+class SamplingPlan:
+    """Bubble pencereleri: (Q, O) boyutlu x1, y1, x2, y2, area dizileri"""
+
+    def __init__(self, calibration, roi_shape, radius):
+        roi_h, roi_w = roi_shape[:2]
+        centers = np.rint(calibration.points).astype(np.int64)
+        cx = centers[..., 0]
+        cy = centers[..., 1]
+
+        self.calibration = calibration
+        self.radius = radius
+        self.x1 = np.clip(cx - radius, 0, roi_w)
+        self.x2 = np.clip(cx + radius, 0, roi_w)
+        self.y1 = np.clip(cy - radius, 0, roi_h)
+        self.y2 = np.clip(cy + radius, 0, roi_h)
+
+        # Boş (tamamen ROI dışında) pencere alanı 0 olur
+        self.area = np.maximum(self.x2 - self.x1, 0) * np.maximum(self.y2 - self.y1, 0)
+        self.valid = calibration.valid
+
+        # sample_source için pencere pikselleri (ilk kullanımda hazırlanır)
+        self._left = cx - radius
+        self._top = cy - radius
+        self._patch_points = None
+        self._patch_mask = None
+
+    def _patches(self):
+        """
+        Tüm pencerelerin piksel koordinatları (ROI'de) ve pencere içi maskesi
+
+        Returns:
+            points: (Q*O*S*S, 1, 2) float32, mask: (Q, O, S, S) bool (S = 2 * yarıçap)
+        """
+        if self._patch_points is None:
+            size = 2 * self.radius
+            steps = np.arange(size)
+            xs = self._left[..., None, None] + steps[None, None, None, :]
+            ys = self._top[..., None, None] + steps[None, None, :, None]
+            xs, ys = np.broadcast_arrays(xs, ys)
+
+            self._patch_mask = (
+                (xs >= self.x1[..., None, None]) & (xs < self.x2[..., None, None])
+                & (ys >= self.y1[..., None, None]) & (ys < self.y2[..., None, None])
+                & self.valid[..., None, None]
+            )
+            self._patch_points = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+        return self._patch_points, self._patch_mask
+
+    def sample(self, roi):
+        """
+        Tüm bubble'ların ortalama parlaklığı
+
+        Returns:
+            (Q, O) float dizi; kalibre edilmemiş şıklar NaN,
+            ROI dışında kalan pencereler EMPTY_INTENSITY
+        """
+        integral = cv2.integral(roi)
+        y1 = np.minimum(self.y1, self.y2)
+        x1 = np.minimum(self.x1, self.x2)
+        sums = (
+            integral[self.y2, self.x2]
+            - integral[y1, self.x2]
+            - integral[self.y2, x1]
+            + integral[y1, x1]
+        ).astype(np.float64)
+
+        return self._means(sums)
+
+    def sample_source(self, image, roi_matrix):
+        """
+        ROI'yi warp etmeden, pencereleri doğrudan kaynak görüntüden örnekle
+
+        Args:
+            image: Tek kanallı kaynak görüntü (fotoğraf)
+            roi_matrix: Kaynak -> ROI homografisi (3x3)
+
+        Returns:
+            sample() ile aynı (Q, O) dizi
+        """
+        points, mask = self._patches()
+        size = 2 * self.radius
+
+        source = cv2.perspectiveTransform(points, np.linalg.inv(roi_matrix)).reshape(-1, size, 2)
+        map_x = np.ascontiguousarray(source[..., 0])
+        map_y = np.ascontiguousarray(source[..., 1])
+        patches = cv2.remap(
+            image, map_x, map_y, cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=0,
+        )
+
+        sums = np.where(mask, patches.reshape(mask.shape), 0).sum(axis=(2, 3), dtype=np.float64)
+        return self._means(sums)
+
+    def _means(self, sums):
+        means = np.full(self.area.shape, EMPTY_INTENSITY)
+        np.divide(sums, self.area, out=means, where=self.area > 0)
+        means[~self.valid] = np.nan
+        return means
+
+
+def get_sampling_plan(calibration, roi_shape, radius):
+    """Kalibrasyon + ROI boyutu + yarıçap için planı döndür (önbellekli)"""
+    calibration = as_compiled(calibration)
+    plans = _plan_cache.setdefault(calibration, {})
+    key = (tuple(roi_shape[:2]), int(radius))
+    plan = plans.get(key)
+    if plan is None:
+        plan = SamplingPlan(calibration, roi_shape, int(radius))
+        plans[key] = plan
+    return plan
+
+
+def sample_bubbles(roi, calibration, radius):
+    """Kısayol: planı al ve ROI'den (soru x şık) ortalama parlaklık dizisini üret"""
+    return get_sampling_plan(calibration, roi.shape, radius).sample(roi)
@@ -0,0 +1,126 @@
+"""
+Form Kimliği (QR Kod)
+Formun sabit bir köşesine basılmış QR kodu cv2.QRCodeDetector ile okur;
+hangi şablonun basıldığını, sınavı ve öğrenciyi tek taramada belirler.
+
+Okuma isteğe bağlıdır (config.SHEET_ID["enabled"], varsayılan kapalı; OMR_SHEET_ID=1
+ortam değişkeniyle açılır): pencere
+warp'ı ve çözme her formda ~10-17 ms tutar, QR basılmamış formlar bunu
+ödememeli.
+
+QR tüm fotoğrafta aranmaz: kağıt köşeleri ve yönü bulunduktan sonra yalnızca
+config.SHEET_ID["search_box"] penceresi (sayfa oranları) homografiyle küçük
+bir gri görüntüye warp edilir ve dedektör o pencerede çalışır. Yön zaten
+düzeltildiğinden ters / yan çekilmiş formda da aynı pencereye bakılır.
+
+QR içeriği iki biçimde olabilir:
+
+    JSON:          {"template": "standard-10", "test": "MAT101-V1", "roll": "20231234"}
+    Sorgu dizgesi: template=standard-10&test=MAT101-V1&roll=20231234
+
+Kısa anahtarlar da kabul edilir (t / tpl, e / exam, r / student).
+"""
+
+import json
+from urllib.parse import parse_qsl
+
+import cv2
+import numpy as np
+
+import config
+from orientation import page_matrix
+
+# QR içeriğindeki anahtar -> sonuçtaki alan
+PAYLOAD_KEYS = {
+    "template": "template_id",
+    "tpl": "template_id",
+    "t": "template_id",
+    "test": "test_id",
+    "exam": "test_id",
+    "e": "test_id",
+    "roll": "roll_no",
+    "student": "roll_no",
+    "r": "roll_no",
+}
+
+# Süreç içinde tek dedektör (oluşturması görece pahalı)
+_detector = None
+
+
+def _qr_detector():
+    global _detector
+    if _detector is None:
+        _detector = cv2.QRCodeDetector()
+    return _detector
+
+
+def parse_payload(text):
+    """
+    QR içeriğini alanlara ayır
+
+    Returns:
+        dict: template_id, test_id, roll_no (bulunamayanlar None)
+    """
+    fields = {"template_id": None, "test_id": None, "roll_no": None}
+    text = (text or "").strip()
+    if not text:
+        return fields
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        data = dict(parse_qsl(text, keep_blank_values=False))
+
+    for key, value in data.items():
+        field = PAYLOAD_KEYS.get(str(key).strip().lower())
+        if field and value not in (None, ""):
+            fields[field] = str(value).strip()
+    return fields
+
+
+def search_box(page_size, settings=None):
+    """Düzeltilmiş sayfada QR arama penceresinin (x1, y1, x2, y2) piksel kutusu"""
+    settings = {**config.SHEET_ID, **(settings or {})}
+    box = settings["search_box"]
+    width, height = page_size
+    return (
+        int(width * box["x_start"]),
+        int(height * box["y_start"]),
+        int(width * box["x_end"]),
+        int(height * box["y_end"]),
+    )
+
+
+def read_sheet_id(gray, corners, page_size, orientation=None, settings=None):
+    """
+    Kağıt köşeleri bulunmuş fotoğraftan form kimliğini oku
+
+    Args:
+        gray: Gri kaynak görüntü
+        corners: 4x2 kağıt köşeleri
+        page_size: Düzeltilmiş sayfa (genişlik, yükseklik)
+        orientation: Kağıt yönü (bkz. orientation.detect_orientation)
+        settings: config.SHEET_ID üzerine yazılacak ayarlar
+
+    Returns:
+        dict: raw (QR metni), template_id, test_id, roll_no
+        veya None (kapalı / pencerede QR yok / okunamadı)
+    """
+    settings = {**config.SHEET_ID, **(settings or {})}
+    if not settings.get("enabled"):
+        return None
+
+    x1, y1, x2, y2 = search_box(page_size, settings)
+    # Sayfa homografisinin önüne pencere kırpması eklenir: yalnızca pencere warp edilir
+    crop = np.array([[1, 0, -x1], [0, 1, -y1], [0, 0, 1]], dtype=np.float64)
+    M = crop @ page_matrix(corners, page_size[0], page_size[1], orientation)
+    window = cv2.warpPerspective(gray, M, (x2 - x1, y2 - y1), flags=cv2.INTER_LINEAR,
+                                 borderValue=255)
+
+    text, _, _ = _qr_detector().detectAndDecode(window)
+    if not text:
+        return None
+
+    return {"raw": text, **parse_payload(text)}
@@ -0,0 +1,127 @@
+"""
+Form Şablonu Kaydı
+Sayfa boyutu, cevap bölgesi, grid, şıklar, eşikler ve kalibrasyon tek bir
+kayıtta (config.TEMPLATES) tutulur; okuyucular template_id ile şablonu seçer.
+
+Şablonlar süreç içinde bir kez oluşturulur. Kalibrasyon calibration_store
+üzerinden derlenir (dosya değişince yeniden) ve şablonun soru sayısıyla
+sınırlanır: formda 10 soru varsa 50 soruluk kalibrasyonun yalnızca ilk 10
+sorusu örneklenir ve karara girer. Sınav daha az soru içeriyorsa
+num_questions ile daha da kısaltılabilir.
+"""
+
+from pathlib import Path
+
+import config
+from calibration_store import get_calibration
+from fields import build_fields
+
+# Süreç içi önbellek: template_id -> SheetTemplate
+_templates = {}
+
+
+class SheetTemplate:
+    """Tek form düzeni: sayfa, cevap bölgesi, grid, şıklar, eşikler, kalibrasyon, alanlar"""
+
+    def __init__(self, template_id, spec, base_dir=Path(__file__).parent):
+        self.id = template_id
+        self.description = spec.get("description", "")
+        self.page_size = tuple(int(v) for v in spec["page_size"])
+        self.roi = dict(spec["roi"])
+        self.grid = dict(spec["grid"])
+        self.num_questions = int(spec["num_questions"])
+        self.options = list(spec["options"])
+        self.thresholds = dict(spec["thresholds"])
+        calibration = spec.get("calibration")
+        self.calibration_path = base_dir / calibration if calibration else None
+        self.fields = build_fields(spec.get("fields"), self.page_box, self.thresholds, config.ENABLED_FIELDS)
+
+    def page_box(self, fractions):
+        """Sayfa oranlarıyla verilen kutunun düzeltilmiş sayfadaki (x1, y1, x2, y2) piksel kutusu"""
+        width, height = self.page_size
+        return (
+            int(width * fractions["x_start"]),
+            int(height * fractions["y_start"]),
+            int(width * fractions["x_end"]),
+            int(height * fractions["y_end"]),
+        )
+
+    def roi_box(self):
+        """Düzeltilmiş sayfada cevap bölgesinin (x1, y1, x2, y2) piksel kutusu"""
+        return self.page_box(self.roi)
+
+    def question_count(self, num_questions=None):
+        """Okunacak soru sayısı: sınavın soru sayısı şablonunkini aşamaz"""
+        if num_questions is None:
+            return self.num_questions
+        return max(0, min(int(num_questions), self.num_questions))
+
+    def calibration(self, num_questions=None):
+        """
+        Derlenmiş kalibrasyon, okunacak sorularla sınırlı
+
+        Raises:
+            FileNotFoundError: Şablonun kalibrasyonu yoksa veya dosya bulunamazsa
+        """
+        if self.calibration_path is None:
+            raise FileNotFoundError(f"'{self.id}' şablonunun kalibrasyonu yok")
+        return get_calibration(self.calibration_path).limit(self.question_count(num_questions))
+
+    def grid_position(self, q_num):
+        """Soru numarasının (blok, satır) konumu (grid tabanlı okuyucular için)"""
+        rows, blocks = self.grid["rows"], self.grid["blocks"]
+        if self.grid.get("order") == "row":
+            return (q_num - 1) % blocks, (q_num - 1) // blocks
+        return (q_num - 1) // rows, (q_num - 1) % rows
+
+    def to_dict(self):
+        """JSON'a yazılabilir özet (sonuçlara / listelemeye)"""
+        return {
+            "id": self.id,
+            "description": self.description,
+            "page_size": list(self.page_size),
+            "grid": self.grid,
+            "num_questions": self.num_questions,
+            "options": self.options,
+            "fields": {name: {"digits": field.digits} for name, field in self.fields.items()},
+        }
+
+
+def get_template(template_id=None):
+    """
+    Şablonu döndür (verilmezse config.DEFAULT_TEMPLATE)
+
+    Raises:
+        ValueError: Bilinmeyen template_id
+    """
+    template_id = template_id or config.DEFAULT_TEMPLATE
+    template = _templates.get(template_id)
+    if template is None:
+        spec = config.TEMPLATES.get(template_id)
+        if spec is None:
+            raise ValueError(
+                f"Bilinmeyen şablon: {template_id} (mevcut: {', '.join(sorted(config.TEMPLATES))})"
+            )
+        template = _templates[template_id] = SheetTemplate(template_id, spec)
+    return template
+
+
+def get_calibrated_template(template_id=None):
+    """
+    Kalibre okuyucuların (omr_answer_reader, worker, toplu okuma) okuyabildiği
+    şablon: kalibrasyon dosyası olmalı
+
+    Raises:
+        ValueError: Bilinmeyen veya kalibrasyonu olmayan template_id
+    """
+    template = get_template(template_id)
+    if template.calibration_path is None:
+        raise ValueError(
+            f"Desteklenmeyen şablon: {template.id} (kalibrasyonu yok, grid tabanlı okuyucularla okunur)"
+        )
+    return template
+
+
+def list_templates():
+    """Kayıtlı tüm şablonlar"""
+    return [get_template(template_id) for template_id in config.TEMPLATES]
@@ -0,0 +1,10 @@
+"""
+Test ayarları
+omr-algorithm modülleri paket değil düz betiklerdir; testler onları bu
+klasörün üstünden (betiklerin kendi çalıştığı gibi) içe aktarır.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
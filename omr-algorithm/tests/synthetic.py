@@ -0,0 +1,97 @@
+"""
+Sentetik Formlar
+Testler calibration.json'a veya fotoğrafa ihtiyaç duymadan, standard-10
+düzeninde (2 blok x 5 satır, 4 şık) form üretir. Bubble merkezleri ROI
+koordinatındadır; sheet_layout() bunların derlenmiş kalibrasyonudur.
+"""
+
+import cv2
+import numpy as np
+
+from calibration_store import CompiledCalibration
+from templates import get_template
+
+TEMPLATE = get_template("standard-10")
+PAGE_SIZE = TEMPLATE.page_size
+ROI_BOX = TEMPLATE.roi_box()
+
+PAPER = 245
+INK = 30
+RING_RADIUS = 22
+MARK_RADIUS = 19
+
+
+def sheet_layout(num_questions=10):
+    """Sentetik formun kalibrasyonu: soru x şık x (x, y), ROI koordinatında"""
+    questions = np.arange(1, num_questions + 1)
+    block, row = (questions - 1) // 5, (questions - 1) % 5
+    x = 120 + block[:, None] * 700 + np.arange(4)[None, :] * 90
+    y = np.broadcast_to((80 + row * 200)[:, None], x.shape)
+    points = np.stack([x, y], axis=-1)
+    return CompiledCalibration(questions, points, np.ones(points.shape[:2], dtype=bool))
+
+
+def draw_bubbles(page, centres, marked=()):
+    """Halkaları çiz, marked içindeki indekslerin içini doldur"""
+    for i, (x, y) in enumerate(np.rint(centres).astype(int)):
+        cv2.circle(page, (int(x), int(y)), RING_RADIUS, INK + 10, 3)
+        if i in marked:
+            cv2.circle(page, (int(x), int(y)), MARK_RADIUS, INK, -1)
+
+
+def draw_sheet(answers=None):
+    """
+    Düz (warp edilmiş) gri form sayfası
+
+    Args:
+        answers: {soru_no: "A".."D"}; verilmeyen sorular boş
+    """
+    answers = answers or {}
+    layout = sheet_layout()
+    page = np.full(PAGE_SIZE[::-1], PAPER, dtype=np.uint8)
+    cv2.putText(page, "OPTIK FORM", (200, 160), cv2.FONT_HERSHEY_SIMPLEX, 4, INK, 10)
+
+    x1, y1 = ROI_BOX[:2]
+    centres = (layout.points + (x1, y1)).reshape(-1, 2)
+    marked = {
+        qi * 4 + layout.options.index(answers[q])
+        for qi, q in enumerate(layout.keys())
+        if answers.get(q)
+    }
+    draw_bubbles(page, centres, marked)
+    return page
+
+
+# Sayfanın fotoğraftaki köşeleri (sol-üst, sağ-üst, sağ-alt, sol-alt)
+PHOTO_CORNERS = ((200, 175), (1275, 210), (1325, 1800), (165, 1775))
+
+
+def photograph(page, rotate=None, size=(1500, 2000), background=60, corners=PHOTO_CORNERS):
+    """
+    Sayfayı eğik bir fotoğrafa yerleştir
+
+    Returns:
+        (gri fotoğraf, fotoğraftaki 4 kağıt köşesi)
+    """
+    h, w = page.shape[:2]
+    width, height = size
+    corners = np.float32(corners)
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    M = cv2.getPerspectiveTransform(src, corners)
+    photo = cv2.warpPerspective(page, M, size, borderValue=background)
+
+    if rotate is not None:
+        photo = cv2.rotate(photo, rotate)
+        if rotate == cv2.ROTATE_180:
+            corners = np.float32([width - 1, height - 1]) - corners
+    return photo, corners
+
+
+def draw_qr(page, text, size=240, origin=(1360, 20)):
+    """Sayfanın sağ üstüne (config.SHEET_ID penceresine) QR kod bas"""
+    qr = cv2.QRCodeEncoder.create().encode(text)
+    qr = cv2.resize(qr, (size, size), interpolation=cv2.INTER_NEAREST)
+    qr = cv2.copyMakeBorder(qr, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+    x, y = origin
+    page[y:y + qr.shape[0], x:x + qr.shape[1]] = qr
+    return page
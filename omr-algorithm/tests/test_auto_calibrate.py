@@ -0,0 +1,60 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from auto_calibrate import auto_calibrate, build_calibration
+from synthetic import PAPER, ROI_BOX, draw_sheet, photograph
+
+# Sentetik formun kafesi: başlangıç, şık, satır, blok adımları
+MODEL = np.array([[120.0, 80.0], [90.0, 0.0], [0.0, 200.0], [700.0, 0.0]])
+FIT = {"model": MODEL, "rows": 5, "blocks": 2}
+
+
+def first_option(questions, q_num):
+    point = questions[str(q_num)]["A"]
+    return point["x"], point["y"]
+
+
+def test_column_order_numbers_block_by_block():
+    questions = build_calibration(FIT, order="column")
+
+    assert list(questions) == [str(q) for q in range(1, 11)]
+    assert first_option(questions, 2) == (120, 280)
+    assert first_option(questions, 5) == (120, 880)
+    assert first_option(questions, 6) == (820, 80)
+    assert list(questions["1"]) == ["A", "B", "C", "D"]
+
+
+def test_row_order_numbers_across_blocks():
+    questions = build_calibration(FIT, order="row")
+
+    assert first_option(questions, 2) == (820, 80)
+    assert first_option(questions, 3) == (120, 280)
+    assert first_option(questions, 10) == (820, 880)
+
+
+def test_question_limit_keeps_the_first_questions():
+    assert list(build_calibration(FIT, num_questions=4)) == ["1", "2", "3", "4"]
+    assert list(build_calibration(FIT, num_questions=4, order="row")) == ["1", "2", "3", "4"]
+
+
+@pytest.mark.parametrize("erase_first_row", [False, True])
+def test_calibrates_a_photographed_blank_form(tmp_path, erase_first_row):
+    page = draw_sheet()
+    if erase_first_row:
+        # İlk satırın halkaları basılmamış / görülmemiş
+        page[ROI_BOX[1] + 50:ROI_BOX[1] + 110, :] = PAPER
+    photo, _ = photograph(page)
+    cv2.imwrite(str(tmp_path / "blank.png"), photo)
+
+    result = auto_calibrate(str(tmp_path / "blank.png"), tmp_path / "calibration.json")
+
+    assert result["success"] is True
+    data = json.loads((tmp_path / "calibration.json").read_text(encoding="utf-8"))
+    assert (tmp_path / "calibration.npz").exists()
+    assert list(data["questions"]) == [str(q) for q in range(1, 11)]
+    for q_num, option, expected in [(1, "A", (120, 80)), (2, "A", (120, 280)), (7, "D", (1090, 280))]:
+        point = data["questions"][str(q_num)][option]
+        assert abs(point["x"] - expected[0]) <= 2 and abs(point["y"] - expected[1]) <= 2
@@ -0,0 +1,40 @@
+import pytest
+
+import omr_batch
+from omr_batch import csv_question_numbers, parse_args
+from synthetic import sheet_layout
+from templates import get_template
+
+
+def test_parse_args_reads_options():
+    options = parse_args(["scans/", "--workers", "0", "--format", "csv", "--questions", "8", "--ordered"])
+
+    assert options["source"] == "scans/"
+    assert options["workers"] == 1
+    assert options["format"] == "csv"
+    assert options["questions"] == 8
+    assert options["ordered"] is True
+
+
+@pytest.mark.parametrize("argv", [
+    ["scans/", "--workers"],
+    ["scans/", "--output"],
+    ["scans/", "--workers", "many"],
+    ["scans/", "--questions", "8.5"],
+    ["scans/", "--verbose"],
+])
+def test_parse_args_rejects_missing_or_bad_values(argv):
+    with pytest.raises(ValueError):
+        parse_args(argv)
+
+
+def test_routed_csv_columns_cover_every_calibrated_template(monkeypatch):
+    layouts = {"standard-10": sheet_layout(10), "long-40": sheet_layout(40)}
+    templates = [get_template("standard-10"), get_template("grid-50")]
+    long_40 = type("Template", (), {"id": "long-40", "calibration_path": "long-40.json"})()
+    monkeypatch.setattr(omr_batch, "list_templates", lambda: templates + [long_40])
+    monkeypatch.setattr(omr_batch, "load_calibration",
+                        lambda template, num_questions=None: layouts.get(template.id))
+
+    assert csv_question_numbers(templates[0]) == list(range(1, 11))
+    assert csv_question_numbers(templates[0], route=True) == list(range(1, 41))
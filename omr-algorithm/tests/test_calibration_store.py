@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import calibration_store
+from calibration_store import CALIBRATION_VERSION, compile_calibration, get_calibration, load_compiled
+
+LEGACY = {
+    "1": {"A": {"x": 120, "y": 80}, "B": {"x": 210, "y": 80}, "C": {"x": 300, "y": 80}, "D": {"x": 390, "y": 80}},
+    "2": {"A": {"x": 120, "y": 280}, "C": {"x": 300, "y": 280}},
+}
+
+
+def write_json(path, data, mtime_ns):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_compiles_legacy_and_versioned_formats():
+    legacy = compile_calibration(LEGACY)
+    versioned = compile_calibration({"version": CALIBRATION_VERSION, "questions": LEGACY})
+
+    for compiled in (legacy, versioned):
+        assert compiled.keys() == [1, 2]
+        assert compiled.points[1, 2].tolist() == [300, 280]
+        assert compiled.valid.tolist() == [[True] * 4, [True, False, True, False]]
+    assert legacy.to_dict()[2] == {"A": {"x": 120, "y": 280}, "C": {"x": 300, "y": 280}}
+
+
+def test_npz_is_written_and_rebuilt_when_the_json_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(calibration_store, "_cache", {})
+    path = tmp_path / "calibration.json"
+    write_json(path, LEGACY, 1_000_000_000_000_000_000)
+
+    first = get_calibration(path)
+    npz_path = tmp_path / "calibration.npz"
+    assert npz_path.exists()
+    assert get_calibration(path) is first
+
+    # Yeni içerik, yeni mtime: bellek önbelleği ve .npz yeniden üretilir
+    moved = {"1": {"A": {"x": 125, "y": 85}}}
+    write_json(path, moved, 1_000_000_000_000_000_001)
+    second = get_calibration(path)
+
+    assert second is not first
+    assert second.points[0, 0].tolist() == [125, 85]
+    compiled, signature = load_compiled(npz_path)
+    assert compiled.points[0, 0].tolist() == [125, 85]
+    assert signature == (1_000_000_000_000_000_001, path.stat().st_size)
+
+
+def test_stale_npz_is_not_trusted_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(calibration_store, "_cache", {})
+    path = tmp_path / "calibration.json"
+    write_json(path, LEGACY, 1_000_000_000_000_000_000)
+    get_calibration(path)
+
+    # Yeni süreç (boş önbellek) ve JSON değişmiş: eski .npz okunmaz
+    monkeypatch.setattr(calibration_store, "_cache", {})
+    write_json(path, {"3": {"B": {"x": 1, "y": 2}}}, 1_000_000_000_000_000_500)
+
+    assert get_calibration(path).keys() == [3]
+
+
+def test_npz_alone_is_enough_and_nothing_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(calibration_store, "_cache", {})
+    path = tmp_path / "calibration.json"
+    write_json(path, LEGACY, 1_000_000_000_000_000_000)
+    get_calibration(path)
+    path.unlink()
+
+    np.testing.assert_array_equal(get_calibration(path).questions, [1, 2])
+    (tmp_path / "calibration.npz").unlink()
+    with pytest.raises(FileNotFoundError):
+        get_calibration(path)
+
+
+def test_limit_returns_the_same_object_per_bound():
+    compiled = compile_calibration(LEGACY)
+
+    assert compiled.limit(None) is compiled
+    assert compiled.limit(5) is compiled
+    assert compiled.limit(1) is compiled.limit(1)
+    assert compiled.limit(1).keys() == [1]
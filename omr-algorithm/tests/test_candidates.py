@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+
+from candidates import bubble_candidates, drop_nested, filter_components
+
+
+def binary_with_shapes():
+    """Halkalar, dolu daireler, bir çizgi ve tek piksel gürültü (bubble pikselleri 255)"""
+    binary = np.zeros((300, 400), dtype=np.uint8)
+    rings = [(60, 60), (160, 60), (260, 60)]
+    filled = [(60, 180), (160, 180)]
+    for centre in rings:
+        cv2.circle(binary, centre, 20, 255, 3)
+    for centre in filled:
+        cv2.circle(binary, centre, 20, 255, -1)
+    cv2.line(binary, (230, 150), (390, 150), 255, 3)
+    binary[250:300:7, 10:390:7] = 255
+    return binary, rings + filled
+
+
+def test_finds_rings_and_filled_circles_only():
+    binary, centres = binary_with_shapes()
+
+    circles = bubble_candidates(binary, 12, 30, 0.6)
+
+    assert len(circles) == len(centres)
+    for cx, cy in centres:
+        assert any(abs(x - cx) <= 2 and abs(y - cy) <= 2 and 18 <= r <= 23 for x, y, r in circles)
+
+
+def test_radius_range_is_respected():
+    binary, _ = binary_with_shapes()
+
+    assert bubble_candidates(binary, 25, 40, 0.6) == []
+
+
+def test_array_filters_drop_lines_and_specks():
+    binary, centres = binary_with_shapes()
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    keep = filter_components(stats[1:], 12, 30)
+
+    assert keep.sum() == len(centres)
+
+
+def test_drop_nested_removes_marks_inside_rings():
+    circles = [(100, 100, 20), (102, 99, 6), (200, 100, 20)]
+
+    assert drop_nested(circles) == [(100, 100, 20), (200, 100, 20)]
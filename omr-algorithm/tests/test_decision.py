@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from decision import MIN_SEPARATION, decide_marks, two_cluster_split
+from sampling import sample_bubbles
+from synthetic import ROI_BOX, TEMPLATE, draw_sheet, sheet_layout
+
+MIN_GAP = TEMPLATE.thresholds["min_gap"]
+
+
+def sheet_means(answers=None):
+    """Sentetik formun ROI'sinden (soru x şık) bubble ortalamaları"""
+    x1, y1, x2, y2 = ROI_BOX
+    roi = draw_sheet(answers)[y1:y2, x1:x2]
+    return sample_bubbles(roi, sheet_layout(), TEMPLATE.thresholds["bubble_radius"])
+
+
+def test_split_separates_ink_from_paper():
+    values = [30, 32, 31, 240, 238, 242, 241, 239]
+
+    split = two_cluster_split(values)
+
+    assert 32 < split["threshold"] < 238
+    assert split["low_mean"] == pytest.approx(31)
+    assert split["high_mean"] == pytest.approx(240)
+    assert split["separation"] > MIN_SEPARATION
+
+
+def test_split_needs_two_distinct_values():
+    assert two_cluster_split([200, 200, 200]) is None
+    assert two_cluster_split([200, np.nan]) is None
+    assert two_cluster_split([30, 240], valid=[True, False]) is None
+
+
+def test_reads_marked_sheet():
+    result = decide_marks(sheet_means({1: "A", 2: "C", 7: "D"}), min_gap=MIN_GAP)
+
+    expected = np.full(10, -1)
+    expected[[0, 1, 6]] = [0, 2, 3]
+    np.testing.assert_array_equal(result["choice"], expected)
+    assert (result["confidence"][[0, 1, 6]] > 0.9).all()
+    assert result["marked"].sum() == 3
+
+
+def test_blank_sheet_marks_nothing():
+    result = decide_marks(sheet_means(), min_gap=MIN_GAP)
+
+    assert result["split"] is None
+    assert (result["choice"] == -1).all()
+    assert not result["marked"].any()
+
+
+def test_gap_below_min_gap_marks_nothing():
+    values = np.full((4, 4), 200.0)
+    values[0, 1] = 190.0
+
+    assert decide_marks(values)["choice"][0] == 1
+    assert decide_marks(values, min_gap=15)["split"] is None
+
+
+def test_double_mark_has_low_confidence():
+    values = np.full((3, 4), 240.0)
+    values[0, 0] = values[0, 2] = 30.0
+    values[1, 3] = 31.0
+
+    result = decide_marks(values)
+
+    assert result["marked"][0].tolist() == [True, False, True, False]
+    assert result["confidence"][0] == pytest.approx(0.0)
+    assert result["choice"][1] == 3
+    assert result["confidence"][1] == pytest.approx(1.0, abs=0.01)
+
+
+def test_high_values_are_marks_for_fill_ratios():
+    values = np.full((2, 4), 0.05)
+    values[0, 2] = 0.8
+    values[1, 0] = 0.75
+
+    result = decide_marks(values, marked_low=False)
+
+    assert result["choice"].tolist() == [2, 0]
+    assert (result["confidence"] > 0.9).all()
+
+
+def test_invalid_options_are_never_chosen():
+    values = np.full((2, 4), 240.0)
+    values[0, 3] = 30.0
+    values[1, 0] = 30.0
+    valid = np.ones((2, 4), dtype=bool)
+    valid[0, 3] = False
+    # İkinci soruda yalnızca A kalibre: ikinci şık yerine kağıt ortalaması
+    valid[1, 1:] = False
+
+    result = decide_marks(values, valid)
+
+    assert result["choice"].tolist() == [-1, 0]
+    assert result["confidence"][1] == pytest.approx(1.0)
@@ -0,0 +1,116 @@
+import cv2
+import pytest
+
+from fields import DigitField, build_fields
+from omr_answer_reader import answer_region_matrix, prepare_sheet
+from orientation import detect_orientation
+from synthetic import PAGE_SIZE, ROI_BOX, TEMPLATE, draw_bubbles, draw_sheet, photograph, sheet_layout
+
+# Başlıkta, cevap bölgesinin üstünde 6 basamaklı alan (sayfa pikseli)
+BOX = (100, 360, 700, 860)
+SPEC = {"type": "digits", "digits": 6}
+
+
+def make_field():
+    return DigitField("roll_no", SPEC, BOX, TEMPLATE.thresholds)
+
+
+def draw_number(page, field, number):
+    """Alanın halkalarını çiz; number'daki rakamları (boşluk = boş sütun) doldur"""
+    centres = field.layout.points + BOX[:2]
+    symbols = len(field.symbols)
+    marked = {
+        column * symbols + field.symbols.index(digit)
+        for column, digit in enumerate(number)
+        if digit != " "
+    }
+    draw_bubbles(page, centres.reshape(-1, 2), marked)
+    return page
+
+
+def test_layout_is_compiled_once_per_field():
+    field = make_field()
+
+    assert field.layout.points.shape == (6, 10, 2)
+    assert field.layout.keys() == [1, 2, 3, 4, 5, 6]
+    assert field.shape() == (500, 600)
+    # Hücre ortaları: ilk basamağın 0 ve 9 satırları
+    assert field.layout.points[0, 0].tolist() == [50, 25]
+    assert field.layout.points[0, 9].tolist() == [50, 475]
+
+
+def test_reads_number_from_the_resized_page():
+    field = make_field()
+    page = draw_number(draw_sheet({1: "B"}), field, "207139")
+    sheet = {"source": page, "page": page, "roi_matrix": None, "roi_box": ROI_BOX}
+
+    result = field.read(sheet, PAGE_SIZE)
+
+    assert result["value"] == "207139"
+    assert result["digits"] == list("207139")
+    assert result["confidence"] > 0.8
+
+
+@pytest.mark.parametrize("rotate", [None, cv2.ROTATE_180])
+def test_reads_number_straight_from_the_photo(rotate):
+    field = make_field()
+    photo, corners = photograph(draw_number(draw_sheet({1: "B"}), field, "450862"), rotate)
+    orientation = detect_orientation(photo, corners, PAGE_SIZE, ROI_BOX, sheet_layout())
+    sheet = {
+        "source": photo,
+        "roi_matrix": answer_region_matrix(corners, ROI_BOX, orientation, PAGE_SIZE),
+        "roi_box": ROI_BOX,
+    }
+
+    assert field.read(sheet, PAGE_SIZE)["value"] == "450862"
+
+
+def test_unfilled_column_leaves_no_value():
+    field = make_field()
+    page = draw_number(draw_sheet(), field, "20 139")
+
+    result = field.read({"source": page, "page": page, "roi_matrix": None, "roi_box": ROI_BOX}, PAGE_SIZE)
+
+    assert result["value"] is None
+    assert result["digits"] == ["2", "0", None, "1", "3", "9"]
+
+
+def test_blank_field_reads_nothing():
+    field = make_field()
+    page = draw_number(draw_sheet(), field, "      ")
+
+    result = field.read({"source": page, "page": page, "roi_matrix": None, "roi_box": ROI_BOX}, PAGE_SIZE)
+
+    assert result["value"] is None
+    assert result["digits"] == [None] * 6
+    assert result["confidence"] == 0.0
+
+
+def test_build_fields_skips_disabled_and_rejects_unknown_types():
+    page_box = TEMPLATE.page_box
+    box = {"x_start": 0.1, "x_end": 0.4, "y_start": 0.2, "y_end": 0.35}
+
+    fields = build_fields(
+        {"roll_no": {"box": box, "digits": 8}, "seat": {"box": box, "digits": 3, "enabled": False}},
+        page_box, TEMPLATE.thresholds,
+    )
+
+    assert list(fields) == ["roll_no"]
+    enabled = build_fields({"seat": {"box": box, "digits": 3, "enabled": False}}, page_box,
+                           TEMPLATE.thresholds, enable={"seat"})
+    assert list(enabled) == ["seat"]
+    assert fields["roll_no"].box == page_box(box)
+    with pytest.raises(ValueError):
+        build_fields({"name": {"type": "letters", "box": box, "digits": 4}}, page_box, TEMPLATE.thresholds)
+
+
+def test_without_corners_reads_the_page_prepare_sheet_resized():
+    field = make_field()
+    # Kağıt kenarı yok: köşe bulunamaz, sayfa boyutlandırılarak okunur
+    photo = cv2.resize(draw_number(draw_sheet(), field, "314159"), (827, 1170))
+
+    sheet = prepare_sheet(photo, template=TEMPLATE)
+
+    assert sheet["corners"] is None
+    assert sheet["page"].shape == PAGE_SIZE[::-1]
+    assert field.read(sheet, PAGE_SIZE)["value"] == "314159"
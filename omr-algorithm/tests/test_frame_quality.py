@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+import pytest
+
+from frame_quality import REASONS, assess_frame
+from synthetic import draw_sheet, photograph
+
+
+def good_frame():
+    photo, _ = photograph(draw_sheet({1: "A", 6: "C"}))
+    return photo
+
+
+def test_good_frame_passes():
+    result = assess_frame(good_frame())
+
+    assert result["ok"] is True
+    assert result["reason"] is None
+    assert set(result["metrics"]) == {"brightness", "sheet_ratio", "sheet_contrast", "glare_ratio", "sharpness"}
+
+
+def test_clipped_white_sheet_is_not_glare():
+    # Eşit pozlanmış, tamamen doymuş kağıt parlama sayılmaz
+    photo = good_frame()
+    photo[photo >= 240] = 255
+
+    assert assess_frame(photo)["ok"] is True
+
+
+def too_dark(photo):
+    return (photo * 0.15).astype(np.uint8)
+
+
+def no_sheet(photo):
+    return np.full_like(photo, 120)
+
+
+def glare(photo):
+    # Kağıdın ortasında kağıttan belirgin parlak, doymuş bir leke
+    photo = np.clip(photo.astype(np.int32) - 40, 0, 255).astype(np.uint8)
+    cv2.circle(photo, (750, 1000), 180, 255, -1)
+    return photo
+
+
+def blurry(photo):
+    return cv2.GaussianBlur(photo, (0, 0), 12)
+
+
+@pytest.mark.parametrize("craft, reason", [
+    (too_dark, "too_dark"),
+    (no_sheet, "no_sheet"),
+    (glare, "glare"),
+    (blurry, "blurry"),
+])
+def test_each_reject_reason(craft, reason):
+    result = assess_frame(craft(good_frame()))
+
+    assert result["ok"] is False
+    assert result["reason"] == reason
+    assert result["message"] == REASONS[reason]
+
+
+def test_color_frames_are_accepted():
+    color = cv2.cvtColor(good_frame(), cv2.COLOR_GRAY2BGR)
+
+    assert assess_frame(color)["ok"] is True
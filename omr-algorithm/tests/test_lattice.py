@@ -0,0 +1,99 @@
+import numpy as np
+
+from lattice import fit_lattice, fit_rows, group_rows, lattice_indices, predict
+
+# başlangıç, şık adımı, satır adımı, blok adımı (hafif eğik)
+MODEL = np.array([[120.0, 80.0], [90.0, 1.5], [-2.0, 200.0], [700.0, 10.0]])
+
+
+def lattice_bubbles(rows=5, blocks=2, options=4, radius=20, missing=()):
+    """Kafesteki bubble'lar (x, y, r); missing içindeki indeksler atlanır"""
+    indices = lattice_indices(rows, blocks, options)
+    centres = predict(MODEL, indices)
+    return [
+        (float(x), float(y), radius)
+        for i, (x, y) in enumerate(centres)
+        if i not in missing
+    ]
+
+
+def test_lattice_indices_order_rows_then_blocks_then_options():
+    indices = lattice_indices(2, 2, 4)
+
+    assert indices.shape == (16, 3)
+    assert indices[:5].tolist() == [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0], [0, 0, 1]]
+    assert indices[-1].tolist() == [3, 1, 1]
+
+
+def test_predict_is_affine_in_the_indices():
+    np.testing.assert_allclose(predict(MODEL, [[0, 0, 0]]), [[120.0, 80.0]])
+    np.testing.assert_allclose(predict(MODEL, [[2, 1, 1]]), [[120 + 180 - 2 + 700, 80 + 3 + 200 + 10]])
+
+
+def test_fit_lattice_rejects_outliers():
+    indices = lattice_indices(5, 2, 4)
+    points = predict(MODEL, indices)
+    points[[3, 17, 30]] += [[40, 0], [0, -60], [25, 25]]
+
+    model, inliers, error = fit_lattice(points, indices, tolerance=5.0)
+
+    np.testing.assert_allclose(model, MODEL, atol=1e-6)
+    assert inliers.sum() == len(points) - 3
+    assert not inliers[[3, 17, 30]].any()
+    assert error < 1e-6
+
+
+def test_fit_lattice_needs_enough_points():
+    indices = lattice_indices(1, 1, 3)
+
+    assert fit_lattice(predict(MODEL, indices), indices, tolerance=5.0) is None
+
+
+def test_fit_rows_recovers_missing_bubbles():
+    bubbles = lattice_bubbles(missing={5, 22, 39})
+    rows = group_rows(bubbles, tolerance=30)
+
+    fit = fit_rows(rows, 4)
+
+    assert (fit["rows"], fit["blocks"], fit["radius"]) == (5, 2, 20)
+    assert fit["detected"] == 37
+    assert fit["inliers"] == 37
+    centres = predict(fit["model"], lattice_indices(5, 2, 4))
+    np.testing.assert_allclose(centres, predict(MODEL, lattice_indices(5, 2, 4)), atol=0.5)
+
+
+def test_fit_rows_single_block():
+    rows = group_rows(lattice_bubbles(rows=4, blocks=1), tolerance=30)
+
+    fit = fit_rows(rows, 4)
+
+    assert (fit["rows"], fit["blocks"]) == (4, 1)
+    np.testing.assert_allclose(fit["model"][3], [0.0, 0.0])
+
+
+def test_group_rows_drops_short_rows():
+    bubbles = lattice_bubbles(rows=2, blocks=1) + [(500.0, 900.0, 20), (560.0, 901.0, 20)]
+
+    rows = group_rows(bubbles, tolerance=30)
+
+    assert [len(row) for row in rows] == [4, 4]
+
+
+def test_fit_rows_pins_missing_first_row_to_the_template():
+    # İlk satırın tüm bubble'ları (indeks 0-7) kaçırıldı
+    rows = group_rows(lattice_bubbles(missing=set(range(8))), tolerance=30)
+    # ROI yüksekliği 1000, 5 satır: ilk satır hücresinin ortası y = 100
+    fit = fit_rows(rows, 4, expected_rows=5, first_row=100.0)
+
+    assert fit["rows"] == 5
+    centres = predict(fit["model"], lattice_indices(5, 2, 4))
+    np.testing.assert_allclose(centres, predict(MODEL, lattice_indices(5, 2, 4)), atol=0.5)
+
+
+def test_fit_rows_keeps_all_expected_rows_when_last_row_is_missed():
+    rows = group_rows(lattice_bubbles(missing=set(range(32, 40))), tolerance=30)
+
+    fit = fit_rows(rows, 4, expected_rows=5, first_row=100.0)
+
+    assert fit["rows"] == 5
+    np.testing.assert_allclose(predict(fit["model"], [[0, 0, 0]]), [[120.0, 80.0]], atol=0.5)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import live_tracker
+from live_tracker import CornerTracker, LiveSessions, downscale
+from synthetic import PHOTO_CORNERS, draw_sheet, photograph
+
+PAGE = draw_sheet({1: "A", 6: "C"})
+
+
+def frame(shift=(0.0, 0.0)):
+    """Kağıdın (dx, dy) kaydırılmış olduğu kare ve gerçek köşeleri"""
+    return photograph(PAGE, corners=np.float32(PHOTO_CORNERS) + np.float32(shift))
+
+
+class Detector:
+    """Tam tespit yerine geçer: gerçek köşeleri döndürür, çağrıları sayar"""
+
+    def __init__(self):
+        self.calls = 0
+        self.corners = None
+
+    def __call__(self, image):
+        self.calls += 1
+        return self.corners
+
+
+def test_downscale_halves_until_below_max_side():
+    image = np.zeros((2000, 1501), dtype=np.uint8)
+
+    small, scale = downscale(image, 640)
+
+    assert small.shape == (500, 375)
+    assert scale == 4.0
+
+
+def test_tracks_corners_across_frames_without_detection():
+    tracker, detect = CornerTracker(), Detector()
+    photo, detect.corners = frame()
+    corners, tracking = tracker.update(photo, detect)
+    assert tracking["mode"] == "detected"
+
+    for step in range(1, 4):
+        photo, truth = frame((6.0 * step, -4.0 * step))
+        corners, tracking = tracker.update(photo, detect)
+
+        assert tracking["mode"] == "tracked"
+        assert tracking["frames_since_detection"] == step
+        assert np.abs(np.asarray(corners) - truth).max() < 1.5
+    assert detect.calls == 1
+
+
+def test_lost_sheet_falls_back_to_detection():
+    tracker, detect = CornerTracker(), Detector()
+    photo, detect.corners = frame()
+    tracker.update(photo, detect)
+
+    # Kağıt kadrajdan çıktı: takip tutmaz, tam tespit de bulamaz
+    detect.corners = None
+    corners, tracking = tracker.update(np.full_like(photo, 60), detect)
+
+    assert corners is None
+    assert tracking["mode"] == "lost"
+    assert detect.calls == 2
+    assert tracker.corners is None
+
+
+def test_redetects_after_redetect_every_frames(monkeypatch):
+    monkeypatch.setattr(live_tracker, "REDETECT_EVERY", 2)
+    tracker, detect = CornerTracker(), Detector()
+    photo, detect.corners = frame()
+
+    modes = [tracker.update(photo, detect)[1]["mode"] for _ in range(4)]
+
+    assert modes == ["detected", "tracked", "tracked", "detected"]
+
+
+def test_sessions_expire_and_are_capped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(live_tracker.time, "monotonic", lambda: now[0])
+    sessions = LiveSessions(ttl=10.0, max_sessions=2)
+
+    first = sessions.get("a")
+    sessions.get("b")
+    assert sessions.get("a") is first
+
+    now[0] += 5.0
+    sessions.get("b").last_used = now[0]
+    sessions.get("c")   # en eski oturum ("a") yer açmak için silinir
+    assert set(sessions.trackers) == {"b", "c"}
+
+    now[0] += 20.0
+    sessions.get("d")   # süresi dolanlar temizlenir
+    assert set(sessions.trackers) == {"d"}
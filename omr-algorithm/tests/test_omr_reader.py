@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+
+from omr_reader import read_omr
+from templates import get_template
+
+
+def draw_grid_sheet(template, answers):
+    """omr_reader'ın grid hücrelerine göre düz form: işaretli şıkkın hücresi koyu"""
+    width, height = template.page_size
+    page = np.full((height, width), 245, dtype=np.uint8)
+    x1, y1, x2, y2 = template.roi_box()
+    col_width = (x2 - x1) / template.grid["blocks"]
+    row_height = (y2 - y1) / template.grid["rows"]
+    option_width = col_width / len(template.options)
+    for q_num, option in answers.items():
+        col, row = template.grid_position(q_num)
+        x = x1 + col * col_width + (template.options.index(option) + 0.5) * option_width
+        y = y1 + (row + 0.5) * row_height
+        cv2.circle(page, (int(x), int(y)), int(row_height * 0.3), 30, -1)
+    return page
+
+
+def test_default_layout_is_the_legacy_15_question_grid(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    template = get_template("legacy-15")
+    answers = {1: "A", 7: "C", 12: "B", 15: "D"}
+    cv2.imwrite(str(tmp_path / "sheet.png"), draw_grid_sheet(template, answers))
+
+    result = read_omr(str(tmp_path / "sheet.png"))
+
+    assert result["template"] == "legacy-15"
+    assert result["summary"]["total"] == 15
+    assert result["answer_string"] == "".join(answers.get(q, "X") for q in range(1, 16))
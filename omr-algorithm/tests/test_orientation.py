@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import pytest
+
+from orientation import corner_order, detect_orientation, page_matrix
+from synthetic import INK, PAGE_SIZE, ROI_BOX, draw_sheet, photograph, sheet_layout
+
+ANSWERS = {1: "A", 2: "B", 3: "C", 4: "D", 5: "A", 7: "C", 8: "B", 9: "D", 10: "A"}
+
+
+@pytest.mark.parametrize("rotate, expected", [(None, 0), (cv2.ROTATE_180, 180)])
+@pytest.mark.parametrize("calibrated", [True, False])
+def test_detects_upright_and_upside_down_sheets(rotate, expected, calibrated):
+    photo, corners = photograph(draw_sheet(ANSWERS), rotate)
+    calibration = sheet_layout() if calibrated else None
+
+    orientation = detect_orientation(photo, corners, PAGE_SIZE, ROI_BOX, calibration)
+
+    assert orientation["rotation"] == expected
+    assert orientation["mirrored"] is False
+    assert orientation["method"] == ("layout" if calibrated else "header")
+
+
+def with_footer(page):
+    """Alt şeride başlıktan koyu imza satırı ve sayfa numarası"""
+    cv2.putText(page, "Imza:", (120, 2270), cv2.FONT_HERSHEY_SIMPLEX, 4, INK, 12)
+    cv2.line(page, (520, 2270), (1300, 2270), INK, 14)
+    cv2.putText(page, "1/1", (1380, 2270), cv2.FONT_HERSHEY_SIMPLEX, 4, INK, 12)
+    return page
+
+
+def test_upright_sheet_with_footer_is_not_turned_over():
+    photo, corners = photograph(with_footer(draw_sheet(ANSWERS)))
+
+    orientation = detect_orientation(photo, corners, PAGE_SIZE, ROI_BOX)
+
+    # Alt şerit boş değil: başlık bandı kanıtı yok, kağıt döndürülmez
+    assert orientation["rotation"] == 0
+    assert orientation["method"] is None
+
+
+def test_layout_still_corrects_upside_down_sheet_with_footer():
+    photo, corners = photograph(with_footer(draw_sheet(ANSWERS)), cv2.ROTATE_180)
+
+    orientation = detect_orientation(photo, corners, PAGE_SIZE, ROI_BOX, sheet_layout())
+
+    assert orientation["rotation"] == 180
+    assert orientation["method"] == "layout"
+
+
+def test_orientation_is_folded_into_the_page_homography():
+    page = draw_sheet(ANSWERS)
+    photo, corners = photograph(page, cv2.ROTATE_180)
+    orientation = detect_orientation(photo, corners, PAGE_SIZE, ROI_BOX, sheet_layout())
+
+    M = page_matrix(corners, PAGE_SIZE[0], PAGE_SIZE[1], orientation)
+    restored = cv2.warpPerspective(photo, M, PAGE_SIZE)
+
+    # Düzeltilmiş sayfa orijinal sayfaya (interpolasyon farkı dışında) denk
+    assert np.abs(restored.astype(int) - page).mean() < 10
+
+
+def test_corner_order_is_a_permutation():
+    for rotation in (0, 90, 180, 270):
+        for mirrored in (False, True):
+            assert sorted(corner_order(rotation, mirrored)) == [0, 1, 2, 3]
+    assert corner_order(0) == [0, 1, 2, 3]
+    assert corner_order(180) == [2, 3, 0, 1]
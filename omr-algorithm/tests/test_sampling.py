@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from calibration_store import CompiledCalibration
+from sampling import EMPTY_INTENSITY, get_sampling_plan, sample_bubbles
+from synthetic import sheet_layout
+
+
+def brute_force_means(roi, calibration, radius):
+    """Her pencerenin ortalaması tek tek (plan ile karşılaştırmak için)"""
+    h, w = roi.shape
+    means = np.full(calibration.valid.shape, np.nan)
+    for (qi, oi), (x, y) in zip(np.ndindex(*calibration.valid.shape), calibration.points.reshape(-1, 2)):
+        if not calibration.valid[qi, oi]:
+            continue
+        x, y = int(round(x)), int(round(y))
+        window = roi[max(0, y - radius):min(h, y + radius), max(0, x - radius):min(w, x + radius)]
+        means[qi, oi] = window.mean() if window.size else EMPTY_INTENSITY
+    return means
+
+
+def test_summed_area_matches_window_means():
+    rng = np.random.RandomState(0)
+    roi = rng.randint(0, 256, (1000, 1500)).astype(np.uint8)
+    calibration = sheet_layout()
+
+    means = sample_bubbles(roi, calibration, 10)
+
+    assert means.shape == (10, 4)
+    np.testing.assert_allclose(means, brute_force_means(roi, calibration, 10))
+
+
+def test_windows_clip_to_roi_and_skip_invalid_options():
+    roi = np.full((100, 100), 200, dtype=np.uint8)
+    roi[:10, :10] = 0
+    points = [[[5, 5], [98, 50], [300, 300], [50, 50]]]
+    valid = [[True, True, True, False]]
+    calibration = CompiledCalibration([1], points, valid)
+
+    means = sample_bubbles(roi, calibration, 10)
+
+    # Köşedeki pencere ROI'ye kırpılır: 15x15 pencerenin 10x10'u siyah
+    assert means[0, 0] == pytest.approx(200 * (225 - 100) / 225.0)
+    assert means[0, 1] == pytest.approx(200)
+    assert means[0, 2] == EMPTY_INTENSITY
+    assert np.isnan(means[0, 3])
+
+
+def test_plan_is_cached_per_calibration_shape_and_radius():
+    calibration = sheet_layout()
+
+    plan = get_sampling_plan(calibration, (1000, 1500), 10)
+
+    assert get_sampling_plan(calibration, (1000, 1500), 10) is plan
+    assert get_sampling_plan(calibration, (1000, 1500), 12) is not plan
+    assert get_sampling_plan(sheet_layout(), (1000, 1500), 10) is not plan
+
+
+def test_sample_source_matches_warped_roi():
+    rng = np.random.RandomState(1)
+    image = rng.randint(0, 256, (1200, 1700)).astype(np.uint8)
+    calibration = sheet_layout()
+    # Kaynak -> ROI: tam sayı öteleme, warp edilmiş ROI doğrudan kırpmadır
+    roi_matrix = np.array([[1, 0, -40], [0, 1, -60], [0, 0, 1]], dtype=np.float64)
+    roi = image[60:60 + 1000, 40:40 + 1500]
+
+    plan = get_sampling_plan(calibration, roi.shape, 10)
+
+    np.testing.assert_allclose(plan.sample_source(image, roi_matrix), plan.sample(roi))
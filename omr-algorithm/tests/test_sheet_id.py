@@ -0,0 +1,73 @@
+import cv2
+import pytest
+
+import config
+from omr_answer_reader import routes_template
+from orientation import detect_orientation
+from sheet_id import parse_payload, read_sheet_id
+from synthetic import PAGE_SIZE, ROI_BOX, draw_qr, draw_sheet, photograph, sheet_layout
+
+ENABLED = {"enabled": True}
+
+
+def test_parse_json_payload():
+    fields = parse_payload('{"template": "standard-10", "test": "MAT101-V1", "roll": 20231234}')
+
+    assert fields == {"template_id": "standard-10", "test_id": "MAT101-V1", "roll_no": "20231234"}
+
+
+def test_parse_query_string_with_short_keys():
+    fields = parse_payload("t=standard-10&E=MAT101-V1&student=42&unknown=x")
+
+    assert fields == {"template_id": "standard-10", "test_id": "MAT101-V1", "roll_no": "42"}
+
+
+def test_parse_empty_or_foreign_payload():
+    empty = {"template_id": None, "test_id": None, "roll_no": None}
+
+    assert parse_payload("") == empty
+    assert parse_payload("https://example.com") == empty
+    assert parse_payload("[1, 2]") == empty
+
+
+@pytest.mark.parametrize("rotate", [None, cv2.ROTATE_180])
+def test_reads_qr_from_the_corrected_window(rotate):
+    page = draw_qr(draw_sheet({1: "A"}), "template=standard-10&test=MAT101-V1&roll=20231234")
+    photo, corners = photograph(page, rotate)
+    orientation = detect_orientation(photo, corners, PAGE_SIZE, ROI_BOX, sheet_layout())
+
+    sheet_id = read_sheet_id(photo, corners, PAGE_SIZE, orientation, ENABLED)
+
+    assert sheet_id["template_id"] == "standard-10"
+    assert sheet_id["test_id"] == "MAT101-V1"
+    assert sheet_id["roll_no"] == "20231234"
+
+
+def test_no_qr_or_disabled_returns_none():
+    photo, corners = photograph(draw_qr(draw_sheet(), "test=X"))
+
+    assert read_sheet_id(photograph(draw_sheet())[0], corners, PAGE_SIZE, None, ENABLED) is None
+    assert read_sheet_id(photo, corners, PAGE_SIZE, None, {"enabled": False}) is None
+
+
+def test_routing_needs_qr_reading_and_no_fixed_template(monkeypatch):
+    monkeypatch.setitem(config.SHEET_ID, "enabled", False)
+    assert not routes_template()
+
+    monkeypatch.setitem(config.SHEET_ID, "enabled", True)
+    assert routes_template()
+    assert not routes_template("standard-10")
+    assert not routes_template(calibration=sheet_layout())
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, False), ("", False), ("0", False), ("no", False),
+    ("1", True), ("true", True), (" YES ", True), ("on", True),
+])
+def test_sheet_id_switch_is_read_from_the_environment(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("OMR_SHEET_ID", raising=False)
+    else:
+        monkeypatch.setenv("OMR_SHEET_ID", value)
+
+    assert config.env_flag("OMR_SHEET_ID") is expected
@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+
+from bubble_detector import THRESH_BLOCK_SIZE, THRESH_C, threshold_windows
+from synthetic import ROI_BOX, draw_sheet, sheet_layout
+
+
+def test_windows_match_whole_image_adaptive_threshold():
+    x1, y1, x2, y2 = ROI_BOX
+    rng = np.random.RandomState(2)
+    noise = rng.randint(-20, 21, (y2 - y1, x2 - x1))
+    gray = np.clip(draw_sheet({1: "A", 4: "C", 9: "D"})[y1:y2, x1:x2] + noise, 0, 255).astype(np.uint8)
+    height, width = gray.shape
+
+    layout = sheet_layout()
+    circles_grid = {
+        q: {option: (int(x), int(y), 22) for option, (x, y) in zip(layout.options, points)}
+        for q, points in zip(layout.keys(), layout.points)
+    }
+    # Görüntü kenarlarına değen ve taşan pencereler
+    circles_grid[11] = {"A": (5, 5, 12), "B": (30, 8, 12)}
+    circles_grid[12] = {"A": (width - 4, height - 6, 12), "B": (width - 40, height - 3, 12)}
+    circles_grid[13] = {"A": (width // 2, height - 1, 20)}
+
+    thresh = threshold_windows(gray, circles_grid)
+
+    full = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV,
+                                 THRESH_BLOCK_SIZE, THRESH_C)
+    inside = np.zeros(gray.shape, dtype=bool)
+    for options in circles_grid.values():
+        circles = np.array(list(options.values()))
+        wx1 = max(0, (circles[:, 0] - circles[:, 2]).min())
+        wy1 = max(0, (circles[:, 1] - circles[:, 2]).min())
+        wx2 = min(width, (circles[:, 0] + circles[:, 2]).max() + 1)
+        wy2 = min(height, (circles[:, 1] + circles[:, 2]).max() + 1)
+        inside[wy1:wy2, wx1:wx2] = True
+
+    np.testing.assert_array_equal(thresh[inside], full[inside])
+    assert not thresh[~inside].any()
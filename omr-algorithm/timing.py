@@ -0,0 +1,51 @@
+"""
+Aşama Zamanlayıcı
+OMR sonuçlarına aşama bazlı süre dökümü ("timings") ekler.
+
+Pipeline sıralı olduğu için her aşamanın sonunda lap() çağrılır; aşamanın
+süresi bir önceki lap'ten (ya da başlangıçtan) bu yana geçen süredir. Her
+lap tek bir time.perf_counter() çağrısıdır, bu yüzden üretimde açık
+bırakılabilir. Süreler milisaniyedir; aynı ad tekrar gelirse süreler toplanır.
+
+Kullanım:
+    timer = StageTimer(request_id)
+    image = load_image(path)
+    timer.lap("decode")
+    ...
+    timer.attach(result)   # result["timings"] = {"decode_ms": 3.1, ..., "total_ms": 41.7}
+"""
+
+import time
+
+
+class StageTimer:
+    """Aşama sürelerini toplar, sonuca timings / request_id olarak ekler"""
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.stages = {}
+
+    def lap(self, name):
+        """Son lap'ten bu yana geçen süreyi `name` aşamasına yaz"""
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+    def skip(self):
+        """Son lap'ten bu yana geçen süreyi hiçbir aşamaya yazma (ör. debug çıktısı)"""
+        self.last = time.perf_counter()
+
+    def as_dict(self):
+        timings = {f"{name}_ms": round(ms, 2) for name, ms in self.stages.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return timings
+
+    def attach(self, result):
+        """Sonuca timings (ve verildiyse request_id) ekle, sonucu döndür"""
+        if result is not None:
+            result["timings"] = self.as_dict()
+            if self.request_id is not None:
+                result["request_id"] = self.request_id
+        return result